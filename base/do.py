@@ -220,6 +220,31 @@ class JudgeCase:
     score: int
 
 
+@dataclass
+class RejudgeJob:
+    id: int
+    problem_id: int
+    submitter_id: int
+    status: enum.RejudgeJobStatus
+    total_count: int
+    published_count: int
+    skipped_count: int
+    create_time: datetime
+    finish_time: Optional[datetime]
+    error_message: Optional[str]
+
+
+@dataclass
+class ExportArtifact:
+    id: int
+    type: enum.ExportArtifactType
+    target_id: int
+    fingerprint: str
+    bucket: str
+    key: str
+    create_time: datetime
+
+
 @dataclass
 class Essay:
     id: int
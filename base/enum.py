@@ -76,3 +76,17 @@ class ScoreboardType(StrEnum):
 
 class ReviserSettingType(StrEnum):
     customized = 'CUSTOMIZED'
+
+
+class RejudgeJobStatus(StrEnum):
+    running = 'RUNNING'
+    finished = 'FINISHED'
+    failed = 'FAILED'
+
+
+class ExportArtifactType(StrEnum):
+    all_submissions = 'ALL_SUBMISSIONS'
+    all_essay_submissions = 'ALL_ESSAY_SUBMISSIONS'
+    all_testcase = 'ALL_TESTCASE'
+    all_sample_testcase = 'ALL_SAMPLE_TESTCASE'
+    all_assisting_data = 'ALL_ASSISTING_DATA'
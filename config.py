@@ -17,6 +17,7 @@ class Config:
     login_expire = timedelta(days=float(env_values.get('LOGIN_EXPIRE_DAYS', '7')))
 
     scoreboard_hardcode_ttl = float(env_values.get('SCOREBOARD_HARDCODE_TTL', '1'))
+    scoreboard_stream_min_interval = float(env_values.get('SCOREBOARD_STREAM_MIN_INTERVAL', '1'))
 
 
 class ServiceConfig:
@@ -71,6 +72,27 @@ class S3Config:
     access_key = env_values.get('S3_ACCESS_KEY')
     secret_key = env_values.get('S3_SECRET_KEY')
 
+    max_pool_connections = int(env_values.get('S3_MAX_POOL_CONNECTIONS', '32'))
+    connect_timeout = float(env_values.get('S3_CONNECT_TIMEOUT', '5'))
+    read_timeout = float(env_values.get('S3_READ_TIMEOUT', '60'))
+    max_attempts = int(env_values.get('S3_MAX_ATTEMPTS', '3'))  # Retried with backoff by botocore
+
+    multipart_threshold = int(env_values.get('S3_MULTIPART_THRESHOLD', str(16 << 20)))
+    multipart_chunk_size = int(env_values.get('S3_MULTIPART_CHUNK_SIZE', str(8 << 20)))
+    if multipart_chunk_size < 5 << 20:  # S3 rejects smaller parts, but only when completing the upload
+        raise ValueError(f'S3_MULTIPART_CHUNK_SIZE should be at least 5 MiB, got {multipart_chunk_size}')
+    multipart_concurrency = int(env_values.get('S3_MULTIPART_CONCURRENCY', '4'))
+    upload_concurrency = int(env_values.get('S3_UPLOAD_CONCURRENCY', '8'))  # Files uploaded at once in a request
+
+    # Small submission files are also kept in the database, so that server-side reads skip S3; 0 to disable
+    inline_max_bytes = int(env_values.get('S3_INLINE_MAX_BYTES', '16384'))
+
+    fetch_concurrency = int(env_values.get('S3_FETCH_CONCURRENCY', '8'))
+    fetch_retries = int(env_values.get('S3_FETCH_RETRIES', '2'))
+
+    disk_cache_dir = env_values.get('S3_DISK_CACHE_DIR')  # Empty to disable, should be shared by the workers on a host
+    disk_cache_max_bytes = int(env_values.get('S3_DISK_CACHE_MAX_BYTES', str(1 << 30)))
+
 
 class AmqpConfig:
     host = env_values.get('AMQP_HOST')
@@ -79,12 +101,53 @@ class AmqpConfig:
     password = env_values.get('AMQP_PASSWORD')
     report_queue_name = env_values.get('REPORT_QUEUE_NAME', 'report')
     prefetch_count = int(env_values.get('AMQP_PREFETCH_COUNT', '1'))
+    publish_channel_pool_size = int(env_values.get('AMQP_PUBLISH_CHANNEL_POOL_SIZE', '4'))
+    publish_timeout = float(env_values.get('AMQP_PUBLISH_TIMEOUT', '10'))
+    # Disable to consume reports only by the standalone worker, `python -m processor.amqp.worker`
+    consume_in_web = bool(strtobool(env_values.get('AMQP_CONSUME_IN_WEB', 'true')))
+    worker_metrics_port = int(env_values.get('AMQP_WORKER_METRICS_PORT', '0'))  # 0 to disable
 
 
 class ProfilerConfig:
     enabled = bool(strtobool(env_values.get('PROFILER_ENABLED', 'false')))
     interval = float(env_values.get('PROFILER_INTERVAL', '0.0001'))
     file_dir = env_values.get('PROFILER_FILE_DIR')
+    # Aggregated sampling mode: profile only a fraction of requests and collect stacks per route in memory
+    aggregate = bool(strtobool(env_values.get('PROFILER_AGGREGATE', 'false')))
+    sample_rate = float(env_values.get('PROFILER_SAMPLE_RATE', '1'))
+    routes = [route.strip() for route in env_values.get('PROFILER_ROUTES', '').split(',') if route.strip()]
+    stacks_url = env_values.get('PROFILER_STACKS_URL', '/profiler/stacks')
+
+
+class LoopMonitorConfig:
+    enabled = bool(strtobool(env_values.get('LOOP_MONITOR_ENABLED', 'true')))
+    interval = float(env_values.get('LOOP_MONITOR_INTERVAL', '0.5'))  # seconds
+    capture_stack = bool(strtobool(env_values.get('LOOP_MONITOR_CAPTURE_STACK', 'false')))  # debug mode
+    block_threshold = float(env_values.get('LOOP_MONITOR_BLOCK_THRESHOLD', '0.1'))  # seconds
+
+
+class TracingConfig:
+    enabled = bool(strtobool(env_values.get('TRACING_ENABLED', 'false')))
+    exporter = env_values.get('TRACING_EXPORTER', 'file')  # 'file' or 'otlp'
+    file_path = env_values.get('TRACING_FILE_PATH', 'log/trace.log')
+    otlp_endpoint = env_values.get('TRACING_OTLP_ENDPOINT')  # e.g. http://localhost:4318/v1/traces
+    service_name = env_values.get('TRACING_SERVICE_NAME', 'pd6-be')
+
+
+class ExecutorConfig:
+    password_hash_workers = int(env_values.get('EXECUTOR_PASSWORD_HASH_WORKERS', '2'))
+    password_hash_max_pending = int(env_values.get('EXECUTOR_PASSWORD_HASH_MAX_PENDING', '16'))
+    password_hash_chunk_size = int(env_values.get('EXECUTOR_PASSWORD_HASH_CHUNK_SIZE', '16'))
+    password_bulk_hash_workers = int(env_values.get('EXECUTOR_PASSWORD_BULK_HASH_WORKERS', '1'))
+    password_bulk_hash_max_pending = int(env_values.get('EXECUTOR_PASSWORD_BULK_HASH_MAX_PENDING', '2'))
+    zip_workers = int(env_values.get('EXECUTOR_ZIP_WORKERS', '2'))
+    zip_max_pending = int(env_values.get('EXECUTOR_ZIP_MAX_PENDING', '8'))
+    html_workers = int(env_values.get('EXECUTOR_HTML_WORKERS', '2'))
+    html_max_pending = int(env_values.get('EXECUTOR_HTML_MAX_PENDING', '8'))
+    csv_workers = int(env_values.get('EXECUTOR_CSV_WORKERS', '1'))
+    csv_max_pending = int(env_values.get('EXECUTOR_CSV_MAX_PENDING', '4'))
+    disk_workers = int(env_values.get('EXECUTOR_DISK_WORKERS', '4'))
+    disk_max_pending = int(env_values.get('EXECUTOR_DISK_MAX_PENDING', '32'))
 
 
 # default config objects
@@ -98,3 +161,6 @@ pd4s_config = PD4SConfig()
 s3_config = S3Config()
 amqp_config = AmqpConfig()
 profiler_config = ProfilerConfig()
+loop_monitor_config = LoopMonitorConfig()
+tracing_config = TracingConfig()
+executor_config = ExecutorConfig()
@@ -1,9 +1,38 @@
 USERNAME_PROHIBITED_CHARS = r'`#$%&*\/?'
 ESSAY_UPLOAD_LIMIT = 1000000000
 CODE_UPLOAD_LIMIT = 1000000
+TESTCASE_IMPORT_UPLOAD_LIMIT = 1000000000
+TESTCASE_IMPORT_MAX_FILES = 2000
+TESTCASE_IMPORT_MAX_UNCOMPRESSED_SIZE = 4 * 1024 * 1024 * 1024  # 4 GiB, against zip bombs
+TESTCASE_IMPORT_ASSISTING_DATA_DIR = 'assisting_data/'
 
 S3_EXPIRE_SECS = 86400  # 1 day
 S3_MANAGER_EXPIRE_SECS = 30 * 86400  # 30 day
+S3_SIGN_URL_REUSE_SECS = 3600  # a reused signed url may have lost this much of the requested expire time
+S3_SIGN_URL_CACHE_SIZE = 10000
+S3_STREAM_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+S3_INLINE_BACKFILL_BATCH_SIZE = 32
+
+EXPORT_ARTIFACT_REUSE_SECS = 7 * 86400  # 7 days
+# kept long enough for urls signed at the end of reuse to expire first
+EXPORT_ARTIFACT_KEEP_SECS = EXPORT_ARTIFACT_REUSE_SECS + S3_MANAGER_EXPIRE_SECS
+EXPORT_ARTIFACT_CLEAN_INTERVAL_SECS = 3600  # 1 hour
+
+# leave 1 hour for judge tasks to wait in queue, counting signed urls reused from the cache
+JUDGE_PREPARE_CACHE_SECS = S3_EXPIRE_SECS - S3_SIGN_URL_REUSE_SECS - 3600
+JUDGE_PREPARE_CACHE_SIZE = 1024  # problems
+JUDGE_PREPARE_SIGN_CONCURRENCY = 10
+REJUDGE_BATCH_SIZE = 500
+REJUDGE_SIGN_CONCURRENCY = 20
+# a running rejudge job without progress for this long is taken as lost, e.g. its worker was restarted
+REJUDGE_JOB_STALE_SECS = 1800  # 30 minutes
+REJUDGE_JOB_CHECK_INTERVAL_SECS = 300  # 5 minutes
+
+SSE_HEARTBEAT_SECS = 15
+
+SCOREBOARD_FREEZE_SECS = 3600  # team contest scoreboard freezes in the last hour
+# runs commit a little after their judge time (and on other hosts' clocks), so polls overlap by this much
+SCOREBOARD_HARDCODE_CURSOR_OVERLAP_SECS = 30
 
 TESTDATA_ENCODING = 'utf-8'
 
@@ -25,6 +25,10 @@ def debug(msg):
     _Logger.event_logger.debug(f"request {context.get_request_uuid()}\t{msg}")
 
 
+def warning(msg):
+    _Logger.event_logger.warning(f"request {context.get_request_uuid()}\t{msg}")
+
+
 def error(msg):
     _Logger.event_logger.error(f"request {context.get_request_uuid()}\t{msg}")
 
@@ -42,6 +42,8 @@ async def app_startup():
     from config import db_config
     from persistence.database import pool_handler
     await pool_handler.initialize(db_config=db_config)
+    from persistence.database.listener import listen_handler
+    await listen_handler.initialize(db_config=db_config)
     log.info('Database initialized')
 
     log.info('SMTP initializing...')
@@ -64,15 +66,41 @@ async def app_startup():
     await amqp_publish_handler.initialize(amqp_config=amqp_config)
     log.info('AMQP Publisher initialized')
 
-    log.info('AMQP Consumer initializing...')
-    from persistence.amqp_consumer import make_consumer
-    import processor.amqp
-    report_consumer = make_consumer(amqp_config=amqp_config,
-                                    queue_name=amqp_config.report_queue_name,
-                                    consume_function=processor.amqp.save_report)
+    if amqp_config.consume_in_web:
+        log.info('AMQP Consumer initializing...')
+        from persistence.amqp_consumer import make_consumer
+        import processor.amqp
+        report_consumer = make_consumer(amqp_config=amqp_config,
+                                        queue_name=amqp_config.report_queue_name,
+                                        consume_function=processor.amqp.save_report,
+                                        parse_function=processor.amqp.parse_report,
+                                        partition_key=processor.amqp.report_partition_key)
+        import asyncio
+        asyncio.ensure_future(report_consumer(asyncio.get_event_loop()))
+        log.info('AMQP Consumer initialized')
+
+    log.info('Event loop monitor initializing...')
+    from config import loop_monitor_config
+    from util.loop_monitor import loop_monitor
+    await loop_monitor.initialize(loop_monitor_config=loop_monitor_config)
+    log.info('Event loop monitor initialized')
+
+    log.info('Tracing exporter initializing...')
+    from config import tracing_config
+    from util.tracing import span_exporter
+    await span_exporter.initialize(tracing_config=tracing_config)
+    log.info('Tracing exporter initialized')
+
+    log.info('Export artifact cleaner initializing...')
     import asyncio
-    asyncio.ensure_future(report_consumer(asyncio.get_event_loop()))
-    log.info('AMQP Consumer initialized')
+    import service.downloader
+    asyncio.ensure_future(service.downloader.clean_expired_artifacts_periodically())
+    log.info('Export artifact cleaner initialized')
+
+    log.info('Stale rejudge job checker initializing...')
+    import service.judge
+    asyncio.ensure_future(service.judge.fail_stale_rejudge_jobs_periodically())
+    log.info('Stale rejudge job checker initialized')
 
 
 @app.on_event('shutdown')
@@ -80,6 +108,9 @@ async def app_shutdown():
     from persistence.database import pool_handler
     await pool_handler.close()
 
+    from persistence.database.listener import listen_handler
+    await listen_handler.close()
+
     from persistence.email import smtp_handler
     await smtp_handler.close()
 
@@ -89,26 +120,41 @@ async def app_shutdown():
     from persistence.amqp_publisher import amqp_publish_handler
     await amqp_publish_handler.close()
 
+    from util.loop_monitor import loop_monitor
+    await loop_monitor.close()
+
+    from util.tracing import span_exporter
+    await span_exporter.close()
+
+    import util.executor
+    util.executor.shutdown()
+
 
 # Add middlewares
 # Order matters! First added middlewares are executed last.
+# All middlewares are pure-ASGI to avoid the per-layer overhead of `BaseHTTPMiddleware`.
 
 import middleware.db_access_log
-app.middleware('http')(middleware.db_access_log.middleware)
+app.add_middleware(middleware.db_access_log.Middleware)
 
 import middleware.auth
-app.middleware('http')(middleware.auth.middleware)
+app.add_middleware(middleware.auth.Middleware)
 
 import middleware.logging
-app.middleware('http')(middleware.logging.middleware)
+app.add_middleware(middleware.logging.Middleware)
 
 from config import profiler_config
 if profiler_config.enabled:
     import middleware.profiler
-    app.middleware('http')(middleware.profiler.middleware)
+    app.add_middleware(middleware.profiler.Middleware)
+
+from config import tracing_config
+if tracing_config.enabled:
+    import middleware.tracing
+    app.add_middleware(middleware.tracing.Middleware)
 
 import middleware.tracker
-app.middleware('http')(middleware.tracker.middleware)
+app.add_middleware(middleware.tracker.Middleware)
 
 import starlette_context.middleware
 app.add_middleware(starlette_context.middleware.RawContextMiddleware)
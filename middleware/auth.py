@@ -1,4 +1,6 @@
 import fastapi
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from util import security
 from util.context import context
@@ -6,15 +8,22 @@ from util.context import context
 from .envelope import middleware_error_enveloped
 
 
-@middleware_error_enveloped
-async def middleware(request: fastapi.Request, call_next):
-    authed_account = None
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    if auth_token := request.headers.get('auth-token', None):
-        authed_account = security.decode_jwt(auth_token, time=context.request_time)  # Requires middleware.tracker
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
 
-    context.set_account(authed_account)
-    return await call_next(request)
+        authed_account = None
+
+        if auth_token := Headers(scope=scope).get('auth-token', None):
+            authed_account = security.decode_jwt(auth_token, time=context.request_time)  # Requires middleware.tracker
+
+        context.set_account(authed_account)
+        await self.app(scope, receive, send)
 
 
 async def auth_header_placeholder(auth_token: str = fastapi.Header(None, convert_underscores=True)):
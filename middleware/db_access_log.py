@@ -1,7 +1,6 @@
-import fastapi
-import starlette_context
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-import const
 import log
 import persistence.database as db
 from util.context import context
@@ -9,18 +8,26 @@ from util.context import context
 from .envelope import middleware_error_enveloped
 
 
-@middleware_error_enveloped
-async def middleware(request: fastapi.Request, call_next):
-    account = starlette_context.context.get(const.CONTEXT_AUTHED_ACCOUNT_KEY, None)
-    # try to clarify the root cause of issue #295 (request with no ip)
-    if not request.client.host:
-        log.info(f'Request header: {request.headers}')
-        log.info(f'Request client: {request.client}')
-    await db.access_log.add(
-        access_time=context.request_time,
-        request_method=request.method,
-        resource_path=request.url.path,
-        ip=request.client.host,
-        account_id=account.id if account else None,
-    )
-    return await call_next(request)
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        connection = HTTPConnection(scope)
+        account = context.get_account()
+        # try to clarify the root cause of issue #295 (request with no ip)
+        if not connection.client.host:
+            log.info(f'Request header: {connection.headers}')
+            log.info(f'Request client: {connection.client}')
+        await db.access_log.add(
+            access_time=context.request_time,
+            request_method=scope['method'],
+            resource_path=connection.url.path,
+            ip=connection.client.host,
+            account_id=account.id if account else None,
+        )
+        await self.app(scope, receive, send)
@@ -3,6 +3,7 @@ import functools
 import typing
 
 import fastapi
+from starlette.types import Message, Receive, Scope, Send
 
 import exceptions as exc
 import log
@@ -113,17 +114,34 @@ def _handle_exc(error: Exception) -> Exception:
     return error
 
 
-def middleware_error_enveloped(middleware_func):
-    @functools.wraps(middleware_func)
-    async def wrapped(request: fastapi.Request, call_next):
+def middleware_error_enveloped(middleware_call):
+    """
+    Add envelope and handle error for pure-ASGI middlewares' `__call__(self, scope, receive, send)`.
+
+    Errors raised after the response has started cannot be enveloped and will be re-raised.
+    """
+
+    @functools.wraps(middleware_call)
+    async def wrapped(self, scope: Scope, receive: Receive, send: Send):
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
+
         try:
-            return await middleware_func(request, call_next)
+            return await middleware_call(self, scope, receive, send_wrapper)
         except Exception as e:
+            if response_started:
+                raise
             handled_exc = _handle_exc(e)
-            return fastapi.responses.JSONResponse({
+            error_response = fastapi.responses.JSONResponse({
                 'success': False,
                 'data': None,
                 'error': handled_exc.__class__.__name__,
             })
+            await error_response(scope, receive, send)
 
     return wrapped
@@ -30,3 +30,65 @@ class TestEnveloped(unittest.IsolatedAsyncioTestCase):
             'data': None,
             'error': 'SystemException',
         })
+
+
+class TestMiddlewareErrorEnveloped(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': '/',
+            'headers': [],
+        }
+
+    @staticmethod
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def test_happy_flow_passthrough(self):
+        sent = []
+
+        class Dummy:
+            @envelope.middleware_error_enveloped
+            async def __call__(self, scope, receive, send):
+                await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+                await send({'type': 'http.response.body', 'body': b'ok'})
+
+        async def send(message):
+            sent.append(message)
+
+        await Dummy()(self.scope, self.receive, send)
+
+        self.assertEqual(sent, [
+            {'type': 'http.response.start', 'status': 200, 'headers': []},
+            {'type': 'http.response.body', 'body': b'ok'},
+        ])
+
+    async def test_happy_flow_exception(self):
+        sent = []
+
+        class Dummy:
+            @envelope.middleware_error_enveloped
+            async def __call__(self, scope, receive, send):
+                raise Exception('expected exception for testing')
+
+        async def send(message):
+            sent.append(message)
+
+        await Dummy()(self.scope, self.receive, send)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(sent[1]['body'], b'{"success":false,"data":null,"error":"SystemException"}')
+
+    async def test_exception_after_response_started(self):
+        class Dummy:
+            @envelope.middleware_error_enveloped
+            async def __call__(self, scope, receive, send):
+                await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+                raise Exception('expected exception for testing')
+
+        async def send(message):
+            pass
+
+        with self.assertRaises(Exception):
+            await Dummy()(self.scope, self.receive, send)
@@ -1,14 +1,21 @@
-import fastapi
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 import log
 
 from .envelope import middleware_error_enveloped
 
 
-@middleware_error_enveloped
-async def middleware(request: fastapi.Request, call_next):
-    log.info(f">> {request.method}\t{request.url.path}")
-    try:
-        return await call_next(request)
-    finally:
-        log.info(f"<< {request.method}\t{request.url.path}")
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        log.info(f">> {scope['method']}\t{scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            log.info(f"<< {scope['method']}\t{scope['path']}")
@@ -1,23 +1,120 @@
+import collections
 import os
+import random
+import typing
 
 from pyinstrument import Profiler
+from pyinstrument.frame import BaseFrame
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from config import profiler_config
-from middleware.envelope import middleware_error_enveloped
 from util.context import context
 
+from .envelope import middleware_error_enveloped
 
-@middleware_error_enveloped
-async def middleware(request, call_next):
-    if not profiler_config.enabled or request.scope['type'] != 'http':
-        return await call_next(request)
 
-    profiler = Profiler(interval=profiler_config.interval)
-    profiler.start()
+_UNMATCHED_ROUTE = '<unmatched>'
+_MAX_STACKS_PER_ROUTE = 10000
+_OVERFLOW_STACK = '<overflow>'
 
-    try:
-        return await call_next(request)
-    finally:
-        profiler.stop()
-        with open(os.path.join(profiler_config.file_dir, str(context.get_request_uuid())), 'w+') as outfile:
-            outfile.write(profiler.output_text(show_all=True, timeline=True))
+
+class StackAggregator:
+    """
+    Aggregates profiled call stacks per route template, in collapsed-stack format (weights in microseconds).
+    """
+
+    def __init__(self):
+        self._stacks: dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+
+    def add(self, route: str, root_frame: typing.Optional[BaseFrame]):
+        if root_frame is None:
+            return
+
+        stacks = self._stacks[route]
+        for stack, self_time in self._walk(root_frame, parent_stack=()):
+            weight = int(self_time * 1_000_000)
+            if not weight:
+                continue
+            key = ';'.join(stack)
+            if key not in stacks and len(stacks) >= _MAX_STACKS_PER_ROUTE:
+                key = _OVERFLOW_STACK
+            stacks[key] += weight
+
+    def _walk(self, frame: BaseFrame, parent_stack: tuple[str, ...]) -> typing.Iterator[tuple[tuple[str, ...], float]]:
+        stack = parent_stack + (self._frame_name(frame),)
+        if frame.self_time:
+            yield stack, frame.self_time
+        for child in frame.children:
+            yield from self._walk(child, parent_stack=stack)
+
+    @staticmethod
+    def _frame_name(frame: BaseFrame) -> str:
+        name = f'{frame.function} ({frame.file_path_short}:{frame.line_no})' if frame.file_path_short \
+            else str(frame.function)
+        return name.replace(';', ':')
+
+    @property
+    def routes(self) -> list[str]:
+        return sorted(self._stacks)
+
+    def collapsed(self, route: str = None) -> str:
+        """
+        :return: collapsed stacks (`frame;frame;frame weight` per line) with route as the root frame,
+                 can be rendered by flamegraph tools directly
+        """
+        routes = [route] if route else self.routes
+        return '\n'.join(f'{route_name};{stack} {weight}'
+                         for route_name in routes
+                         for stack, weight in self._stacks.get(route_name, {}).items())
+
+    def clear(self):
+        self._stacks.clear()
+
+
+stack_aggregator = StackAggregator()
+
+
+def _match_route(scope: Scope) -> str:
+    app = scope.get('app')
+    for route in getattr(app, 'routes', ()):
+        match, _ = route.matches(scope)
+        if match is Match.FULL:
+            return f"{scope['method']} {route.path}"
+    return _UNMATCHED_ROUTE
+
+
+def _should_profile(route: str) -> bool:
+    if not profiler_config.routes:
+        return True
+    return route.split(' ', 1)[-1] in profiler_config.routes
+
+
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not profiler_config.enabled or scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        if random.random() >= profiler_config.sample_rate:
+            return await self.app(scope, receive, send)
+
+        route = _match_route(scope)
+        if not _should_profile(route):
+            return await self.app(scope, receive, send)
+
+        profiler = Profiler(interval=profiler_config.interval)
+        profiler.start()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = profiler.stop()
+            if profiler_config.aggregate:
+                stack_aggregator.add(route, session.root_frame())
+            else:
+                with open(os.path.join(profiler_config.file_dir, str(context.get_request_uuid())), 'w+') as outfile:
+                    outfile.write(profiler.output_text(show_all=True, timeline=True))
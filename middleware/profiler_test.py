@@ -0,0 +1,44 @@
+from dataclasses import dataclass, field
+import unittest
+
+from . import profiler
+
+
+@dataclass
+class _Frame:
+    function: str
+    file_path_short: str
+    line_no: int
+    self_time: float
+    children: list = field(default_factory=list)
+
+
+class TestStackAggregator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root_frame = _Frame('handler', 'app.py', 1, 0.001, children=[
+            _Frame('query', 'db.py', 10, 0.002),
+            _Frame('render', 'view.py', 20, 0, children=[
+                _Frame('dumps', 'json.py', 30, 0.003),
+            ]),
+        ])
+
+    def test_happy_flow(self):
+        aggregator = profiler.StackAggregator()
+        aggregator.add('GET /view/{id}', self.root_frame)
+        aggregator.add('GET /view/{id}', self.root_frame)
+
+        self.assertEqual(aggregator.routes, ['GET /view/{id}'])
+        self.assertEqual(aggregator.collapsed().split('\n'), [
+            'GET /view/{id};handler (app.py:1) 2000',
+            'GET /view/{id};handler (app.py:1);query (db.py:10) 4000',
+            'GET /view/{id};handler (app.py:1);render (view.py:20);dumps (json.py:30) 6000',
+        ])
+
+    def test_filter_route_and_clear(self):
+        aggregator = profiler.StackAggregator()
+        aggregator.add('GET /a', self.root_frame)
+        aggregator.add('GET /b', None)
+
+        self.assertEqual(aggregator.collapsed(route='GET /b'), '')
+        aggregator.clear()
+        self.assertEqual(aggregator.collapsed(), '')
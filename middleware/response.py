@@ -3,6 +3,7 @@ import json
 import typing
 from uuid import UUID
 
+import fastapi.encoders
 import fastapi.responses
 
 
@@ -31,3 +32,27 @@ class JSONResponse(fastapi.responses.JSONResponse):
             indent=None,
             separators=(",", ":"),
         ).encode("utf-8")
+
+
+class EventSourceResponse(fastapi.responses.StreamingResponse):
+    """
+    Server-sent events. `content` yields `(event, data)`, `data` is rendered as JSON;
+    yield `(None, None)` to send a heartbeat comment, which keeps proxies from closing idle connections.
+    """
+    media_type = 'text/event-stream'
+
+    def __init__(self, content: typing.AsyncIterator[tuple[typing.Optional[str], typing.Any]], **kwargs):
+        super().__init__(self._render(content),
+                         headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+                         **kwargs)
+
+    @staticmethod
+    async def _render(content: typing.AsyncIterator[tuple[typing.Optional[str], typing.Any]]) \
+            -> typing.AsyncIterator[str]:
+        async for event, data in content:
+            if event is None:
+                yield ': heartbeat\n\n'
+                continue
+            rendered = json.dumps(fastapi.encoders.jsonable_encoder(data), cls=JSONEncoder, ensure_ascii=False,
+                                  separators=(",", ":"))
+            yield f'event: {event}\ndata: {rendered}\n\n'
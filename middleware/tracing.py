@@ -0,0 +1,18 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from util import tracing
+
+from .envelope import middleware_error_enveloped
+
+
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        async with tracing.span(f"{scope['method']} {scope['path']}", root=True):  # Requires middleware.tracker
+            await self.app(scope, receive, send)
@@ -1,19 +1,31 @@
 from datetime import datetime
 import uuid
 
-import fastapi
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from util.context import context
 
 from .envelope import middleware_error_enveloped
 
 
-@middleware_error_enveloped
-async def middleware(request, call_next):
-    request_uuid, request_time = uuid.uuid1(), datetime.now()
-    context.set_request_uuid(request_uuid)
-    context.set_request_time(request_time)
+class Middleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    response: fastapi.Response = await call_next(request)
-    response.headers['X-Request-ID'] = str(request_uuid)
-    return response
+    @middleware_error_enveloped
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        request_uuid, request_time = uuid.uuid1(), datetime.now()
+        context.set_request_uuid(request_uuid)
+        context.set_request_time(request_time)
+
+        async def send_with_request_id(message: Message):
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers['X-Request-ID'] = str(request_uuid)
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
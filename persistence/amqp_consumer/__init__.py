@@ -1,18 +1,128 @@
 import asyncio
-from typing import Callable, Coroutine, Any
+from datetime import datetime
+from typing import AsyncIterable, Callable, Coroutine, Any, Hashable, Optional
 
 import aio_pika
 
 from config import AmqpConfig
 import log
+from util import metric, tracing
+
+
+_BACKLOG_POLL_INTERVAL_SECS = 10
+
+
+class _Consumer:
+    """
+    Consumes up to `max_in_flight` messages concurrently; messages of the same partition key are consumed in order.
+    """
+
+    def __init__(self, queue_name: str, max_in_flight: int,
+                 consume_function: Callable[[Any], Coroutine[Any, Any, None]],
+                 parse_function: Callable[[bytes], Any],
+                 partition_key: Optional[Callable[[Any], Optional[Hashable]]]):
+        self._queue_name = queue_name
+        self._consume_function = consume_function
+        self._parse_function = parse_function
+        self._partition_key = partition_key
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._partition_tails: dict[Hashable, asyncio.Task] = {}
+        self._consuming: set[asyncio.Task] = set()
+
+    async def consume_all(self, messages: AsyncIterable[aio_pika.IncomingMessage]) -> None:
+        """
+        Returns after the messages are all consumed, or waits for the in-flight ones if cancelled.
+        """
+        try:
+            async for message in messages:
+                log.info(f'Queue {self._queue_name} received message {message.message_id=} {len(message.body)=}')
+
+                try:
+                    parsed = self._parse_function(message.body)
+                except Exception as e:
+                    log.exception(e, msg=f'Failed to parse {message.message_id=}')
+                    await self._nack(message)
+                    continue
+
+                key = None
+                if self._partition_key is not None:
+                    try:
+                        key = self._partition_key(parsed)
+                    except Exception as e:
+                        log.exception(e, msg=f'Failed to get partition key of {message.message_id=}',
+                                      info_level=True)
+
+                # The broker also bounds the un-acked messages by prefetch count, this keeps the bound if it does not
+                await self._in_flight.acquire()
+                task = asyncio.create_task(self._consume(message, parsed, previous=self._partition_tails.get(key)
+                                                         if key is not None else None))
+                self._consuming.add(task)
+                task.add_done_callback(self._consuming.discard)
+                if key is not None:
+                    self._partition_tails[key] = task
+                    task.add_done_callback(lambda t, k=key: self._partition_tails.pop(k)
+                                           if self._partition_tails.get(k) is t else None)
+        finally:
+            if self._consuming:
+                await asyncio.wait(self._consuming)
+
+    async def _consume(self, message: aio_pika.IncomingMessage, parsed: Any,
+                       previous: Optional[asyncio.Task]):
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+
+            start_time = datetime.now()
+            metric.amqp_consume_in_flight(self._queue_name, 1)
+            try:
+                async with tracing.span(f'amqp consume {self._queue_name}', root=True,
+                                        message_id=message.message_id):
+                    await self._consume_function(parsed)
+            except Exception as e:
+                log.exception(e)
+                await self._nack(message)
+            else:
+                await message.ack()
+                log.info(f'Message {message.message_id=} ACKed')
+            finally:
+                metric.amqp_consume_in_flight(self._queue_name, -1)
+                metric.amqp_consume_time(self._queue_name, (datetime.now() - start_time).total_seconds() * 1000)
+        finally:
+            self._in_flight.release()
+
+    @staticmethod
+    async def _nack(message: aio_pika.IncomingMessage):
+        await message.nack(requeue=False)
+        log.error(f'Message {message.message_id=} NACKed')
+        log.error(f'Message {message.message_id=} full body: {message.body.decode()}')
 
 
 def make_consumer(amqp_config: AmqpConfig, queue_name: str,
-                  consume_function: Callable[[bytes], Coroutine[Any, Any, None]]) \
+                  consume_function: Callable[[Any], Coroutine[Any, Any, None]],
+                  parse_function: Callable[[bytes], Any] = None,
+                  partition_key: Callable[[Any], Optional[Hashable]] = None) \
         -> Callable[[asyncio.events.AbstractEventLoop], Coroutine[Any, Any, None]]:
+    """
+    Up to `amqp_config.prefetch_count` messages are consumed concurrently.
+
+    :param consume_function: consumes a message parsed by `parse_function`
+    :param parse_function: parses the message body once for both `partition_key` and `consume_function`;
+                           messages failed to parse are NACKed. Defaults to the body as is
+    :param partition_key: messages with the same key are consumed in the order of delivery;
+                          messages without key (or if not given) are not ordered
+    """
+    async def poll_backlog(channel: aio_pika.Channel):
+        while True:
+            try:
+                queue = await channel.declare_queue(queue_name, passive=True)
+                metric.amqp_consume_backlog(queue_name, queue.declaration_result.message_count)
+            except Exception as e:
+                log.exception(e, msg=f'Failed to poll backlog of {queue_name=}', info_level=True)
+            await asyncio.sleep(_BACKLOG_POLL_INTERVAL_SECS)
+
     async def main(loop: asyncio.events.AbstractEventLoop):
         log.info(f"Creating AMQP connection to {amqp_config.host=} {amqp_config.port=}")
-        async with await aio_pika.connect(
+        async with await aio_pika.connect_robust(
             host=amqp_config.host,
             port=amqp_config.port,
             login=amqp_config.username,
@@ -23,26 +133,25 @@ def make_consumer(amqp_config: AmqpConfig, queue_name: str,
                      f' creating channel and queue {queue_name=}')
 
             channel: aio_pika.RobustChannel = await connection.channel()
+            # The broker delivers at most `prefetch_count` un-acked messages, which bounds the concurrency
+            await channel.set_qos(prefetch_count=amqp_config.prefetch_count)
             queue = await channel.declare_queue(
                 queue_name,
                 durable=True,
             )
 
-            log.info(f"Created consuming queue, {queue_name=}")
+            log.info(f"Created consuming queue, {queue_name=}, {amqp_config.prefetch_count=}")
 
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    message: aio_pika.IncomingMessage
-                    log.info(f'Queue {queue_name} received message {message.message_id=} {len(message.body)=}')
-                    try:
-                        await consume_function(message.body)
-                    except Exception as e:
-                        log.exception(e)
-                        await message.nack(requeue=False)
-                        log.error(f'Message {message.message_id=} NACKed')
-                        log.error(f'Message {message.message_id=} full body: {message.body.decode()}')
-                    else:
-                        await message.ack()
-                        log.info(f'Message {message.message_id=} ACKed')
+            backlog_poller = asyncio.create_task(poll_backlog(await connection.channel()))
+            consumer = _Consumer(queue_name, max_in_flight=amqp_config.prefetch_count,
+                                 consume_function=consume_function,
+                                 parse_function=parse_function or (lambda body: body),
+                                 partition_key=partition_key)
+
+            try:
+                async with queue.iterator() as queue_iter:
+                    await consumer.consume_all(queue_iter)
+            finally:
+                backlog_poller.cancel()
 
     return main
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import unittest
+
+from . import amqp_consumer
+
+
+class _FakeMessage:
+    def __init__(self, message_id: str, body: bytes, settled: list[tuple[str, str]]):
+        self.message_id = message_id
+        self.body = body
+        self._settled = settled
+
+    async def ack(self):
+        self._settled.append(('ack', self.message_id))
+
+    async def nack(self, requeue: bool):
+        assert not requeue
+        self._settled.append(('nack', self.message_id))
+
+
+class TestConsumer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.settled = []
+        self.events = []
+
+    def make_messages(self, *bodies: dict):
+        async def messages():
+            for i, body in enumerate(bodies):
+                yield _FakeMessage(str(i), json.dumps(body).encode(), self.settled)
+        return messages()
+
+    @staticmethod
+    def make_consumer(consume_function, max_in_flight: int = 4) -> amqp_consumer._Consumer:
+        return amqp_consumer._Consumer('queue', max_in_flight=max_in_flight, consume_function=consume_function,
+                                       parse_function=json.loads, partition_key=lambda body: body.get('key'))
+
+    async def test_in_flight_bounded(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def consume(body: dict):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            for _ in range(3):
+                await asyncio.sleep(0)
+            in_flight -= 1
+
+        await self.make_consumer(consume, max_in_flight=2).consume_all(
+            self.make_messages(*({'i': i} for i in range(6))))
+
+        self.assertEqual(max_in_flight, 2)
+        self.assertEqual(sorted(self.settled), [('ack', str(i)) for i in range(6)])
+
+    async def test_partition_order(self):
+        other_key_started = asyncio.Event()
+
+        async def consume(body: dict):
+            self.events.append(('start', body['name']))
+            if body['name'] == 'a1':
+                # Other keys are consumed meanwhile, or this times out
+                await asyncio.wait_for(other_key_started.wait(), timeout=1)
+            if body['name'] == 'b1':
+                other_key_started.set()
+            await asyncio.sleep(0)
+            self.events.append(('end', body['name']))
+
+        await self.make_consumer(consume).consume_all(self.make_messages(
+            {'key': 'a', 'name': 'a1'},
+            {'key': 'b', 'name': 'b1'},
+            {'key': 'a', 'name': 'a2'},
+            {'key': 'a', 'name': 'a3'},
+        ))
+
+        self.assertLess(self.events.index(('start', 'b1')), self.events.index(('end', 'a1')))
+        self.assertLess(self.events.index(('end', 'a1')), self.events.index(('start', 'a2')))
+        self.assertLess(self.events.index(('end', 'a2')), self.events.index(('start', 'a3')))
+        self.assertEqual(len(self.settled), 4)
+
+    async def test_nack_on_failure(self):
+        async def consume(body: dict):
+            if body.get('fail'):
+                raise ValueError
+
+        messages = self.make_messages({'key': 'a'}, {'key': 'a', 'fail': True}, {'key': 'a'})
+
+        async def with_unparsable():
+            async for message in messages:
+                yield message
+            yield _FakeMessage('not json', b'{', self.settled)
+
+        await self.make_consumer(consume).consume_all(with_unparsable())
+
+        self.assertEqual(self.settled, [('nack', 'not json'), ('ack', '0'), ('nack', '1'), ('ack', '2')])
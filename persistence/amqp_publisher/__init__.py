@@ -1,34 +1,73 @@
+import asyncio
+from datetime import datetime
+from typing import Sequence
+
 import aio_pika
+import aio_pika.pool
 
 from base import mcs
 from config import AmqpConfig
 import log
+from util import metric, tracing
 
 
 class AmqpPublishHandler(metaclass=mcs.Singleton):
     def __init__(self):
-        self._connection: aio_pika.Connection = None  # Need to be init/closed manually
-        self._channel: aio_pika.Channel = None  # Need to be init/closed manually
+        self._connection: aio_pika.RobustConnection = None  # Need to be init/closed manually
+        self._channel_pool: aio_pika.pool.Pool[aio_pika.RobustChannel] = None  # Need to be init/closed manually
+        self._publish_timeout: float = None
 
     async def initialize(self, amqp_config: AmqpConfig):
-        self._connection = await aio_pika.connect(
+        self._connection = await aio_pika.connect_robust(
             host=amqp_config.host,
             port=amqp_config.port,
             login=amqp_config.username,
             password=amqp_config.password,
         )
-        self._channel = await self._connection.channel().__aenter__()
+        self._channel_pool = aio_pika.pool.Pool(self._make_channel, max_size=amqp_config.publish_channel_pool_size)
+        self._publish_timeout = amqp_config.publish_timeout
+
+    async def _make_channel(self) -> aio_pika.RobustChannel:
+        # With publisher confirms, publish returns only after the broker has taken the message;
+        # unroutable messages (e.g. queue not exist) are returned and raised instead of silently dropped
+        return await self._connection.channel(publisher_confirms=True, on_return_raises=True)
 
     async def close(self):
-        await self._channel.close()
+        await self._channel_pool.close()
         await self._connection.close()
 
     async def publish(self, queue_name: str, message: bytes, priority: int = 0):
         log.info(f'AMQP Publish to {queue_name=}, message={message.decode()}')
-        await self._channel.default_exchange.publish(aio_pika.Message(
-            body=message,
-            priority=priority,
-        ), routing_key=queue_name)
+        async with self._channel_pool.acquire() as channel:
+            await self._publish(channel, queue_name=queue_name, message=message, priority=priority)
+
+    async def publish_batch(self, messages: Sequence[tuple[str, bytes, int]]):
+        """
+        Pipelines the messages on one channel and waits for all the confirms.
+
+        :param messages: queue name, message and priority of each message
+        """
+        log.info(f'AMQP Publish batch of {len(messages)} messages')
+        async with self._channel_pool.acquire() as channel:
+            await asyncio.gather(*(self._publish(channel, queue_name=queue_name, message=message, priority=priority)
+                                   for queue_name, message, priority in messages))
+
+    async def _publish(self, channel: aio_pika.Channel, queue_name: str, message: bytes, priority: int):
+        start_time = datetime.now()
+        metric.amqp_publish_in_flight(queue_name, 1)
+        try:
+            async with tracing.span('amqp publish', queue_name=queue_name, size=len(message)):
+                await channel.default_exchange.publish(aio_pika.Message(
+                    body=message,
+                    priority=priority,
+                ), routing_key=queue_name, timeout=self._publish_timeout)
+        except Exception as e:
+            metric.amqp_publish_failed(queue_name)
+            log.error(f'AMQP Publish to {queue_name=} failed: {e!r}, message={message.decode()}')
+            raise
+        finally:
+            metric.amqp_publish_in_flight(queue_name, -1)
+            metric.amqp_publish_time(queue_name, (datetime.now() - start_time).total_seconds() * 1000)
 
 
 amqp_publish_handler = AmqpPublishHandler()
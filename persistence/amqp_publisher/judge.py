@@ -1,3 +1,5 @@
+from typing import Sequence
+
 import common.do
 import common.const
 from util import serialize
@@ -11,3 +13,14 @@ async def send_judge(task: common.do.JudgeTask, language_queue_name: str, priori
         message=serialize.marshal(task).encode(),
         priority=priority,
     )
+
+
+async def send_judge_batch(tasks: Sequence[tuple[common.do.JudgeTask, str]],
+                           priority: int = common.const.PRIORITY_NONE):
+    """
+    :param tasks: judge task and language queue name of each task
+    """
+    await amqp_publish_handler.publish_batch([
+        (language_queue_name, serialize.marshal(task).encode(), priority)
+        for task, language_queue_name in tasks
+    ])
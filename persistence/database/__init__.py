@@ -66,9 +66,11 @@ from . import (
     submission,
     judgment,
     judge_case,
+    rejudge_job,
     essay,
     essay_submission,
     s3_file,
+    export_artifact,
 
     assisting_data,
 
@@ -81,6 +83,7 @@ from . import (
 
     announcement,
     access_log,
+    listener,
 
     view,
 )
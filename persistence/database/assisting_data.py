@@ -1,9 +1,9 @@
-from typing import Sequence
+from typing import Mapping, Sequence
 from uuid import UUID
 
 from base import do
 
-from .base import FetchAll, FetchOne, OnlyExecute
+from .base import AutoTxConnection, FetchAll, FetchOne, OnlyExecute
 
 
 async def browse(problem_id: int, include_deleted=False) -> Sequence[do.AssistingData]:
@@ -59,6 +59,47 @@ async def edit(assisting_data_id: int, s3_file_uuid: UUID, filename: str):
         pass
 
 
+async def import_files(problem_id: int, files: Mapping[str, UUID], cascading_conn=None) -> dict[str, int]:
+    """
+    Sets the file of the assisting data of the filenames, adding the assisting data if not exist.
+
+    :param files: filename -> s3 file uuid
+    :return: filename -> assisting data id
+    """
+    if cascading_conn:
+        return await _import_files(problem_id, files=files, conn=cascading_conn)
+
+    async with AutoTxConnection(event=f'import assisting data to problem {problem_id=}') as conn:
+        return await _import_files(problem_id, files=files, conn=conn)
+
+
+async def _import_files(problem_id: int, files: Mapping[str, UUID], conn) -> dict[str, int]:
+    assisting_data_ids = {}
+    for filename, s3_file_uuid in files.items():
+        assisting_data_id = await conn.fetchval(r'SELECT id'
+                                                r'  FROM assisting_data'
+                                                r' WHERE problem_id = $1'
+                                                r'   AND filename = $2'
+                                                r'   AND NOT is_deleted'
+                                                r' ORDER BY id ASC'
+                                                r' LIMIT 1'
+                                                r'   FOR UPDATE',
+                                                problem_id, filename)
+        if assisting_data_id is not None:
+            await conn.execute(r'UPDATE assisting_data'
+                               r'   SET s3_file_uuid = $1'
+                               r' WHERE id = $2',
+                               s3_file_uuid, assisting_data_id)
+        else:
+            assisting_data_id = await conn.fetchval(r'INSERT INTO assisting_data'
+                                                    r'            (problem_id, s3_file_uuid, filename, is_deleted)'
+                                                    r'     VALUES ($1, $2, $3, $4)'
+                                                    r'  RETURNING id',
+                                                    problem_id, s3_file_uuid, filename, False)
+        assisting_data_ids[filename] = assisting_data_id
+    return assisting_data_ids
+
+
 async def delete(assisting_data_id: int) -> None:
     async with OnlyExecute(
             event='soft delete assisting data',
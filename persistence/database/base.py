@@ -37,6 +37,7 @@ import asyncpg.transaction
 import exceptions as exc
 
 import util.metric
+from util import tracing
 
 from . import pool_handler
 
@@ -57,19 +58,28 @@ class AutoTxConnection:
         self._event = event
         self._conn: asyncpg.connection.Connection = None  # acquire in __aenter__
         self._transaction: asyncpg.transaction.Transaction = None  # acquire in __aenter__
+        self._span = tracing.span(f'db {event}', executor=self.__class__.__name__)
 
     async def __aenter__(self) -> asyncpg.connection.Connection:
-        self._conn: asyncpg.connection.Connection = await pool_handler.pool.acquire()
-        self._transaction = self._conn.transaction()
-        await self._transaction.__aenter__()
+        await self._span.__aenter__()
+        try:
+            self._conn: asyncpg.connection.Connection = await pool_handler.pool.acquire()
+            self._transaction = self._conn.transaction()
+            await self._transaction.__aenter__()
+        except Exception as e:
+            await self._span.__aexit__(type(e), e, e.__traceback__)
+            raise
 
         log.info(f"Starting {self.__class__.__name__}: {self._event}")
 
         return self._conn
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await self._transaction.__aexit__(exc_type, exc_value, traceback)
-        await pool_handler.pool.release(self._conn)
+        try:
+            await self._transaction.__aexit__(exc_type, exc_value, traceback)
+            await pool_handler.pool.release(self._conn)
+        finally:
+            await self._span.__aexit__(exc_type, exc_value, traceback)
 
         exec_time_ms = (datetime.now() - self._start_time).total_seconds() * 1000
         log.info(f"Ended {self.__class__.__name__}: {self._event} after {exec_time_ms} ms")
@@ -125,7 +135,8 @@ class _SafeExecutor:
 
         log.info(f"Starting {self.__class__.__name__}: {self._event}, sql: {self._sql}, params: {self._parameters}")
 
-        async with pool_handler.pool.acquire() as conn:
+        async with tracing.span(f'db {self._event}', executor=self.__class__.__name__, sql=self._sql), \
+                pool_handler.pool.acquire() as conn:
             try:
                 results = await self._exec(conn)
             except tuple(self._exception_mapping) as e:
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Sequence
+
+from base import do, enum
+
+from .base import FetchOne, FetchAll
+
+
+async def add(type_: enum.ExportArtifactType, target_id: int, fingerprint: str, bucket: str, key: str,
+              create_time: datetime) -> int:
+    async with FetchOne(
+            event='add export artifact',
+            sql=r'INSERT INTO export_artifact'
+                r'            (type, target_id, fingerprint, bucket, key, create_time)'
+                r'     VALUES (%(type)s, %(target_id)s, %(fingerprint)s, %(bucket)s, %(key)s, %(create_time)s)'
+                r'  RETURNING id',
+            type=type_, target_id=target_id, fingerprint=fingerprint, bucket=bucket, key=key,
+            create_time=create_time,
+    ) as (id_,):
+        return id_
+
+
+async def read_latest(type_: enum.ExportArtifactType, target_id: int, fingerprint: str,
+                      created_after: datetime) -> do.ExportArtifact:
+    async with FetchOne(
+            event='read latest export artifact',
+            sql=r'SELECT id, type, target_id, fingerprint, bucket, key, create_time'
+                r'  FROM export_artifact'
+                r' WHERE type = %(type)s'
+                r'   AND target_id = %(target_id)s'
+                r'   AND fingerprint = %(fingerprint)s'
+                r'   AND create_time > %(created_after)s'
+                r' ORDER BY create_time DESC'
+                r' LIMIT 1',
+            type=type_, target_id=target_id, fingerprint=fingerprint, created_after=created_after,
+    ) as (id_, type_, target_id, fingerprint, bucket, key, create_time):
+        return do.ExportArtifact(id=id_, type=enum.ExportArtifactType(type_), target_id=target_id,
+                                 fingerprint=fingerprint, bucket=bucket, key=key, create_time=create_time)
+
+
+async def delete_created_before(create_time: datetime) -> Sequence[do.ExportArtifact]:
+    """
+    :return: the deleted artifacts, for their objects to be deleted
+    """
+    async with FetchAll(
+            event='delete export artifacts created before',
+            sql=r'DELETE FROM export_artifact'
+                r' WHERE create_time < %(create_time)s'
+                r' RETURNING id, type, target_id, fingerprint, bucket, key, create_time',
+            create_time=create_time,
+            raise_not_found=False,
+    ) as records:
+        return [do.ExportArtifact(id=id_, type=enum.ExportArtifactType(type_), target_id=target_id,
+                                  fingerprint=fingerprint, bucket=bucket, key=key, create_time=create_time)
+                for id_, type_, target_id, fingerprint, bucket, key, create_time in records]
@@ -1,9 +1,14 @@
-from typing import Sequence, Tuple
+from typing import Optional, Sequence, Tuple
 from datetime import datetime
 
 from base import do, enum
 
-from .base import FetchOne, FetchAll, OnlyExecute
+from .base import AutoTxConnection, FetchOne, FetchAll, OnlyExecute
+
+
+# Notified with payload `{submission_id},{judgment_id},{problem_id}` when a judgment is added;
+# `pg_notify` is sent inside the adding transaction, so listeners only receive it once that transaction commits
+ADDED_CHANNEL = 'judgment_added'
 
 
 async def browse(submission_id: int) -> Sequence[do.Judgment]:
@@ -69,6 +74,35 @@ async def add(submission_id: int, verdict: enum.VerdictType, total_time: int, ma
         return judgment_id
 
 
+async def add_with_cases(submission_id: int, verdict: enum.VerdictType, total_time: int, max_memory: int,
+                         score: int, judge_time: datetime, error_message: Optional[str],
+                         judge_cases: Sequence[Tuple[int, enum.VerdictType, int, int, int]]) -> int:
+    """
+    Adds the judgment and its judge cases in one transaction, and notifies `ADDED_CHANNEL` on commit.
+
+    :param judge_cases: testcase_id, verdict, time_lapse, peak_memory, score of each judge case
+    """
+    async with AutoTxConnection(event='add judgment with cases') as conn:
+        judgment_id, = await conn.fetchrow(
+            r'INSERT INTO judgment (submission_id, verdict, total_time, max_memory,'
+            r'                      score, judge_time, error_message)'
+            r'     VALUES ($1, $2, $3, $4, $5, $6, $7)'
+            r'  RETURNING id',
+            submission_id, verdict, total_time, max_memory, score, judge_time, error_message,
+        )
+        await conn.executemany(
+            command=r'INSERT INTO judge_case (judgment_id, testcase_id, verdict, time_lapse, peak_memory, score)'
+                    r'     VALUES ($1, $2, $3, $4, $5, $6)',
+            args=[(judgment_id, testcase_id, case_verdict, time_lapse, peak_memory, case_score)
+                  for testcase_id, case_verdict, time_lapse, peak_memory, case_score in judge_cases],
+        )
+        await conn.execute(r"SELECT pg_notify($1, $2 || ',' || problem_id)"
+                           r'  FROM submission'
+                           r' WHERE id = $3',
+                           ADDED_CHANNEL, f'{submission_id},{judgment_id}', submission_id)
+        return judgment_id
+
+
 async def browse_cases(judgment_id: int) -> Sequence[do.JudgeCase]:
     async with FetchAll(
             event='browse judge cases',
@@ -383,3 +417,41 @@ async def get_class_all_team_submission_verdict_before_freeze(problem_id: int, c
         return [(team_id, submission_id, submit_time, enum.VerdictType(raw_verdict))
                 for team_id, submission_id, submit_time, raw_verdict in records]
 
+
+async def browse_class_team_runs(problem_id: int, class_id: int, team_ids: Sequence[int]) \
+        -> Sequence[Tuple[int, int, datetime, datetime, enum.VerdictType]]:
+    """
+    Judged submissions of the teams during the challenge, with their latest judgments
+
+    :return: list of (team_id, submission_id, submit_time, judge_time, verdict) ordered by submit time asc
+    """
+    cond_sql = ', '.join(str(team_id) for team_id in team_ids)
+    async with FetchAll(
+            event='browse class team runs',
+            sql=fr'SELECT team_member.team_id, submission.id, submission.submit_time, judgment.judge_time,'
+                fr'       judgment.verdict'
+                fr'  FROM team_member'
+                fr' INNER JOIN team'
+                fr'         ON team.id = team_member.team_id'
+                fr'        AND team.class_id = %(class_id)s'
+                fr'        AND team.id IN ( {f" {cond_sql}" if cond_sql else "NULL"} )'  # Return null when no team_id
+                fr'        AND NOT team.is_deleted'
+                fr' INNER JOIN submission'
+                fr'         ON team_member.member_id = submission.account_id'
+                fr'        AND submission.problem_id = %(problem_id)s'
+                fr' INNER JOIN problem'
+                fr'         ON problem.id = submission.problem_id'
+                fr'        AND NOT problem.is_deleted'
+                fr' INNER JOIN challenge'
+                fr'         ON challenge.id = problem.challenge_id'
+                fr'        AND submission.submit_time >= challenge.start_time'
+                fr'        AND submission.submit_time <= challenge.end_time'
+                fr' INNER JOIN judgment'
+                fr'         ON submission.id = judgment.submission_id'
+                fr'        AND submission_last_judgment_id(submission.id) = judgment.id'
+                fr' ORDER BY submission.submit_time',
+            class_id=class_id, problem_id=problem_id,
+            raise_not_found=False,
+    ) as records:
+        return [(team_id, submission_id, submit_time, judge_time, enum.VerdictType(raw_verdict))
+                for team_id, submission_id, submit_time, judge_time, raw_verdict in records]
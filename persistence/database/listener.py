@@ -0,0 +1,84 @@
+"""
+Receives Postgres `NOTIFY` on a dedicated connection, for cross-worker fan-out of events.
+"""
+
+import asyncio
+import collections
+from typing import Callable
+
+import asyncpg
+
+from base import mcs
+from config import DBConfig
+import log
+
+
+_RECONNECT_INTERVAL_SECS = 5
+
+
+class ListenHandler(metaclass=mcs.Singleton):
+    def __init__(self):
+        self._db_config: DBConfig = None
+        self._conn: asyncpg.connection.Connection = None  # Need to be init/closed manually
+        self._reconnect_task: asyncio.Task = None
+        self._callbacks: dict[str, set[Callable[[str], None]]] = collections.defaultdict(set)
+
+    async def initialize(self, db_config: DBConfig):
+        self._db_config = db_config
+        if self._conn is None:
+            await self._connect()
+
+    async def close(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await conn.close()
+
+    async def _connect(self):
+        self._conn = await asyncpg.connect(
+            host=self._db_config.host,
+            port=self._db_config.port,
+            user=self._db_config.username,
+            password=self._db_config.password,
+            database=self._db_config.db_name,
+        )
+        self._conn.add_termination_listener(self._on_terminated)
+        for channel in self._callbacks:
+            await self._conn.add_listener(channel, self._on_notification)
+
+    def _on_terminated(self, conn: asyncpg.connection.Connection):
+        if conn is not self._conn:  # closed manually
+            return
+        log.info('Listen connection terminated, reconnecting')
+        self._conn = None
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while self._conn is None:
+            try:
+                await self._connect()
+            except Exception as e:
+                log.exception(e, msg='Failed to reconnect listen connection', info_level=True)
+                await asyncio.sleep(_RECONNECT_INTERVAL_SECS)
+        self._reconnect_task = None
+
+    def _on_notification(self, _conn: asyncpg.connection.Connection, _pid: int, channel: str, payload: str):
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception as e:
+                log.exception(e, msg=f'Failed to handle notification of {channel=}, {payload=}')
+
+    async def listen(self, channel: str, callback: Callable[[str], None]):
+        """
+        Idempotent for the same callback; callbacks are called on the event loop and should not block.
+        """
+        is_new_channel = channel not in self._callbacks
+        self._callbacks[channel].add(callback)
+        if is_new_channel and self._conn is not None:
+            await self._conn.add_listener(channel, self._on_notification)
+
+
+listen_handler = ListenHandler()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from config import DBConfig
+from util import mock
+
+from . import listener
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.termination_listener = None
+        self.listeners = {}
+        self.closed = False
+
+    def add_termination_listener(self, callback):
+        self.termination_listener = callback
+
+    async def add_listener(self, channel: str, callback):
+        self.listeners[channel] = callback
+
+    async def close(self):
+        self.closed = True
+
+    def terminate(self):
+        self.termination_listener(self)
+
+    def notify(self, channel: str, payload: str):
+        self.listeners[channel](self, 0, channel, payload)
+
+
+class TestListenHandler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.db_config = DBConfig()
+        self.db_config.host = 'host'
+        self.db_config.port = 5432
+        self.db_config.username = 'username'
+        self.db_config.password = 'password'
+        self.db_config.db_name = 'db_name'
+        self.payloads = []
+
+    async def asyncTearDown(self) -> None:
+        await listener.listen_handler.close()
+        listener.listen_handler._callbacks.clear()
+
+    @staticmethod
+    def expect_connect(asyncpg):
+        return asyncpg.async_func('connect').call_with(
+            host='host', port=5432, user='username', password='password', database='db_name',
+        )
+
+    async def test_listen(self):
+        conn = _FakeConnection()
+
+        with (
+            mock.Controller() as controller,
+        ):
+            asyncpg = controller.mock_module('persistence.database.listener.asyncpg')
+
+            self.expect_connect(asyncpg).returns(conn)
+
+            await listener.listen_handler.initialize(db_config=self.db_config)
+            await listener.listen_handler.listen('channel', self.payloads.append)
+            await listener.listen_handler.listen('channel', self.payloads.append)
+            conn.notify('channel', 'payload')
+
+        self.assertEqual(self.payloads, ['payload'])
+
+    async def test_reconnect(self):
+        conn = _FakeConnection()
+        new_conn = _FakeConnection()
+        reconnected = asyncio.Event()
+
+        with (
+            mock.Controller() as controller,
+            patch.object(listener, '_RECONNECT_INTERVAL_SECS', 0),
+        ):
+            asyncpg = controller.mock_module('persistence.database.listener.asyncpg')
+            log = controller.mock_module('persistence.database.listener.log')
+
+            self.expect_connect(asyncpg).returns(conn)
+            log.func('info').call_with(mock.AnyInstanceOf(str)).returns(None)
+            self.expect_connect(asyncpg).raises(OSError)
+            log.func('exception').call_with(
+                mock.AnyInstanceOf(OSError), msg=mock.AnyInstanceOf(str), info_level=True,
+            ).returns(None)
+            self.expect_connect(asyncpg).executes(lambda **_: reconnected.set() or new_conn)
+
+            await listener.listen_handler.initialize(db_config=self.db_config)
+            await listener.listen_handler.listen('channel', self.payloads.append)
+            conn.terminate()
+            await asyncio.wait_for(reconnected.wait(), timeout=1)
+            await asyncio.sleep(0)  # Lets the reconnected connection listen
+
+            # Listens the channels again on the new connection
+            new_conn.notify('channel', 'payload')
+
+        self.assertEqual(self.payloads, ['payload'])
+        self.assertIsNone(listener.listen_handler._reconnect_task)
+
+    async def test_close(self):
+        conn = _FakeConnection()
+
+        with (
+            mock.Controller() as controller,
+        ):
+            asyncpg = controller.mock_module('persistence.database.listener.asyncpg')
+
+            self.expect_connect(asyncpg).returns(conn)
+
+            await listener.listen_handler.initialize(db_config=self.db_config)
+            await listener.listen_handler.close()
+            conn.terminate()  # Closed manually, not reconnected
+
+        self.assertTrue(conn.closed)
+        self.assertIsNone(listener.listen_handler._reconnect_task)
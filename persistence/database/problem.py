@@ -1,10 +1,11 @@
-from typing import Optional, Sequence, Tuple
+from typing import Mapping, Optional, Sequence, Tuple
 from datetime import datetime
+from uuid import UUID
 
 from base import do, enum
 from util import serialize
 
-from . import testcase
+from . import assisting_data, testcase
 from .base import AutoTxConnection, FetchOne, OnlyExecute, FetchAll, ParamDict
 
 
@@ -256,6 +257,31 @@ async def delete_cascade(problem_id: int) -> None:
                            True, problem_id)
 
 
+async def import_testcases_and_assisting_data(
+        problem_id: int, is_sample: bool, score: int, time_limit: int, memory_limit: int,
+        testcase_files: Mapping[str, tuple[Optional[UUID], Optional[str], Optional[UUID], Optional[str]]],
+        assisting_data_files: Mapping[str, UUID]) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    See `testcase.import_files` and `assisting_data.import_files`, in one transaction.
+
+    :return: label -> testcase id, filename -> assisting data id
+    """
+    async with AutoTxConnection(event=f'import testcases and assisting data to problem {problem_id=}') as conn:
+        # Serializes imports to the same problem, so that no testcase or assisting data is added twice
+        await conn.execute(r'SELECT id'
+                           r'  FROM problem'
+                           r' WHERE id = $1'
+                           r'   FOR UPDATE',
+                           problem_id)
+
+        testcase_ids = await testcase.import_files(problem_id=problem_id, is_sample=is_sample, score=score,
+                                                   time_limit=time_limit, memory_limit=memory_limit,
+                                                   files=testcase_files, cascading_conn=conn)
+        assisting_data_ids = await assisting_data.import_files(problem_id=problem_id, files=assisting_data_files,
+                                                               cascading_conn=conn)
+        return testcase_ids, assisting_data_ids
+
+
 async def delete_cascade_from_challenge(challenge_id: int, cascading_conn=None) -> None:
     if cascading_conn:
         await _delete_cascade_from_challenge(challenge_id, conn=cascading_conn)
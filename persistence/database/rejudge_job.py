@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Optional, Sequence
+
+from base import do, enum
+
+from .base import FetchAll, FetchOne, OnlyExecute
+
+
+async def add(problem_id: int, submitter_id: int, total_count: int, create_time: datetime) -> int:
+    async with FetchOne(
+            event='add rejudge job',
+            sql=r'INSERT INTO rejudge_job'
+                r'            (problem_id, submitter_id, status, total_count, published_count, skipped_count,'
+                r'             create_time, heartbeat_time)'
+                r'     VALUES (%(problem_id)s, %(submitter_id)s, %(status)s, %(total_count)s, 0, 0,'
+                r'             %(create_time)s, %(create_time)s)'
+                r'  RETURNING id',
+            problem_id=problem_id, submitter_id=submitter_id, status=enum.RejudgeJobStatus.running,
+            total_count=total_count, create_time=create_time,
+    ) as (id_,):
+        return id_
+
+
+async def read(rejudge_job_id: int) -> do.RejudgeJob:
+    async with FetchOne(
+            event='read rejudge job',
+            sql=r'SELECT id, problem_id, submitter_id, status, total_count, published_count, skipped_count,'
+                r'       create_time, finish_time, error_message'
+                r'  FROM rejudge_job'
+                r' WHERE id = %(rejudge_job_id)s',
+            rejudge_job_id=rejudge_job_id,
+    ) as (id_, problem_id, submitter_id, status, total_count, published_count, skipped_count,
+          create_time, finish_time, error_message):
+        return do.RejudgeJob(id=id_, problem_id=problem_id, submitter_id=submitter_id,
+                             status=enum.RejudgeJobStatus(status), total_count=total_count,
+                             published_count=published_count, skipped_count=skipped_count,
+                             create_time=create_time, finish_time=finish_time, error_message=error_message)
+
+
+async def edit_progress(rejudge_job_id: int, published_count: int, skipped_count: int,
+                        heartbeat_time: datetime) -> None:
+    async with OnlyExecute(
+            event='edit rejudge job progress',
+            sql=r'UPDATE rejudge_job'
+                r'   SET published_count = %(published_count)s, skipped_count = %(skipped_count)s,'
+                r'       heartbeat_time = %(heartbeat_time)s'
+                r' WHERE id = %(rejudge_job_id)s',
+            rejudge_job_id=rejudge_job_id, published_count=published_count, skipped_count=skipped_count,
+            heartbeat_time=heartbeat_time,
+    ):
+        pass
+
+
+async def finish(rejudge_job_id: int, status: enum.RejudgeJobStatus, finish_time: datetime,
+                 error_message: Optional[str] = None) -> None:
+    async with OnlyExecute(
+            event='finish rejudge job',
+            sql=r'UPDATE rejudge_job'
+                r'   SET status = %(status)s, finish_time = %(finish_time)s, error_message = %(error_message)s'
+                r' WHERE id = %(rejudge_job_id)s',
+            rejudge_job_id=rejudge_job_id, status=status, finish_time=finish_time, error_message=error_message,
+    ):
+        pass
+
+
+async def fail_stale(heartbeat_before: datetime, finish_time: datetime, error_message: str) -> Sequence[int]:
+    """
+    Marks the running jobs without heartbeat since `heartbeat_before` as failed.
+
+    :return: ids of the failed jobs
+    """
+    async with FetchAll(
+            event='fail stale rejudge jobs',
+            sql=r'UPDATE rejudge_job'
+                r'   SET status = %(failed)s, finish_time = %(finish_time)s, error_message = %(error_message)s'
+                r' WHERE status = %(running)s'
+                r'   AND heartbeat_time < %(heartbeat_before)s'
+                r' RETURNING id',
+            failed=enum.RejudgeJobStatus.failed, running=enum.RejudgeJobStatus.running,
+            heartbeat_before=heartbeat_before, finish_time=finish_time, error_message=error_message,
+            raise_not_found=False,  # Issue #134: return [] for browse
+    ) as records:
+        return [id_ for id_, in records]
@@ -3,7 +3,7 @@ from uuid import UUID
 
 from base import do
 
-from .base import AutoTxConnection, FetchOne, FetchAll
+from .base import AutoTxConnection, FetchOne, FetchAll, OnlyExecute
 
 
 async def browse() -> Sequence[do.S3File]:
@@ -45,6 +45,20 @@ async def read(s3_file_uuid: UUID) -> do.S3File:
         return do.S3File(uuid=uuid, bucket=bucket, key=key)
 
 
+async def read_by_content_hash(bucket: str, content_hash: str) -> do.S3File:
+    async with FetchOne(
+            event='read s3_file by content hash',
+            sql=r'SELECT uuid, bucket, key'
+                r'  FROM s3_file'
+                r' WHERE bucket = %(bucket)s'
+                r'   AND content_hash = %(content_hash)s'
+                r' ORDER BY uuid ASC'
+                r' LIMIT 1',
+            bucket=bucket, content_hash=content_hash,
+    ) as (uuid, bucket, key):
+        return do.S3File(uuid=uuid, bucket=bucket, key=key)
+
+
 async def add(bucket: str, key: str) -> UUID:
     async with FetchOne(
             event='add s3_file',
@@ -57,13 +71,66 @@ async def add(bucket: str, key: str) -> UUID:
         return uuid
 
 
-async def add_with_do(s3_file: do.S3File) -> UUID:
+async def add_with_do(s3_file: do.S3File, content_hash: str = None) -> UUID:
     async with FetchOne(
             event='add s3_file with uuid',
             sql=r'INSERT INTO s3_file'
-                r'            (uuid, bucket, key)'
-                r'     VALUES (%(uuid)s, %(bucket)s, %(key)s)'
+                r'            (uuid, bucket, key, content_hash)'
+                r'     VALUES (%(uuid)s, %(bucket)s, %(key)s, %(content_hash)s)'
                 r'  RETURNING uuid',
-            uuid=s3_file.uuid, bucket=s3_file.bucket, key=s3_file.key,
+            uuid=s3_file.uuid, bucket=s3_file.bucket, key=s3_file.key, content_hash=content_hash,
     ) as (uuid,):
         return uuid
+
+
+async def add_inline_content(s3_file_uuid: UUID, content: bytes) -> None:
+    async with OnlyExecute(
+            event='add s3_file inline content',
+            sql=r'INSERT INTO s3_file_inline'
+                r'            (s3_file_uuid, content)'
+                r'     VALUES (%(s3_file_uuid)s, %(content)s)'
+                r' ON CONFLICT (s3_file_uuid) DO NOTHING',
+            s3_file_uuid=s3_file_uuid, content=content,
+    ):
+        pass
+
+
+async def browse_inline_contents(s3_file_uuids: Iterable[UUID]) -> dict[UUID, bytes]:
+    """
+    :return: contents of the files kept inline, files not kept inline are omitted
+    """
+    async with FetchAll(
+            event='browse s3_file inline contents',
+            sql=r'SELECT s3_file_uuid, content'
+                r'  FROM s3_file_inline'
+                r' WHERE s3_file_uuid = ANY(%(s3_file_uuids)s)',
+            s3_file_uuids=list(s3_file_uuids),
+            raise_not_found=False,
+    ) as records:
+        return {s3_file_uuid: content for (s3_file_uuid, content) in records}
+
+
+async def browse_small_submission_files_not_inline(max_content_length: int, limit: int, after_uuid: UUID = None) \
+        -> Sequence[do.S3File]:
+    """
+    :param after_uuid: for paging, files are ordered by uuid
+    """
+    async with FetchAll(
+            event='browse small submission s3_files not inline',
+            sql=fr'SELECT DISTINCT s3_file.uuid, s3_file.bucket, s3_file.key'
+                fr'  FROM submission'
+                fr' INNER JOIN s3_file'
+                fr'         ON s3_file.uuid = submission.content_file_uuid'
+                fr'  LEFT JOIN s3_file_inline'
+                fr'         ON s3_file_inline.s3_file_uuid = s3_file.uuid'
+                fr' WHERE submission.content_length <= %(max_content_length)s'
+                fr'   AND s3_file_inline.s3_file_uuid IS NULL'
+                fr'{"   AND s3_file.uuid > %(after_uuid)s" if after_uuid else ""}'
+                fr' ORDER BY s3_file.uuid ASC'
+                fr' LIMIT %(limit)s',
+            max_content_length=max_content_length, after_uuid=after_uuid, limit=limit,
+            raise_not_found=False,
+    ) as records:
+        return [do.S3File(uuid=uuid, bucket=bucket, key=key)
+                for (uuid, bucket, key)
+                in records]
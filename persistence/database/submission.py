@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Sequence
+from typing import Optional, Sequence
 from uuid import UUID
 
 from base import do, enum
@@ -64,6 +64,20 @@ async def browse_language(include_disabled=True) -> Sequence[do.SubmissionLangua
                 for id_, name, version, is_disabled in records]
 
 
+async def browse_language_queue_name(include_disabled=True) -> dict[int, str]:
+    """
+    :return: language id -> queue name
+    """
+    async with FetchAll(
+            event='browse submission language queue name',
+            sql=fr'SELECT id, queue_name'
+                fr'  FROM submission_language'
+                fr'{" WHERE NOT is_disabled" if not include_disabled else ""}',
+            raise_not_found=False,
+    ) as records:
+        return {id_: queue_name for id_, queue_name in records}
+
+
 async def read_language(language_id: int, include_disabled=True) -> do.SubmissionLanguage:
     async with FetchOne(
             event='read submission language',
@@ -178,6 +192,27 @@ async def read(submission_id: int) -> do.Submission:
                              content_length=content_length, submit_time=submit_time)
 
 
+async def browse_account_and_class_ids(submission_ids: Sequence[int]) -> Sequence[tuple[int, int, Optional[int]]]:
+    """
+    :return: submission_id, account_id, class_id (None if the problem or challenge is deleted) of each submission
+    """
+    async with FetchAll(
+            event='browse submission account and class ids',
+            sql=r'SELECT submission.id, submission.account_id, challenge.class_id'
+                r'  FROM submission'
+                r'  LEFT JOIN problem'
+                r'         ON problem.id = submission.problem_id'
+                r'        AND NOT problem.is_deleted'
+                r'  LEFT JOIN challenge'
+                r'         ON challenge.id = problem.challenge_id'
+                r'        AND NOT challenge.is_deleted'
+                r' WHERE submission.id = ANY(%(submission_ids)s)',
+            submission_ids=list(submission_ids),
+            raise_not_found=False,  # Issue #134: return [] for browse
+    ) as records:
+        return [(submission_id, account_id, class_id) for submission_id, account_id, class_id in records]
+
+
 async def read_latest_judgment(submission_id: int) -> do.Judgment:
     async with FetchOne(
             event='read submission latest judgment',
@@ -251,6 +286,43 @@ async def browse_under_class(class_id: int,
     return data, total_count
 
 
+async def browse_under_problem_after(problem_id: int, after_id: int, limit: int) -> Sequence[do.Submission]:
+    """
+    Keyset pagination by submission id, for scanning through all submissions of a problem.
+    """
+    async with FetchAll(
+            event='browse submission under problem after id',
+            sql=r'SELECT id, account_id, problem_id, language_id, filename,'
+                r'       content_file_uuid, content_length, submit_time'
+                r'  FROM submission'
+                r' WHERE problem_id = %(problem_id)s'
+                r'   AND id > %(after_id)s'
+                r' ORDER BY id ASC'
+                r' LIMIT %(limit)s',
+            problem_id=problem_id, after_id=after_id, limit=limit,
+            raise_not_found=False,  # Issue #134: return [] for browse
+    ) as records:
+        return [do.Submission(id=id_, account_id=account_id, problem_id=problem_id, language_id=language_id,
+                              filename=filename, content_file_uuid=content_file_uuid, content_length=content_length,
+                              submit_time=submit_time)
+                for (id_, account_id, problem_id, language_id, filename, content_file_uuid, content_length, submit_time)
+                in records]
+
+
+async def count_under_problem(problem_id: int) -> int:
+    """
+    Exact count, unlike `execute_count` which may return an estimation for a large result.
+    """
+    async with FetchOne(
+            event='count submissions under problem',
+            sql=r'SELECT COUNT(*)'
+                r'  FROM submission'
+                r' WHERE problem_id = %(problem_id)s',
+            problem_id=problem_id,
+    ) as (count,):
+        return count
+
+
 async def browse_by_problem_selected(problem_id: int, selection_type: enum.TaskSelectionType, end_time: datetime) \
         -> Sequence[do.Submission]:
     """
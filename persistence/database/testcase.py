@@ -1,4 +1,4 @@
-from typing import Sequence, Optional
+from typing import Mapping, Sequence, Optional
 from uuid import UUID
 
 from base import do
@@ -170,6 +170,62 @@ async def delete_output_data(testcase_id: int) -> None:
         pass
 
 
+async def import_files(problem_id: int, is_sample: bool, score: int, time_limit: int, memory_limit: int,
+                       files: Mapping[str, tuple[Optional[UUID], Optional[str], Optional[UUID], Optional[str]]],
+                       cascading_conn=None) -> dict[str, int]:
+    """
+    Sets the data of the testcases of the labels, adding the testcases (with the given settings) if not exist.
+
+    :param files: label -> input file uuid, input filename, output file uuid, output filename; None to keep
+    :return: label -> testcase id
+    """
+    if cascading_conn:
+        return await _import_files(problem_id, is_sample=is_sample, score=score, time_limit=time_limit,
+                                   memory_limit=memory_limit, files=files, conn=cascading_conn)
+
+    async with AutoTxConnection(event=f'import testcase files to problem {problem_id=}') as conn:
+        return await _import_files(problem_id, is_sample=is_sample, score=score, time_limit=time_limit,
+                                   memory_limit=memory_limit, files=files, conn=conn)
+
+
+async def _import_files(problem_id: int, is_sample: bool, score: int, time_limit: int, memory_limit: int,
+                        files: Mapping[str, tuple[Optional[UUID], Optional[str], Optional[UUID], Optional[str]]],
+                        conn) -> dict[str, int]:
+    testcase_ids = {}
+    for label, (input_file_uuid, input_filename, output_file_uuid, output_filename) in files.items():
+        testcase_id = await conn.fetchval(r'SELECT id'
+                                          r'  FROM testcase'
+                                          r' WHERE problem_id = $1'
+                                          r'   AND is_sample = $2'
+                                          r'   AND label = $3'
+                                          r'   AND NOT is_deleted'
+                                          r' ORDER BY id ASC'
+                                          r' LIMIT 1'
+                                          r'   FOR UPDATE',
+                                          problem_id, is_sample, label)
+        if testcase_id is not None:
+            await conn.execute(r'UPDATE testcase'
+                               r'   SET input_file_uuid = COALESCE($1, input_file_uuid),'
+                               r'       input_filename = COALESCE($2, input_filename),'
+                               r'       output_file_uuid = COALESCE($3, output_file_uuid),'
+                               r'       output_filename = COALESCE($4, output_filename)'
+                               r' WHERE id = $5',
+                               input_file_uuid, input_filename, output_file_uuid, output_filename, testcase_id)
+        else:
+            testcase_id = await conn.fetchval(r'INSERT INTO testcase'
+                                              r'            (problem_id, is_sample, score, label,'
+                                              r'             input_file_uuid, input_filename,'
+                                              r'             output_file_uuid, output_filename,'
+                                              r'             time_limit, memory_limit, is_disabled)'
+                                              r'     VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)'
+                                              r'  RETURNING id',
+                                              problem_id, is_sample, score, label,
+                                              input_file_uuid, input_filename, output_file_uuid, output_filename,
+                                              time_limit, memory_limit, False)
+        testcase_ids[label] = testcase_id
+    return testcase_ids
+
+
 async def delete_cascade_from_problem(problem_id: int, cascading_conn=None) -> None:
     if cascading_conn:
         await _delete_cascade_from_problem(problem_id, conn=cascading_conn)
@@ -4,6 +4,7 @@ import aiosmtplib.smtp
 from base import mcs
 from config import SMTPConfig
 import log
+from util import tracing
 
 
 class SMTPHandler(metaclass=mcs.Singleton):
@@ -35,10 +36,11 @@ class SMTPHandler(metaclass=mcs.Singleton):
             timeout: aiosmtplib.smtp.Optional[
                 aiosmtplib.smtp.Union[float, aiosmtplib.smtp.Default]] = aiosmtplib.smtp._default,
     ):
-        client = await self.get_client()
-        responses, data_log = await client.send_message(message=message, sender=sender, recipients=recipients,
-                                                        mail_options=mail_options, rcpt_options=rcpt_options,
-                                                        timeout=timeout)
+        async with tracing.span('smtp send_message'):
+            client = await self.get_client()
+            responses, data_log = await client.send_message(message=message, sender=sender, recipients=recipients,
+                                                            mail_options=mail_options, rcpt_options=rcpt_options,
+                                                            timeout=timeout)
         log.info(f'Mail sent, server response: {data_log}')
         for address, (code, resp) in responses.items():
             if code != 200:
@@ -1,70 +1,187 @@
+import contextlib
+from datetime import datetime
+from typing import AsyncIterator, Sequence, Union
+
 import aioboto3
+from aiobotocore.response import StreamingBody
+import botocore.config
 
 from base import mcs
 from config import S3Config
+from util import metric, tracing
+
+from .disk_cache import CachedFile, CacheWriter, DiskCache
+
+
+@contextlib.asynccontextmanager
+async def _operation(operation: str, bucket: str, key: str, **attributes):
+    start_time = datetime.now()
+    try:
+        async with tracing.span(f's3 {operation}', bucket=bucket, key=key, **attributes):
+            yield
+    except Exception:
+        metric.s3_operation_failed(operation)
+        raise
+    finally:
+        metric.s3_operation_time(operation, (datetime.now() - start_time).total_seconds() * 1000)
+
+
+class _CachingBody:
+    """
+    Writes what is read from the body into the disk cache
+    """
+
+    def __init__(self, body: StreamingBody, cache_writer: CacheWriter):
+        self._body = body
+        self._cache_writer = cache_writer
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk = await self._body.read(size)
+        await self._cache_writer.write(chunk)
+        return chunk
 
 
 class S3Handler(metaclass=mcs.Singleton):
     def __init__(self):
         self._session = aioboto3.Session()
         self._client = None  # Need to be init/closed manually
-        self._resource = None  # Need to be init/closed manually
-
-        self._buckets = {}
+        self._disk_cache: DiskCache = None  # Disabled if not configured
 
     async def initialize(self, s3_config: S3Config):
+        # One client for all the operations, sharing its connection pool
         self._client = await self._session.client(
             's3',
             endpoint_url=s3_config.endpoint,
             aws_access_key_id=s3_config.access_key,
             aws_secret_access_key=s3_config.secret_key,
+            config=botocore.config.Config(
+                max_pool_connections=s3_config.max_pool_connections,
+                connect_timeout=s3_config.connect_timeout,
+                read_timeout=s3_config.read_timeout,
+                retries={'max_attempts': s3_config.max_attempts, 'mode': 'standard'},
+            ),
         ).__aenter__()
-        self._resource = await self._session.resource(
-            's3',
-            endpoint_url=s3_config.endpoint,
-            aws_access_key_id=s3_config.access_key,
-            aws_secret_access_key=s3_config.secret_key,
-        ).__aenter__()
+        if s3_config.disk_cache_dir:
+            self._disk_cache = DiskCache(s3_config.disk_cache_dir, max_bytes=s3_config.disk_cache_max_bytes)
+            await self._disk_cache.initialize()
 
     async def close(self):
         if self._client is not None:
             await self._client.close()
-        if self._resource is not None:
-            await self._resource.close()
 
-    async def create_bucket(self, bucket_name):
-        return await self._resource.Bucket(bucket_name)
+    async def sign_url(self, bucket: str, key: str, as_filename: str, expire_secs: int, as_attachment: bool) -> str:
+        async with _operation('sign_url', bucket=bucket, key=key):
+            return await self._client.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': bucket,
+                    'Key': key,
+                    'ResponseContentDisposition': f'{"attachment;" if as_attachment else ""}'
+                                                  f'filename="{as_filename}";',
+                },
+                ExpiresIn=expire_secs,
+            )
 
-    async def get_bucket(self, bucket_name):
+    async def get_file_content(self, bucket: str, key: str) -> bytes:
         """
-        If the bucket requested is not yet created, will create the bucket.
+        Served from the disk cache if configured; objects should not be modified after put.
         """
-        try:
-            return self._buckets[bucket_name]
-        except KeyError:
-            bucket = await self.create_bucket(bucket_name)
-            self._buckets[bucket_name] = bucket
-            return bucket
+        if self._disk_cache is not None:
+            infile_content = await self._disk_cache.get(bucket, key)
+            if infile_content is not None:
+                return infile_content
+
+        async with _operation('get_object', bucket=bucket, key=key):
+            infile_object = await self._client.get_object(Bucket=bucket, Key=key)
+            infile_content = await infile_object['Body'].read()
+        metric.s3_operation_bytes('get_object', len(infile_content))
+
+        if self._disk_cache is not None:
+            await self._disk_cache.put(bucket, key, infile_content)
+        return infile_content
 
-    async def sign_url(self, bucket: str, key: str, as_filename: str, expire_secs: int, as_attachment: bool) -> str:
-        return await self._client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': bucket,
-                'Key': key,
-                'ResponseContentDisposition': f'{"attachment;" if as_attachment else ""}'
-                                              f'filename="{as_filename}";',
-            },
-            ExpiresIn=expire_secs,
-        )
+    @contextlib.asynccontextmanager
+    async def get_object_stream(self, bucket: str, key: str) \
+            -> AsyncIterator[tuple[int, Union[StreamingBody, CachedFile]]]:
+        """
+        Served from the disk cache if configured, and objects small enough are cached once fully read;
+        objects should not be modified after put.
 
-    async def get_file_content(self, bucket: str, key: str) -> bytes:
-        infile_object = await self._client.get_object(Bucket=bucket, Key=key)
-        infile_content = await infile_object['Body'].read()
-        return infile_content
+        :return: content length, and the body to be read in chunks with `await body.read(chunk_size)`
+        """
+        if self._disk_cache is not None:
+            cached_file = await self._disk_cache.open(bucket, key)
+            if cached_file is not None:
+                with contextlib.closing(cached_file):
+                    yield cached_file.size, cached_file
+                return
+
+        async with _operation('get_object_stream', bucket=bucket, key=key):
+            infile_object = await self._client.get_object(Bucket=bucket, Key=key)
+        content_length = infile_object['ContentLength']
+        metric.s3_operation_bytes('get_object_stream', content_length)
+
+        cache_writer = None
+        if self._disk_cache is not None and content_length <= self._disk_cache.max_object_bytes:
+            cache_writer = self._disk_cache.writer(bucket, key)
+
+        async with tracing.span('s3 read_object_stream', bucket=bucket, key=key):
+            async with infile_object['Body'] as body:
+                if cache_writer is None:
+                    yield content_length, body
+                    return
+
+                try:
+                    yield content_length, _CachingBody(body, cache_writer)
+                except BaseException:
+                    await cache_writer.discard()
+                    raise
+                if cache_writer.size == content_length:
+                    await cache_writer.commit()
+                else:  # Not fully read
+                    await cache_writer.discard()
+
+    async def put_object(self, bucket: str, key: str, body: bytes) -> None:
+        async with _operation('put_object', bucket=bucket, key=key, size=len(body)):
+            await self._client.put_object(Bucket=bucket, Key=key, Body=body)
+        metric.s3_operation_bytes('put_object', len(body))
+
+    async def delete_object(self, bucket: str, key: str) -> None:
+        async with _operation('delete_object', bucket=bucket, key=key):
+            await self._client.delete_object(Bucket=bucket, Key=key)
+        if self._disk_cache is not None:
+            await self._disk_cache.discard(bucket, key)
+
+    async def create_multipart_upload(self, bucket: str, key: str) -> str:
+        """
+        :return: upload id
+        """
+        async with _operation('create_multipart_upload', bucket=bucket, key=key):
+            response = await self._client.create_multipart_upload(Bucket=bucket, Key=key)
+        return response['UploadId']
 
-    async def put_object(self, bucket: str, key: str, body) -> None:
-        await self._client.put_object(Bucket=bucket, Key=key, Body=body)
+    async def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, body: bytes) -> str:
+        """
+        :return: etag of the part
+        """
+        async with _operation('upload_part', bucket=bucket, key=key, part_number=part_number, size=len(body)):
+            response = await self._client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id,
+                                                      PartNumber=part_number, Body=body)
+        metric.s3_operation_bytes('upload_part', len(body))
+        return response['ETag']
+
+    async def complete_multipart_upload(self, bucket: str, key: str, upload_id: str,
+                                        part_etags: Sequence[str]) -> None:
+        async with _operation('complete_multipart_upload', bucket=bucket, key=key, parts=len(part_etags)):
+            await self._client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': [{'PartNumber': i, 'ETag': etag}
+                                           for i, etag in enumerate(part_etags, start=1)]},
+            )
+
+    async def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        async with _operation('abort_multipart_upload', bucket=bucket, key=key):
+            await self._client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
 
 
 s3_handler = S3Handler()
@@ -0,0 +1,247 @@
+"""
+A size-bounded on-disk cache of S3 object contents, shared by all the workers on the host.
+
+Object keys are uuids and objects are never modified, so cached files are never invalidated,
+only evicted (least recently used first) when the cache grows over its size.
+"""
+
+import contextlib
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Optional
+
+import log
+from util import executor, metric
+
+
+_LOCK_FILENAME = '.lock'
+_TEMP_PREFIX = '.tmp-'
+_STALE_TEMP_SECS = 60 * 60  # Left by workers killed during write
+
+_EVICT_TO_RATIO = 0.9  # Evict a bit more than needed, so that not every write evicts
+_SCAN_WRITTEN_RATIO = 0.1  # Each worker re-scans the cache after writing this ratio of size, also the max object size
+
+
+class CachedFile:
+    """
+    A cached object opened for reading, read in chunks like a `StreamingBody` with `await body.read(chunk_size)`
+    """
+
+    def __init__(self, file: BinaryIO, size: int):
+        self._file = file
+        self.size = size
+
+    async def read(self, size: int = -1) -> bytes:
+        return await executor.run_cpu(executor.DISK, self._file.read, size)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CacheWriter:
+    """
+    Writes an object into the cache in chunks; the object is cached only if committed.
+    """
+
+    def __init__(self, cache: 'DiskCache', bucket: str, key: str):
+        self._cache = cache
+        self._bucket = bucket
+        self._key = key
+        self._file: BinaryIO = None
+        self._temp_path: str = None
+        self.size = 0
+
+    async def write(self, chunk: bytes) -> None:
+        if self._file is None:
+            self._file, self._temp_path = await executor.run_cpu(executor.DISK, self._cache._open_temp,
+                                                                 self._bucket, self._key)
+        await executor.run_cpu(executor.DISK, self._file.write, chunk)
+        self.size += len(chunk)
+
+    async def commit(self) -> None:
+        if self._file is None:
+            return
+        try:
+            await executor.run_cpu(executor.DISK, self._cache._commit_temp, self._file, self._temp_path,
+                                   self._bucket, self._key, self.size)
+        except OSError as e:
+            log.exception(e, msg=f'Failed to write disk cache of {self._bucket=} {self._key=}', info_level=True)
+        self._file = None
+
+    async def discard(self) -> None:
+        if self._file is None:
+            return
+        await executor.run_cpu(executor.DISK, self._cache._discard_temp, self._file, self._temp_path)
+        self._file = None
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._written_bytes = 0  # Updated from the DISK pool threads
+        self._written_lock = threading.Lock()
+
+    @property
+    def max_object_bytes(self) -> int:
+        return int(self._max_bytes * _SCAN_WRITTEN_RATIO)
+
+    async def initialize(self):
+        os.makedirs(self._directory, exist_ok=True)
+        await executor.run_cpu(executor.DISK, self._evict)
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        try:
+            content = await executor.run_cpu(executor.DISK, self._read, bucket, key)
+        except OSError as e:
+            log.exception(e, msg=f'Failed to read disk cache of {bucket=} {key=}', info_level=True)
+            content = None
+
+        metric.s3_disk_cache(hit=content is not None)
+        return content
+
+    async def open(self, bucket: str, key: str) -> Optional[CachedFile]:
+        """
+        :return: the cached file to be closed by the caller, or None if not cached
+        """
+        try:
+            cached_file = await executor.run_cpu(executor.DISK, self._open, bucket, key)
+        except OSError as e:
+            log.exception(e, msg=f'Failed to open disk cache of {bucket=} {key=}', info_level=True)
+            cached_file = None
+
+        metric.s3_disk_cache(hit=cached_file is not None)
+        return cached_file
+
+    def writer(self, bucket: str, key: str) -> CacheWriter:
+        """
+        For objects of at most `max_object_bytes`, e.g. when streaming an object from S3.
+        """
+        return CacheWriter(self, bucket, key)
+
+    async def put(self, bucket: str, key: str, content: bytes) -> None:
+        if len(content) > self.max_object_bytes:
+            return
+
+        try:
+            await executor.run_cpu(executor.DISK, self._write, bucket, key, content)
+        except OSError as e:
+            log.exception(e, msg=f'Failed to write disk cache of {bucket=} {key=}', info_level=True)
+
+    async def discard(self, bucket: str, key: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            await executor.run_cpu(executor.DISK, os.unlink, self._path(bucket, key))
+
+    def _path(self, bucket: str, key: str) -> str:
+        digest = hashlib.sha1(f'{bucket}/{key}'.encode()).hexdigest()
+        return os.path.join(self._directory, digest[:2], digest)
+
+    def _read(self, bucket: str, key: str) -> Optional[bytes]:
+        try:
+            file = open(self._path(bucket, key), 'rb')
+        except FileNotFoundError:
+            return None
+
+        with file:
+            os.utime(file.fileno())  # Modify time is used as last access time for eviction
+            return file.read()
+
+    def _open(self, bucket: str, key: str) -> Optional[CachedFile]:
+        try:
+            file = open(self._path(bucket, key), 'rb')
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(file.fileno())  # Modify time is used as last access time for eviction
+            return CachedFile(file, size=os.fstat(file.fileno()).st_size)
+        except BaseException:
+            file.close()
+            raise
+
+    def _write(self, bucket: str, key: str, content: bytes) -> None:
+        file, temp_path = self._open_temp(bucket, key)
+        try:
+            file.write(content)
+        except BaseException:
+            self._discard_temp(file, temp_path)
+            raise
+        self._commit_temp(file, temp_path, bucket, key, len(content))
+
+    def _open_temp(self, bucket: str, key: str) -> tuple[BinaryIO, str]:
+        directory = os.path.dirname(self._path(bucket, key))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=_TEMP_PREFIX)
+        return os.fdopen(fd, 'wb'), temp_path
+
+    def _commit_temp(self, file: BinaryIO, temp_path: str, bucket: str, key: str, size: int) -> None:
+        try:
+            file.close()
+            # Atomic, so other workers see either no file or the whole file
+            os.replace(temp_path, self._path(bucket, key))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_path)
+            raise
+
+        with self._written_lock:
+            self._written_bytes += size
+            if self._written_bytes < self.max_object_bytes:
+                return
+            self._written_bytes = 0
+        self._evict()
+
+    @staticmethod
+    def _discard_temp(file: BinaryIO, temp_path: str) -> None:
+        file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_path)
+
+    def _evict(self) -> None:
+        with open(os.path.join(self._directory, _LOCK_FILENAME), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:  # Another worker is evicting
+                return
+
+            now = time.time()
+            entries = []
+            total_bytes = 0
+            for path in self._cached_paths():
+                try:
+                    stat = os.stat(path)
+                    if os.path.basename(path).startswith(_TEMP_PREFIX):
+                        if now - stat.st_mtime > _STALE_TEMP_SECS:
+                            os.unlink(path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_bytes += stat.st_size
+
+            evicted_bytes = 0
+            if total_bytes > self._max_bytes:
+                entries.sort()
+                for _mtime, size, path in entries:
+                    if total_bytes <= self._max_bytes * _EVICT_TO_RATIO:
+                        break
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(path)
+                    total_bytes -= size
+                    evicted_bytes += size
+
+            metric.s3_disk_cache_size(size=total_bytes, evicted=evicted_bytes)
+
+    def _cached_paths(self) -> list[str]:
+        with os.scandir(self._directory) as subdirs:
+            subdir_paths = [subdir.path for subdir in subdirs if subdir.is_dir()]
+
+        paths = []
+        for subdir_path in subdir_paths:
+            with os.scandir(subdir_path) as entries:
+                paths += [entry.path for entry in entries]
+        return paths
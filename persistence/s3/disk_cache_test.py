@@ -0,0 +1,155 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from . import disk_cache, s3_handler
+
+
+class TestDiskCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = disk_cache.DiskCache(self.directory.name, max_bytes=100)
+        await self.cache.initialize()
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_happy_flow(self):
+        self.assertIsNone(await self.cache.get('bucket', 'key'))
+
+        await self.cache.put('bucket', 'key', b'content')
+        await self.cache.put('bucket', 'small', b'c')
+
+        self.assertEqual(await self.cache.get('bucket', 'key'), b'content')
+        self.assertEqual(await self.cache.get('bucket', 'small'), b'c')
+        self.assertIsNone(await self.cache.get('other', 'key'))
+
+    async def test_discard(self):
+        await self.cache.put('bucket', 'key', b'content')
+        await self.cache.discard('bucket', 'key')
+        await self.cache.discard('bucket', 'key')
+
+        self.assertIsNone(await self.cache.get('bucket', 'key'))
+
+    async def test_too_large(self):
+        await self.cache.put('bucket', 'key', b'c' * 11)
+
+        self.assertIsNone(await self.cache.get('bucket', 'key'))
+
+    async def test_evict_least_recently_used(self):
+        for i in range(10):
+            await self.cache.put('bucket', str(i), b'c' * 10)
+            os.utime(self.cache._path('bucket', str(i)), (i, i))
+        await self.cache.get('bucket', '0')  # now most recently used
+
+        await self.cache.put('bucket', 'new', b'c' * 10)
+
+        self.assertIsNotNone(await self.cache.get('bucket', '0'))
+        self.assertIsNone(await self.cache.get('bucket', '1'))
+        self.assertIsNone(await self.cache.get('bucket', '2'))
+        self.assertIsNotNone(await self.cache.get('bucket', '3'))
+        self.assertIsNotNone(await self.cache.get('bucket', 'new'))
+
+    async def test_open(self):
+        self.assertIsNone(await self.cache.open('bucket', 'key'))
+
+        await self.cache.put('bucket', 'key', b'content')
+        cached_file = await self.cache.open('bucket', 'key')
+
+        self.assertEqual(cached_file.size, 7)
+        self.assertEqual(await cached_file.read(4), b'cont')
+        self.assertEqual(await cached_file.read(4), b'ent')
+        cached_file.close()
+
+    async def test_writer(self):
+        cache_writer = self.cache.writer('bucket', 'key')
+        await cache_writer.write(b'cont')
+        self.assertIsNone(await self.cache.get('bucket', 'key'))  # Not committed yet
+
+        await cache_writer.write(b'ent')
+        await cache_writer.commit()
+
+        self.assertEqual(await self.cache.get('bucket', 'key'), b'content')
+
+    async def test_writer_discard(self):
+        cache_writer = self.cache.writer('bucket', 'key')
+        await cache_writer.write(b'cont')
+        await cache_writer.discard()
+
+        self.assertIsNone(await self.cache.get('bucket', 'key'))
+        self.assertEqual(os.listdir(os.path.dirname(self.cache._path('bucket', 'key'))), [])
+
+
+class _FakeBody:
+    def __init__(self, content: bytes):
+        self._file = io.BytesIO(content)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+class _FakeClient:
+    def __init__(self, objects: dict[tuple[str, str], bytes]):
+        self.objects = objects
+        self.get_count = 0
+
+    async def get_object(self, Bucket: str, Key: str):
+        self.get_count += 1
+        content = self.objects[Bucket, Key]
+        return {'ContentLength': len(content), 'Body': _FakeBody(content)}
+
+
+class TestGetObjectStream(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = disk_cache.DiskCache(self.directory.name, max_bytes=100)
+        await self.cache.initialize()
+        self.client = _FakeClient({('bucket', 'key'): b'content', ('bucket', 'large'): b'c' * 11})
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def read_stream(self, key: str, chunk_size: int = 3, limit: int = None) -> bytes:
+        chunks = []
+        async with s3_handler.get_object_stream(bucket='bucket', key=key) as (content_length, body):
+            while (limit is None or len(chunks) < limit) and (chunk := await body.read(chunk_size)):
+                chunks.append(chunk)
+        return b''.join(chunks)
+
+    async def test_cached(self):
+        with (
+            patch.object(s3_handler, '_client', self.client),
+            patch.object(s3_handler, '_disk_cache', self.cache),
+        ):
+            self.assertEqual(await self.read_stream('key'), b'content')
+            self.assertEqual(await self.read_stream('key'), b'content')
+
+        self.assertEqual(self.client.get_count, 1)
+
+    async def test_not_fully_read(self):
+        with (
+            patch.object(s3_handler, '_client', self.client),
+            patch.object(s3_handler, '_disk_cache', self.cache),
+        ):
+            self.assertEqual(await self.read_stream('key', limit=1), b'con')
+            self.assertEqual(await self.read_stream('key'), b'content')
+
+        self.assertEqual(self.client.get_count, 2)
+
+    async def test_too_large(self):
+        with (
+            patch.object(s3_handler, '_client', self.client),
+            patch.object(s3_handler, '_disk_cache', self.cache),
+        ):
+            self.assertEqual(await self.read_stream('large'), b'c' * 11)
+            self.assertEqual(await self.read_stream('large'), b'c' * 11)
+
+        self.assertEqual(self.client.get_count, 2)
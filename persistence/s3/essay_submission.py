@@ -8,8 +8,8 @@ from base import do
 from . import tools
 
 
-_BUCKET_NAME = 'essay-submission'
+BUCKET_NAME = 'essay-submission'
 
 
 async def upload(file: typing.IO, file_uuid: Optional[UUID] = None) -> do.S3File:
-    return await tools.upload(bucket_name=_BUCKET_NAME, file=file, file_uuid=file_uuid or uuid.uuid4())
+    return await tools.upload(bucket_name=BUCKET_NAME, file=file, file_uuid=file_uuid or uuid.uuid4())
@@ -3,6 +3,7 @@ import typing
 from typing import Optional
 import uuid
 from uuid import UUID
+import zipfile
 
 from base import do
 import log
@@ -10,11 +11,19 @@ import log
 from . import s3_handler, tools
 
 
-_BUCKET_NAME = 'temp'
+BUCKET_NAME = 'temp'
 
 
 async def upload(file: typing.IO, file_uuid: Optional[UUID] = None) -> do.S3File:
-    return await tools.upload(bucket_name=_BUCKET_NAME, file=file, file_uuid=file_uuid or uuid.uuid4())
+    return await tools.upload(bucket_name=BUCKET_NAME, file=file, file_uuid=file_uuid or uuid.uuid4())
+
+
+def zip_uploader(file_uuid: Optional[UUID] = None, compression: int = zipfile.ZIP_STORED) -> tools.ZipUploader:
+    return tools.ZipUploader(bucket_name=BUCKET_NAME, file_uuid=file_uuid or uuid.uuid4(), compression=compression)
+
+
+async def zipper(files: dict[str, do.S3File], file_uuid: Optional[UUID] = None) -> do.S3File:
+    return await tools.zipper(files=files, bucket_name=BUCKET_NAME, file_uuid=file_uuid or uuid.uuid4())
 
 
 async def put_object(body, file_uuid: Optional[UUID] = None) -> do.S3File:
@@ -28,9 +37,9 @@ async def put_object(body, file_uuid: Optional[UUID] = None) -> do.S3File:
         file_uuid = uuid.uuid4()
 
     key = str(file_uuid)
-    await s3_handler.put_object(bucket=_BUCKET_NAME, key=key, body=body)
+    await s3_handler.put_object(bucket=BUCKET_NAME, key=key, body=body)
 
     exec_time_ms = (datetime.now() - start_time).total_seconds() * 1000
     log.info(f'Ended put S3 file after {exec_time_ms} ms')
 
-    return do.S3File(uuid=file_uuid, bucket=_BUCKET_NAME, key=key)
+    return do.S3File(uuid=file_uuid, bucket=BUCKET_NAME, key=key)
@@ -1,18 +1,47 @@
+import asyncio
+import collections
 import io
+import tempfile
+import time
 import zipfile
 import typing
 from uuid import UUID
 from datetime import datetime
 
+import botocore.exceptions
+import cachetools
+
+from config import s3_config
 import const
 import log
 from base import do
+from util import executor, metric, tracing
 
 from . import s3_handler
 
 
+_FETCH_RETRY_BACKOFF_SECS = 0.5
+
+_T = typing.TypeVar('_T')
+
+
+# (bucket, key, filename, as_attachment) -> (signed url, expire time in time.monotonic())
+_signed_urls: cachetools.LRUCache[tuple[str, str, str, bool], tuple[str, float]] = \
+    cachetools.LRUCache(maxsize=const.S3_SIGN_URL_CACHE_SIZE)
+
+
 async def sign_url(bucket: str, key: str, filename: str, as_attachment: bool, expire_secs: int = const.S3_EXPIRE_SECS) \
         -> str:
+    """
+    Reuses a cached signed url if it lasts at least `expire_secs - const.S3_SIGN_URL_REUSE_SECS` more seconds.
+    """
+    cache_key = (bucket, key, filename, as_attachment)
+    now = time.monotonic()
+    if (cached := _signed_urls.get(cache_key)) and cached[1] - now >= expire_secs - const.S3_SIGN_URL_REUSE_SECS:
+        metric.s3_sign_url_cache(hit=True)
+        return cached[0]
+    metric.s3_sign_url_cache(hit=False)
+
     start_time = datetime.now()
     log.info('Start getting S3 file sign url ...')
 
@@ -23,6 +52,7 @@ async def sign_url(bucket: str, key: str, filename: str, as_attachment: bool, ex
         expire_secs=expire_secs,
         as_attachment=as_attachment,
     )
+    _signed_urls[cache_key] = (sign_url, now + expire_secs)
 
     exec_time_ms = (datetime.now() - start_time).total_seconds() * 1000
     log.info(f'Ended get S3 file {sign_url=} after {exec_time_ms} ms')
@@ -55,16 +85,238 @@ async def get_file_content_from_do(s3_file: do.S3File) -> bytes:
     return await s3_handler.get_file_content(bucket=s3_file.bucket, key=s3_file.key)
 
 
+async def _with_retry(s3_file: do.S3File, fetch: typing.Callable[[], typing.Awaitable[_T]], retries: int,
+                      event: str) -> _T:
+    for retried in range(retries + 1):
+        try:
+            return await fetch()
+        except botocore.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', 'NoSuchBucket') or retried == retries:
+                raise
+            error = e
+        except Exception as e:
+            if retried == retries:
+                raise
+            error = e
+
+        metric.s3_fetch_retried(event)
+        log.info(f'Retrying fetching S3 file {s3_file.bucket=} {s3_file.key=} after {error!r}')
+        await asyncio.sleep(_FETCH_RETRY_BACKOFF_SECS * 2 ** retried)
+
+
+async def _prefetch(items: typing.Sequence[typing.Any], fetch: typing.Callable[[typing.Any], typing.Awaitable[_T]],
+                    ordered: bool, concurrency: int, discard: typing.Callable[[_T], None] = None) \
+        -> typing.AsyncIterator[tuple[int, _T]]:
+    """
+    At most `concurrency` items are being fetched or waiting to be consumed.
+
+    :param discard: called on the results fetched but not consumed, e.g. when the consumer stops early
+    """
+    to_fetch = enumerate(items)
+    fetching: collections.deque[asyncio.Task] = collections.deque()
+
+    async def fetch_indexed(index: int, item: typing.Any) -> tuple[int, _T]:
+        return index, await fetch(item)
+
+    def fetch_next():
+        if (next_item := next(to_fetch, None)) is not None:
+            fetching.append(asyncio.create_task(fetch_indexed(*next_item)))
+
+    for _ in range(concurrency):
+        fetch_next()
+
+    try:
+        while fetching:
+            if ordered:
+                task = fetching.popleft()
+                await asyncio.wait([task])
+            else:
+                done, _ = await asyncio.wait(fetching, return_when=asyncio.FIRST_COMPLETED)
+                task = next(iter(done))
+                fetching.remove(task)
+
+            fetch_next()
+            yield task.result()
+    finally:
+        for task in fetching:
+            task.cancel()
+        try:
+            if fetching:
+                await asyncio.wait(fetching)  # Raises if the consumer itself is cancelled meanwhile
+        finally:
+            if discard is not None:
+                for task in fetching:
+                    if task.done() and not task.cancelled() and task.exception() is None:
+                        discard(task.result()[1])
+
+
+async def fetch_many(s3_files: typing.Sequence[do.S3File], event: str, ordered: bool = True,
+                     concurrency: int = None, retries: int = None) -> typing.AsyncIterator[tuple[int, bytes]]:
+    """
+    Fetches the files concurrently; at most `concurrency` files are being fetched or waiting to be consumed,
+    which also bounds the memory to about `concurrency` files. Use `spool_many` for large files.
+
+    :param event: name of the batch in metrics
+    :param ordered: yields in the order of `s3_files` if true, otherwise as each file is fetched
+    :param concurrency: defaults to `s3_config.fetch_concurrency`
+    :param retries: defaults to `s3_config.fetch_retries`
+    :return: index in `s3_files` and content of each file
+    """
+    retries = s3_config.fetch_retries if retries is None else retries
+
+    start_time = datetime.now()
+    total_size = 0
+
+    async def fetch(s3_file: do.S3File) -> bytes:
+        return await _with_retry(s3_file, lambda: s3_handler.get_file_content(bucket=s3_file.bucket, key=s3_file.key),
+                                 retries=retries, event=event)
+
+    async for index, content in _prefetch(s3_files, fetch, ordered=ordered,
+                                          concurrency=concurrency or s3_config.fetch_concurrency):
+        total_size += len(content)
+        yield index, content
+
+    metric.s3_fetch_batch(event, time=(datetime.now() - start_time).total_seconds() * 1000, size=total_size)
+    log.info(f'Fetched {len(s3_files)} S3 files of {total_size} bytes for {event=}'
+             f' after {(datetime.now() - start_time).total_seconds() * 1000} ms')
+
+
+async def _spool(s3_file: do.S3File) -> typing.IO:
+    spooled_file = tempfile.SpooledTemporaryFile(max_size=const.S3_STREAM_CHUNK_SIZE)
+    try:
+        async with s3_handler.get_object_stream(bucket=s3_file.bucket, key=s3_file.key) as (_, body):
+            while chunk := await body.read(const.S3_STREAM_CHUNK_SIZE):
+                await executor.run_cpu(executor.DISK, spooled_file.write, chunk)
+    except BaseException:
+        spooled_file.close()
+        raise
+
+    spooled_file.seek(0)
+    return spooled_file
+
+
+async def spool_many(s3_files: typing.Sequence[do.S3File], event: str, ordered: bool = True,
+                     concurrency: int = None, retries: int = None) -> typing.AsyncIterator[tuple[int, typing.IO]]:
+    """
+    Same as `fetch_many`, but each file is streamed into a temporary file (on disk unless small) instead of memory,
+    so the memory is bounded by `concurrency` chunks however large the files are.
+    Each temporary file is closed once the next one is requested.
+    """
+    retries = s3_config.fetch_retries if retries is None else retries
+
+    start_time = datetime.now()
+    total_size = 0
+
+    async def fetch(s3_file: do.S3File) -> typing.IO:
+        return await _with_retry(s3_file, lambda: _spool(s3_file), retries=retries, event=event)
+
+    async for index, spooled_file in _prefetch(s3_files, fetch, ordered=ordered,
+                                               concurrency=concurrency or s3_config.fetch_concurrency,
+                                               discard=lambda file: file.close()):
+        with spooled_file:
+            total_size += spooled_file.seek(0, io.SEEK_END)
+            spooled_file.seek(0)
+            yield index, spooled_file
+
+    metric.s3_fetch_batch(event, time=(datetime.now() - start_time).total_seconds() * 1000, size=total_size)
+    log.info(f'Spooled {len(s3_files)} S3 files of {total_size} bytes for {event=}'
+             f' after {(datetime.now() - start_time).total_seconds() * 1000} ms')
+
+
+class MultipartUpload:
+    """
+    Uploads the parts concurrently, with at most `s3_config.multipart_concurrency` parts being uploaded
+    (and held in memory) at a time; aborts the upload on error.
+
+    async with MultipartUpload(bucket_name, key) as multipart_upload:
+        await multipart_upload.upload_part(part)
+    """
+
+    def __init__(self, bucket_name: str, key: str):
+        self._bucket = bucket_name
+        self._key = key
+        self._upload_id: str = None
+        self._uploading: list[asyncio.Task] = []
+        self._semaphore = asyncio.Semaphore(s3_config.multipart_concurrency)
+
+    async def __aenter__(self) -> 'MultipartUpload':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.complete()
+        else:
+            await self.abort()
+
+    async def start(self) -> None:
+        self._upload_id = await s3_handler.create_multipart_upload(bucket=self._bucket, key=self._key)
+
+    async def complete(self) -> None:
+        """
+        Waits for all the parts; aborts the upload if any part failed.
+        """
+        try:
+            part_etags = await asyncio.gather(*self._uploading)
+            await s3_handler.complete_multipart_upload(bucket=self._bucket, key=self._key,
+                                                       upload_id=self._upload_id, part_etags=part_etags)
+        except BaseException:
+            await self.abort()
+            raise
+
+        log.info(f'Uploaded {self._bucket=} {self._key=} in {len(self._uploading)} parts')
+
+    async def abort(self) -> None:
+        for task in self._uploading:
+            task.cancel()
+        await asyncio.gather(*self._uploading, return_exceptions=True)
+        await s3_handler.abort_multipart_upload(bucket=self._bucket, key=self._key, upload_id=self._upload_id)
+
+    async def upload_part(self, body: bytes) -> None:
+        """
+        Returns once the part starts uploading, and raises if any previous part has failed.
+        """
+        for task in self._uploading:
+            if task.done() and task.exception() is not None:
+                raise task.exception()
+
+        await self._semaphore.acquire()
+        self._uploading.append(asyncio.create_task(self._upload_part(len(self._uploading) + 1, body)))
+
+    async def _upload_part(self, part_number: int, body: bytes) -> str:
+        try:
+            return await s3_handler.upload_part(bucket=self._bucket, key=self._key, upload_id=self._upload_id,
+                                                part_number=part_number, body=body)
+        finally:
+            self._semaphore.release()
+
+
 async def upload(bucket_name: str, file: typing.IO, file_uuid: UUID) -> do.S3File:
     """
+    Files of at least `s3_config.multipart_threshold` are uploaded in parts concurrently.
+
     :return: do.S3File
     """
     start_time = datetime.now()
     log.info(f'Starting S3 file upload: {bucket_name=}, {file_uuid=}')
 
-    bucket = await s3_handler.get_bucket(bucket_name)
     key = str(file_uuid)
-    await bucket.upload_fileobj(file, key)
+    part_size = s3_config.multipart_chunk_size
+    async with tracing.span('s3 upload', bucket=bucket_name, key=key):
+        buffer = bytearray(await executor.run_cpu(executor.DISK, file.read, s3_config.multipart_threshold))
+        if len(buffer) < s3_config.multipart_threshold:
+            await s3_handler.put_object(bucket=bucket_name, key=key, body=bytes(buffer))
+        else:
+            async with MultipartUpload(bucket_name, key) as multipart_upload:
+                while True:
+                    while len(buffer) >= part_size:
+                        await multipart_upload.upload_part(bytes(buffer[:part_size]))
+                        del buffer[:part_size]
+                    if not (chunk := await executor.run_cpu(executor.DISK, file.read, part_size)):
+                        break
+                    buffer += chunk
+                if buffer:
+                    await multipart_upload.upload_part(bytes(buffer))
 
     exec_time_ms = (datetime.now() - start_time).total_seconds() * 1000
     log.info(f'Ended S3 file upload after {exec_time_ms} ms')
@@ -72,17 +324,127 @@ async def upload(bucket_name: str, file: typing.IO, file_uuid: UUID) -> do.S3Fil
     return do.S3File(uuid=file_uuid, bucket=bucket_name, key=key)
 
 
-async def zipper(files: dict[str, do.S3File]) -> io.BytesIO:
+async def delete(bucket: str, key: str) -> None:
+    await s3_handler.delete_object(bucket=bucket, key=key)
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Not seekable, so `zipfile` writes the entry sizes after the data instead of seeking back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.buffer += b
+        self._position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._position
+
+
+class ZipUploader:
+    """
+    Writes a zip file to S3 with multipart upload, keeping only about `s3_config.multipart_concurrency` parts
+    in memory however large the zip is.
+
+    async with ZipUploader(bucket_name, file_uuid) as zip_uploader:
+        await zip_uploader.write_s3_files([(arcname, s3_file)], event=event)
+    s3_file = zip_uploader.s3_file
+    """
+
+    def __init__(self, bucket_name: str, file_uuid: UUID, compression: int = zipfile.ZIP_STORED):
+        self._bucket = bucket_name
+        self._key = str(file_uuid)
+        self._compression = compression
+        self._sink = _ZipSink()
+        self._zip_file: zipfile.ZipFile = None
+        self._multipart_upload: typing.Optional[MultipartUpload] = None
+        self.s3_file = do.S3File(uuid=file_uuid, bucket=bucket_name, key=self._key)
+
+    async def __aenter__(self) -> 'ZipUploader':
+        self._zip_file = zipfile.ZipFile(self._sink, 'w', self._compression, allowZip64=True)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            if self._multipart_upload is not None:
+                await self._multipart_upload.abort()
+            return
+
+        await executor.run_cpu(executor.ZIP, self._zip_file.close)  # writes the central directory
+
+        if self._multipart_upload is None:  # small enough for one request
+            await s3_handler.put_object(bucket=self._bucket, key=self._key, body=bytes(self._sink.buffer))
+        else:
+            try:
+                if self._sink.buffer:
+                    await self._multipart_upload.upload_part(bytes(self._sink.buffer))
+            except BaseException:
+                await self._multipart_upload.abort()
+                raise
+            await self._multipart_upload.complete()
+        self._sink.buffer.clear()
+
+        log.info(f'Uploaded zip file {self._bucket=} {self._key=}')
+
+    async def writestr(self, arcname: str, data: bytes) -> None:
+        await executor.run_cpu(executor.ZIP, self._zip_file.writestr, arcname, data)
+        await self._flush_parts()
+
+    async def write_file(self, arcname: str, file: typing.IO) -> None:
+        """
+        Streams the rest of a seekable file into the zip in chunks, without holding the whole file.
+        """
+        zip_info = zipfile.ZipInfo(arcname, date_time=time.localtime(time.time())[:6])
+        zip_info.compress_type = self._compression
+        position = file.tell()
+        zip_info.file_size = file.seek(0, io.SEEK_END) - position  # for zipfile to decide whether zip64 is needed
+        file.seek(position)
+
+        entry = self._zip_file.open(zip_info, 'w')
+        try:
+            while chunk := await executor.run_cpu(executor.DISK, file.read, const.S3_STREAM_CHUNK_SIZE):
+                await executor.run_cpu(executor.ZIP, entry.write, chunk)
+                await self._flush_parts()
+        finally:
+            await executor.run_cpu(executor.ZIP, entry.close)
+
+        await self._flush_parts()
+
+    async def write_s3_files(self, files: typing.Sequence[tuple[str, do.S3File]], event: str) -> None:
+        """
+        Streams the S3 objects into the zip in the order they are fetched, see `spool_many`.
+        """
+        async for i, spooled_file in spool_many([s3_file for _, s3_file in files], event=event, ordered=False):
+            await self.write_file(files[i][0], spooled_file)
+
+    async def _flush_parts(self):
+        part_size = s3_config.multipart_chunk_size
+        while len(self._sink.buffer) >= part_size:
+            part = bytes(self._sink.buffer[:part_size])
+            del self._sink.buffer[:part_size]
+            if self._multipart_upload is None:
+                self._multipart_upload = MultipartUpload(self._bucket, self._key)
+                await self._multipart_upload.start()
+            await self._multipart_upload.upload_part(part)
+
+
+async def zipper(files: dict[str, do.S3File], bucket_name: str, file_uuid: UUID) -> do.S3File:
     start_time = datetime.now()
     log.info('Start zipping S3 files ...')
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-        for filename, file in files.items():
-            infile_content = await get_file_content(bucket=file.bucket, key=file.key)
-            zip_file.writestr(filename, infile_content)
+    async with ZipUploader(bucket_name, file_uuid, compression=zipfile.ZIP_DEFLATED) as zip_uploader:
+        await zip_uploader.write_s3_files(list(files.items()), event='zipper')
 
     exec_time_ms = (datetime.now() - start_time).total_seconds() * 1000
     log.info(f'Ended zip S3 file after {exec_time_ms} ms')
 
-    return zip_buffer
+    return zip_uploader.s3_file
@@ -0,0 +1,362 @@
+import asyncio
+import contextlib
+import io
+import unittest
+from unittest.mock import patch
+import zipfile
+from uuid import UUID
+
+import cachetools
+
+from base import do
+from config import s3_config
+import const
+from util import mock
+
+from . import tools
+
+
+class _FakeS3Handler:
+    """
+    Keeps the objects in memory, assembling multipart uploads on completion.
+    Shared by the tests of this module instead of `util.mock`, whose calls are expected in a fixed order,
+    while parts and entries are uploaded and fetched concurrently.
+    """
+
+    def __init__(self, fail_part_number: int = None, fail_keys: set[str] = ()):
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.parts: dict[int, bytes] = {}
+        self.aborted = False
+        self._fail_part_number = fail_part_number
+        self._fail_keys = set(fail_keys)  # Fail to stream once
+
+    @contextlib.asynccontextmanager
+    async def get_object_stream(self, bucket: str, key: str):
+        content = io.BytesIO(self.objects[bucket, key])
+
+        async def read(size: int) -> bytes:
+            await asyncio.sleep(0)  # Objects are streamed concurrently
+            if key in self._fail_keys:
+                self._fail_keys.remove(key)
+                raise ConnectionError
+            return content.read(size)
+
+        yield len(content.getvalue()), type('_Body', (), {'read': staticmethod(read)})
+
+    async def put_object(self, bucket: str, key: str, body: bytes) -> None:
+        self.objects[bucket, key] = body
+
+    async def create_multipart_upload(self, bucket: str, key: str) -> str:
+        return 'upload_id'
+
+    async def upload_part(self, bucket: str, key: str, upload_id: str, part_number: int, body: bytes) -> str:
+        await asyncio.sleep(0)  # Parts are uploaded concurrently
+        if part_number == self._fail_part_number:
+            raise ConnectionError
+        self.parts[part_number] = body
+        return f'etag{part_number}'
+
+    async def complete_multipart_upload(self, bucket: str, key: str, upload_id: str, part_etags) -> None:
+        assert list(part_etags) == [f'etag{i}' for i in range(1, len(self.parts) + 1)]
+        self.objects[bucket, key] = b''.join(self.parts[i] for i in range(1, len(self.parts) + 1))
+
+    async def abort_multipart_upload(self, bucket: str, key: str, upload_id: str) -> None:
+        self.aborted = True
+
+
+class TestSignUrl(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = 10000.0
+        self.expire_secs = 3 * const.S3_SIGN_URL_REUSE_SECS
+
+    @staticmethod
+    def expect_sign(s3_handler, key: str, expire_secs: int, url: str):
+        s3_handler.async_func('sign_url').call_with(
+            bucket='bucket', key=key, as_filename='filename', expire_secs=expire_secs, as_attachment=True,
+        ).returns(url)
+
+    async def sign_url(self, key: str = 'key', expire_secs: int = None) -> str:
+        return await tools.sign_url('bucket', key, filename='filename', as_attachment=True,
+                                    expire_secs=expire_secs or self.expire_secs)
+
+    async def test_reuse(self):
+        with (
+            mock.Controller() as controller,
+            patch.object(tools, '_signed_urls', cachetools.LRUCache(maxsize=10)),
+        ):
+            time_ = controller.mock_module('persistence.s3.tools.time')
+            s3_handler = controller.mock_module('persistence.s3.tools.s3_handler')
+
+            time_.func('monotonic').call_with().returns(self.now)
+            self.expect_sign(s3_handler, 'key', self.expire_secs, 'url')
+            # Still lasts the requested time, less at most S3_SIGN_URL_REUSE_SECS
+            time_.func('monotonic').call_with().returns(self.now + const.S3_SIGN_URL_REUSE_SECS)
+            # Would not last long enough anymore
+            time_.func('monotonic').call_with().returns(self.now + const.S3_SIGN_URL_REUSE_SECS + 1)
+            self.expect_sign(s3_handler, 'key', self.expire_secs, 'url_2')
+
+            self.assertEqual(await self.sign_url(), 'url')
+            self.assertEqual(await self.sign_url(), 'url')
+            self.assertEqual(await self.sign_url(), 'url_2')
+
+    async def test_longer_expire_secs(self):
+        with (
+            mock.Controller() as controller,
+            patch.object(tools, '_signed_urls', cachetools.LRUCache(maxsize=10)),
+        ):
+            time_ = controller.mock_module('persistence.s3.tools.time')
+            s3_handler = controller.mock_module('persistence.s3.tools.s3_handler')
+
+            time_.func('monotonic').call_with().returns(self.now)
+            self.expect_sign(s3_handler, 'key', self.expire_secs, 'url')
+            time_.func('monotonic').call_with().returns(self.now)
+            self.expect_sign(s3_handler, 'key', self.expire_secs + const.S3_SIGN_URL_REUSE_SECS + 1, 'url_2')
+            # The longer one is cached, and serves the shorter requests too
+            time_.func('monotonic').call_with().returns(self.now)
+
+            self.assertEqual(await self.sign_url(), 'url')
+            self.assertEqual(await self.sign_url(expire_secs=self.expire_secs + const.S3_SIGN_URL_REUSE_SECS + 1),
+                             'url_2')
+            self.assertEqual(await self.sign_url(), 'url_2')
+
+    async def test_lru_bounded(self):
+        with (
+            mock.Controller() as controller,
+            patch.object(tools, '_signed_urls', cachetools.LRUCache(maxsize=2)),
+        ):
+            time_ = controller.mock_module('persistence.s3.tools.time')
+            s3_handler = controller.mock_module('persistence.s3.tools.s3_handler')
+
+            for key in ('key_1', 'key_2'):
+                time_.func('monotonic').call_with().returns(self.now)
+                self.expect_sign(s3_handler, key, self.expire_secs, f'url_{key}')
+            time_.func('monotonic').call_with().returns(self.now)  # key_1 is used again
+            time_.func('monotonic').call_with().returns(self.now)
+            self.expect_sign(s3_handler, 'key_3', self.expire_secs, 'url_key_3')  # evicts key_2
+            time_.func('monotonic').call_with().returns(self.now)
+            self.expect_sign(s3_handler, 'key_2', self.expire_secs, 'url_key_2')
+
+            for key in ('key_1', 'key_2', 'key_1', 'key_3', 'key_2'):
+                self.assertEqual(await self.sign_url(key=key), f'url_{key}')
+
+            self.assertEqual(len(tools._signed_urls), 2)
+
+
+class TestUpload(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
+        self.key = str(self.file_uuid)
+        self.expected_s3_file = do.S3File(uuid=self.file_uuid, bucket='bucket', key=self.key)
+
+    async def upload(self, s3_handler: _FakeS3Handler, content: bytes) -> do.S3File:
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(s3_config, 'multipart_threshold', 100),
+            patch.object(s3_config, 'multipart_chunk_size', 40),
+            patch.object(s3_config, 'multipart_concurrency', 2),
+        ):
+            return await tools.upload('bucket', io.BytesIO(content), file_uuid=self.file_uuid)
+
+    async def test_single_request(self):
+        s3_handler = _FakeS3Handler()
+        content = bytes(range(30))
+
+        result = await self.upload(s3_handler, content)
+
+        self.assertEqual(result, self.expected_s3_file)
+        self.assertEqual(s3_handler.parts, {})
+        self.assertEqual(s3_handler.objects, {('bucket', self.key): content})
+
+    async def test_multipart(self):
+        s3_handler = _FakeS3Handler()
+        content = bytes(range(130))
+
+        result = await self.upload(s3_handler, content)
+
+        self.assertEqual(result, self.expected_s3_file)
+        self.assertEqual([len(part) for part in s3_handler.parts.values()], [40, 40, 40, 10])
+        self.assertFalse(s3_handler.aborted)
+        self.assertEqual(s3_handler.objects, {('bucket', self.key): content})
+
+    async def test_abort_on_part_failure(self):
+        s3_handler = _FakeS3Handler(fail_part_number=2)
+
+        with self.assertRaises(ConnectionError):
+            await self.upload(s3_handler, bytes(range(130)))
+
+        self.assertTrue(s3_handler.aborted)
+        self.assertEqual(s3_handler.objects, {})
+
+
+class TestZipUploader(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
+        self.key = str(self.file_uuid)
+        self.entries = {f'folder/{i}.txt': bytes([i]) * 100 for i in range(5)}
+
+    def assertArchive(self, content: bytes):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual({name: archive.read(name) for name in archive.namelist()}, self.entries)
+
+    async def test_single_request(self):
+        s3_handler = _FakeS3Handler()
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+        ):
+            async with tools.ZipUploader('bucket', self.file_uuid) as zip_uploader:
+                for arcname, data in self.entries.items():
+                    await zip_uploader.writestr(arcname, data)
+
+        self.assertEqual(zip_uploader.s3_file.key, self.key)
+        self.assertEqual(s3_handler.parts, {})
+        self.assertArchive(s3_handler.objects['bucket', self.key])
+
+    async def test_multipart(self):
+        s3_handler = _FakeS3Handler()
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(s3_config, 'multipart_chunk_size', 64),
+        ):
+            async with tools.ZipUploader('bucket', self.file_uuid, compression=zipfile.ZIP_DEFLATED) \
+                    as zip_uploader:
+                for arcname, data in self.entries.items():
+                    await zip_uploader.writestr(arcname, data)
+
+        self.assertGreater(len(s3_handler.parts), 1)
+        self.assertTrue(all(len(part) == 64 for part in list(s3_handler.parts.values())[:-1]))
+        self.assertTrue(s3_handler.parts[len(s3_handler.parts)])  # Rest of the entries and the central directory
+        self.assertFalse(s3_handler.aborted)
+        self.assertArchive(s3_handler.objects['bucket', self.key])
+
+    async def test_abort_on_error(self):
+        s3_handler = _FakeS3Handler()
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(s3_config, 'multipart_chunk_size', 64),
+            self.assertRaises(ValueError),
+        ):
+            async with tools.ZipUploader('bucket', self.file_uuid) as zip_uploader:
+                for arcname, data in self.entries.items():
+                    await zip_uploader.writestr(arcname, data)
+                raise ValueError
+
+        self.assertTrue(s3_handler.aborted)
+        self.assertEqual(s3_handler.objects, {})
+
+    async def test_abort_on_part_failure(self):
+        s3_handler = _FakeS3Handler(fail_part_number=2)
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(s3_config, 'multipart_chunk_size', 64),
+            self.assertRaises(ConnectionError),
+        ):
+            async with tools.ZipUploader('bucket', self.file_uuid) as zip_uploader:
+                for arcname, data in self.entries.items():
+                    await zip_uploader.writestr(arcname, data)
+
+        self.assertTrue(s3_handler.aborted)
+        self.assertEqual(s3_handler.objects, {})
+
+
+class TestZipper(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
+        self.key = str(self.file_uuid)
+        self.entries = {f'folder/{i}.txt': bytes([i]) * (i * 100) for i in range(5)}
+        self.files = {arcname: do.S3File(uuid=UUID(int=i), bucket='input', key=str(UUID(int=i)))
+                      for i, arcname in enumerate(self.entries)}
+
+    def make_s3_handler(self, **kwargs) -> _FakeS3Handler:
+        s3_handler = _FakeS3Handler(**kwargs)
+        for arcname, s3_file in self.files.items():
+            s3_handler.objects[s3_file.bucket, s3_file.key] = self.entries[arcname]
+        return s3_handler
+
+    def assertArchive(self, content: bytes):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual({name: archive.read(name) for name in archive.namelist()}, self.entries)
+
+    async def test_happy_flow(self):
+        s3_handler = self.make_s3_handler()
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(tools.const, 'S3_STREAM_CHUNK_SIZE', 64),
+            patch.object(s3_config, 'fetch_concurrency', 2),
+            patch.object(s3_config, 'multipart_chunk_size', 256),
+        ):
+            result = await tools.zipper(self.files, bucket_name='bucket', file_uuid=self.file_uuid)
+
+        self.assertEqual(result.key, self.key)
+        self.assertGreater(len(s3_handler.parts), 1)
+        self.assertArchive(s3_handler.objects['bucket', self.key])
+
+    async def test_retry(self):
+        s3_handler = self.make_s3_handler(fail_keys={self.files['folder/2.txt'].key})
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(tools, '_FETCH_RETRY_BACKOFF_SECS', 0),
+            patch.object(tools.const, 'S3_STREAM_CHUNK_SIZE', 64),
+        ):
+            await tools.zipper(self.files, bucket_name='bucket', file_uuid=self.file_uuid)
+
+        self.assertArchive(s3_handler.objects['bucket', self.key])
+
+    async def test_spool_many_stop_early(self):
+        s3_handler = self.make_s3_handler()
+        spooled_files = []
+
+        with (
+            patch.object(tools, 's3_handler', s3_handler),
+            patch.object(s3_config, 'fetch_concurrency', 3),
+        ):
+            async with contextlib.aclosing(tools.spool_many(list(self.files.values()), event='event')) as spooled:
+                async for i, spooled_file in spooled:
+                    spooled_files.append(spooled_file)
+                    self.assertEqual(spooled_file.read(), self.entries[list(self.files)[i]])
+                    if i == 1:
+                        break
+
+        self.assertEqual(len(spooled_files), 2)
+        self.assertTrue(all(spooled_file.closed for spooled_file in spooled_files))
+
+
+class TestPrefetch(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_while_closing(self):
+        cleaned_up = asyncio.Event()
+        release = asyncio.Event()
+        discarded = []
+
+        async def fetch(item: int) -> int:
+            if item == 0:
+                return item
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cleaned_up.set()
+                await release.wait()  # Slow to clean up
+                raise
+
+        async def consume():
+            async with contextlib.aclosing(tools._prefetch([0, 1], fetch, ordered=True, concurrency=2,
+                                                           discard=discarded.append)) as fetched:
+                async for _ in fetched:
+                    break
+
+        consumer = asyncio.create_task(consume())
+        await cleaned_up.wait()
+        consumer.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await consumer
+        self.assertTrue(consumer.cancelled())
+        self.assertEqual(discarded, [])
@@ -8,16 +8,26 @@ import persistence.database as db
 from util import dtype
 
 
-async def save_report(body: bytes) -> None:
+def parse_report(body: bytes) -> common.do.JudgeReport:
+    return pydantic.parse_raw_as(common.do.JudgeReport, body.decode())
+
+
+def report_partition_key(report: common.do.JudgeReport) -> int:
+    """
+    Reports of the same submission are saved in order.
+    """
+    return report.judgment.submission_id
+
+
+async def save_report(report: common.do.JudgeReport) -> None:
     log.info('Received save report task')
-    report = pydantic.parse_raw_as(common.do.JudgeReport, body.decode())
 
     # Help ensure data is valid for database
     for judge_case in report.judge_cases:
         judge_case.score = dtype.int32(judge_case.score)
     report.judgment.score = dtype.int32(report.judgment.score)
 
-    judgment_id = await db.judgment.add(
+    await db.judgment.add_with_cases(
         submission_id=report.judgment.submission_id,
         verdict=report.judgment.verdict,
         total_time=report.judgment.total_time,
@@ -25,13 +35,7 @@ async def save_report(body: bytes) -> None:
         score=report.judgment.score,
         error_message=report.judgment.error_message,
         judge_time=datetime.now(),
+        judge_cases=[(judge_case.testcase_id, judge_case.verdict, judge_case.time_lapse,
+                      judge_case.peak_memory, judge_case.score)
+                     for judge_case in report.judge_cases],
     )
-    for judge_case in report.judge_cases:
-        await db.judgment.add_case(
-            judgment_id=judgment_id,
-            testcase_id=judge_case.testcase_id,
-            verdict=judge_case.verdict,
-            score=judge_case.score,
-            time_lapse=judge_case.time_lapse,
-            peak_memory=judge_case.peak_memory,
-        )
@@ -0,0 +1,70 @@
+"""
+Standalone judge report consumer, to be scaled separately from the web server:
+
+    python -m processor.amqp.worker
+
+Set `AMQP_CONSUME_IN_WEB=false` for the web server to stop consuming in-process.
+"""
+
+
+# Setup loggers from yaml
+
+
+with open('logging.yaml', 'r') as conf:
+    import yaml
+    log_config = yaml.safe_load(conf.read())
+
+    import logging.config
+    logging.config.dictConfig(log_config)
+
+
+import asyncio
+import signal
+
+import prometheus_client
+
+from config import amqp_config, db_config, loop_monitor_config, tracing_config
+import log
+from persistence.amqp_consumer import make_consumer
+from persistence.database import pool_handler
+import processor.amqp
+from util.loop_monitor import loop_monitor
+from util.tracing import span_exporter
+
+
+async def main():
+    log.info('Database initializing...')
+    await pool_handler.initialize(db_config=db_config)
+    log.info('Database initialized')
+
+    await loop_monitor.initialize(loop_monitor_config=loop_monitor_config)
+    await span_exporter.initialize(tracing_config=tracing_config)
+
+    if amqp_config.worker_metrics_port:
+        prometheus_client.start_http_server(amqp_config.worker_metrics_port)
+        log.info(f'Metrics served on port {amqp_config.worker_metrics_port}')
+
+    report_consumer = make_consumer(amqp_config=amqp_config,
+                                    queue_name=amqp_config.report_queue_name,
+                                    consume_function=processor.amqp.save_report,
+                                    parse_function=processor.amqp.parse_report,
+                                    partition_key=processor.amqp.report_partition_key)
+
+    # Stop consuming on SIGTERM / SIGINT; in-flight messages are finished before exit
+    consumer_task = asyncio.create_task(report_consumer(asyncio.get_running_loop()))
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, consumer_task.cancel)
+
+    log.info('AMQP Consumer started')
+    try:
+        await consumer_task
+    except asyncio.CancelledError:
+        log.info('AMQP Consumer stopped')
+    finally:
+        await span_exporter.close()
+        await loop_monitor.close()
+        await pool_handler.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -47,6 +47,7 @@ def register_routers(app: fastapi.FastAPI):
         secret,
 
         docs,
+        profiler,
     )
 
     app.include_router(public.router)
@@ -90,3 +91,4 @@ def register_routers(app: fastapi.FastAPI):
     app.include_router(secret.router)
 
     docs.hook_docs(app)
+    profiler.hook_profiler(app)
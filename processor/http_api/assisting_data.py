@@ -58,9 +58,8 @@ async def edit_assisting_data(assisting_data_id: int, assisting_data_file: Uploa
     # Issue #26: CRLF
     no_cr_file = util.file.replace_cr(assisting_data_file.file)
 
-    s3_file = await s3.assisting_data.upload(no_cr_file)
-
-    s3_file_uuid = await db.s3_file.add_with_do(s3_file=s3_file)
+    s3_file_uuid = await service.storage.upload(no_cr_file, bucket=s3.assisting_data.BUCKET_NAME,
+                                                upload_func=s3.assisting_data.upload)
 
     await db.assisting_data.edit(assisting_data_id=assisting_data_id, s3_file_uuid=s3_file_uuid,
                                  filename=assisting_data_file.filename)
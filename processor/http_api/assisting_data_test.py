@@ -90,9 +90,8 @@ class TestEditAssistingData(unittest.IsolatedAsyncioTestCase):
 
             util_file = controller.mock_module('util.file')
             service_rbac = controller.mock_module('service.rbac')
-            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            service_storage = controller.mock_module('service.storage')
             db_assisting_data = controller.mock_module('persistence.database.assisting_data')
-            s3_assisting_data = controller.mock_module('persistence.s3.assisting_data')
 
             service_rbac.async_func('validate_class').call_with(
                 self.account.id, enum.RoleType.manager,
@@ -101,11 +100,10 @@ class TestEditAssistingData(unittest.IsolatedAsyncioTestCase):
             util_file.func('replace_cr').call_with(
                 mock.AnyInstanceOf(type(self.assisting_data_file.file))
             ).returns(self.no_cr_file)
-            s3_assisting_data.async_func('upload').call_with(
+            service_storage.async_func('upload').call_with(
                 mock.AnyInstanceOf(type(self.no_cr_file)),
-            ).returns(self.s3_file)
-            db_s3_file.async_func('add_with_do').call_with(
-                s3_file=mock.AnyInstanceOf(type(self.s3_file)),
+                bucket=assisting_data.s3.assisting_data.BUCKET_NAME,
+                upload_func=assisting_data.s3.assisting_data.upload,
             ).returns(self.s3_file.uuid)
             db_assisting_data.async_func('edit').call_with(
                 assisting_data_id=self.assisting_data_id, s3_file_uuid=self.s3_file.uuid,
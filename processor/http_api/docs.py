@@ -7,7 +7,7 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 security = HTTPBasic()
 
 
-def _get_current_username_dependency(username: str, password: str):
+def get_current_username_dependency(username: str, password: str):
     def dependency(credentials: HTTPBasicCredentials = Depends(security)):
         correct_username = secrets.compare_digest(credentials.username, username)
         correct_password = secrets.compare_digest(credentials.password, password)
@@ -41,19 +41,19 @@ def _hook_openapi(app: FastAPI, url: str):
 
 def _hook_secret_swagger(app: FastAPI, url: str, openapi_url: str, username: str, password: str):
     @app.get(url, include_in_schema=False)
-    async def handler(_=Depends(_get_current_username_dependency(username, password))):
+    async def handler(_=Depends(get_current_username_dependency(username, password))):
         return get_swagger_ui_html(openapi_url=openapi_url, title="docs")
 
 
 def _hook_secret_redoc(app: FastAPI, url: str, openapi_url: str, username: str, password: str):
     @app.get(url, include_in_schema=False)
-    async def handler(_=Depends(_get_current_username_dependency(username, password))):
+    async def handler(_=Depends(get_current_username_dependency(username, password))):
         return get_redoc_html(openapi_url=openapi_url, title="docs")
 
 
 def _hook_secret_openapi(app: FastAPI, url: str, username: str, password: str):
     @app.get(url, include_in_schema=False)
-    async def handler(_=Depends(_get_current_username_dependency(username, password))):
+    async def handler(_=Depends(get_current_username_dependency(username, password))):
         return app.openapi()
 
 
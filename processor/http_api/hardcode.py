@@ -6,8 +6,10 @@ from typing import Sequence
 import asyncache
 import cachetools
 
+from base import do
 from base.enum import RoleType, ScoreboardType, VerdictType
 from config import config
+import const
 import exceptions as exc
 from middleware import APIRouter, response, enveloped, auth
 import persistence.database as db
@@ -28,14 +30,6 @@ class TimeInfo:
     timestamp: int
 
 
-@dataclass
-class EachRun:
-    team: int
-    problem: int
-    result: str
-    submissionTime: int  # minutes
-
-
 @dataclass
 class ReturnEachRun:
     id: int
@@ -49,19 +43,21 @@ class ReturnEachRun:
 class ViewTeamContestScoreboardRunsOutput:
     time: TimeInfo
     runs: Sequence[ReturnEachRun]
+    cursor: int  # seconds since the challenge starts
+
+
+@dataclass
+class _Runs:
+    challenge: do.Challenge
+    read_time: datetime.datetime
+    runs: Sequence[tuple[datetime.datetime, ReturnEachRun]]  # (update time, run)
 
 
-@router.get('/hardcode/team-contest-scoreboard/{scoreboard_id}/runs')
-@enveloped
 @asyncache.cached(cachetools.TTLCache(128, ttl=config.scoreboard_hardcode_ttl))
-async def view_team_contest_scoreboard_runs(scoreboard_id: int) -> ViewTeamContestScoreboardRunsOutput:
+async def _browse_runs(scoreboard_id: int) -> _Runs:
     """
-    ### 權限
-    - System Normal
+    Cached by scoreboard only, so that all the clients polling a scoreboard share the reads whatever their `since`.
     """
-    if not await service.rbac.validate_class(context.account.id, RoleType.normal, scoreboard_id=scoreboard_id):
-        raise exc.NoPermission
-
     scoreboard = await db.scoreboard.read(scoreboard_id)
     if scoreboard.type != ScoreboardType.team_contest:
         raise exc.IllegalInput
@@ -72,34 +68,64 @@ async def view_team_contest_scoreboard_runs(scoreboard_id: int) -> ViewTeamConte
     teams = await db.team.browse_with_team_label_filter(class_id=class_id,
                                                         team_label_filter=setting_data.team_label_filter)
     challenge = await db.challenge.read(scoreboard.challenge_id)
-    freeze_time = challenge.end_time - datetime.timedelta(hours=1)
-    is_freeze = freeze_time < context.request_time < challenge.end_time
-    problem_run_infos = [
-        EachRun(team=team_id, problem=problem_id,
+    freeze_time = challenge.end_time - datetime.timedelta(seconds=const.SCOREBOARD_FREEZE_SECS)
+    read_time = context.request_time
+    is_freeze = freeze_time < read_time < challenge.end_time
+
+    runs = []
+    for problem_id in scoreboard.target_problem_ids:
+        for team_id, submission_id, submit_time, judge_time, verdict \
+                in await db.judgment.browse_class_team_runs(problem_id=problem_id, class_id=class_id,
+                                                            team_ids=[team.id for team in teams]):
+            update_time = judge_time
+            if submit_time > freeze_time:  # Hidden during the freeze, and shown at the end
+                if is_freeze:
+                    continue
+                update_time = max(judge_time, challenge.end_time)
+            runs.append((update_time, ReturnEachRun(
+                id=submission_id, team=team_id, problem=problem_id,
                 result="Yes" if verdict is VerdictType.accepted else "No - Wrong Answer",
-                submissionTime=math.ceil((submit_time - challenge.start_time) / datetime.timedelta(minutes=1)))
-        for problem_id in scoreboard.target_problem_ids
-        for team_id, submission_id, submit_time, verdict
-        in await db.judgment.get_class_all_team_submission_verdict_before_freeze(problem_id=problem_id,
-                                                                                 class_id=class_id,
-                                                                                 team_ids=[team.id for team in teams],
-                                                                                 freeze_time=freeze_time if is_freeze else None)  # noqa
-    ]
-
-    # sort it again
-    problem_run_infos = sorted(problem_run_infos, key=lambda run: run.submissionTime)
+                submissionTime=math.ceil((submit_time - challenge.start_time) / datetime.timedelta(minutes=1)),
+            )))
+
+    return _Runs(challenge=challenge, read_time=read_time, runs=runs)
+
+
+@router.get('/hardcode/team-contest-scoreboard/{scoreboard_id}/runs')
+@enveloped
+async def view_team_contest_scoreboard_runs(scoreboard_id: int, since: int = None) \
+        -> ViewTeamContestScoreboardRunsOutput:
+    """
+    ### 權限
+    - System Normal
+
+    ### Notes
+    - `id` of a run is its submission id
+    - `since`: `cursor` of the previous response; only returns runs judged (or rejudged, or unfrozen) after it.
+      Runs around the cursor are returned again, so clients should update runs by `id`.
+    """
+    if not await service.rbac.validate_class(context.account.id, RoleType.normal, scoreboard_id=scoreboard_id):
+        raise exc.NoPermission
+
+    browsed = await _browse_runs(scoreboard_id)
+    challenge = browsed.challenge
+
+    since_time = None
+    if since is not None:
+        # Judge time is taken before commit, so a run committed after the previous read may be judged before it
+        since_time = challenge.start_time + datetime.timedelta(
+            seconds=since - const.SCOREBOARD_HARDCODE_CURSOR_OVERLAP_SECS)
+
+    runs = sorted((run for update_time, run in browsed.runs if since_time is None or update_time > since_time),
+                  key=lambda run: (run.submissionTime, run.id))
 
     return ViewTeamContestScoreboardRunsOutput(
         time=TimeInfo(
             contestTime=math.ceil((challenge.end_time - challenge.start_time) / datetime.timedelta(seconds=1)),
-            noMoreUpdate=challenge.end_time - datetime.datetime.now() < datetime.timedelta(hours=1),
+            noMoreUpdate=(challenge.end_time - datetime.datetime.now()
+                          < datetime.timedelta(seconds=const.SCOREBOARD_FREEZE_SECS)),
             timestamp=math.ceil((datetime.datetime.now() - challenge.start_time) / datetime.timedelta(seconds=1)),
         ),
-        runs=[ReturnEachRun(
-            id=i,
-            team=run.team,
-            problem=run.problem,
-            result=run.result,
-            submissionTime=run.submissionTime,
-        ) for i, run in enumerate(problem_run_infos)]
+        runs=runs,
+        cursor=math.floor((browsed.read_time - challenge.start_time) / datetime.timedelta(seconds=1)),
     )
@@ -1,3 +1,4 @@
+import copy
 from datetime import datetime, timedelta
 import time
 import unittest
@@ -69,23 +70,9 @@ class TestViewTeamContestScoreboardRuns(unittest.IsolatedAsyncioTestCase):
                 is_deleted=False,
             ),
         ]
-        self.freeze_result = [
-            (1, 1, self.time + timedelta(minutes=5), enum.VerdictType.accepted),
-            (2, 2, self.time + timedelta(minutes=10), enum.VerdictType.accepted),
-        ]
-        self.problem_run_infos = [
-            hardcode.EachRun(
-                team=1,
-                problem=1,
-                result="Yes",
-                submissionTime=5,
-            ),
-            hardcode.EachRun(
-                team=2,
-                problem=1,
-                result="Yes",
-                submissionTime=10,
-            ),
+        self.runs_result = [
+            (1, 1, self.time + timedelta(minutes=5), self.time + timedelta(minutes=6), enum.VerdictType.accepted),
+            (2, 2, self.time + timedelta(minutes=10), self.time + timedelta(minutes=11), enum.VerdictType.accepted),
         ]
         self.result = hardcode.ViewTeamContestScoreboardRunsOutput(
             time=hardcode.TimeInfo(
@@ -95,81 +82,176 @@ class TestViewTeamContestScoreboardRuns(unittest.IsolatedAsyncioTestCase):
             ),
             runs=[
                 hardcode.ReturnEachRun(
-                    id=0,
+                    id=1,
                     team=1,
                     problem=1,
                     result="Yes",
                     submissionTime=5,
                 ), hardcode.ReturnEachRun(
-                    id=1,
+                    id=2,
                     team=2,
                     problem=1,
                     result="Yes",
                     submissionTime=10,
                 ),
-            ]
+            ],
+            cursor=30,
         )
 
     # for cache
     def tearDown(self):
         time.sleep(1.1)
 
-    async def test_happy_flow(self):
+    def _mock_runs(self, controller: mock.Controller, challenge: do.Challenge, runs):
+        service_rbac = controller.mock_module('service.rbac')
+        db_scoreboard = controller.mock_module('persistence.database.scoreboard')
+        db_scoreboard_setting_team_contest = controller.mock_module(
+            'persistence.database.scoreboard_setting_team_contest',
+        )
+        db_challenge = controller.mock_module('persistence.database.challenge')
+        db_team = controller.mock_module('persistence.database.team')
+        db_judgment = controller.mock_module('persistence.database.judgment')
+        datetime_now = controller.mock_module('datetime.datetime').func('now')
+
+        service_rbac.async_func('validate_class').call_with(
+            self.login_account.id, enum.RoleType.normal,
+            scoreboard_id=self.scoreboard_id,
+        ).returns(True)
+
+        db_scoreboard.async_func('read').call_with(self.scoreboard_id).returns(self.scoreboard)
+
+        db_scoreboard_setting_team_contest.async_func('read').call_with(self.scoreboard.setting_id).returns(
+            self.setting_data,
+        )
+
+        db_challenge.async_func('read').call_with(
+            challenge_id=self.scoreboard.challenge_id,
+        ).returns(challenge)
+        db_team.async_func('browse_with_team_label_filter').call_with(
+            class_id=challenge.class_id,
+            team_label_filter=self.setting_data.team_label_filter,
+        ).returns(self.teams)
+
+        db_challenge.async_func('read').call_with(
+            self.scoreboard.challenge_id,
+        ).returns(challenge)
+
+        db_judgment.async_func('browse_class_team_runs').call_with(
+            problem_id=self.scoreboard.target_problem_ids[0],
+            class_id=challenge.class_id,
+            team_ids=[1, 2],
+        ).returns(runs)
+
+        # for noMoreUpdate in TimeInfo
+        datetime_now.call_with().returns(self.now)
+        # for timeStamp in TimeInfo
+        datetime_now.call_with().returns(self.now)
+
+    async def _view_runs(self, challenge: do.Challenge, runs, request_time: datetime, since: int = None):
         with (
             mock.Controller() as controller,
             mock.Context() as context,
         ):
             context.set_account(self.login_account)
-            context.set_request_time(self.time)
+            context.set_request_time(request_time)
 
-            service_rbac = controller.mock_module('service.rbac')
-            db_scoreboard = controller.mock_module('persistence.database.scoreboard')
-            db_scoreboard_setting_team_contest = controller.mock_module(
-                'persistence.database.scoreboard_setting_team_contest',
-            )
-            db_challenge = controller.mock_module('persistence.database.challenge')
-            db_team = controller.mock_module('persistence.database.team')
-            db_judgment = controller.mock_module('persistence.database.judgment')
-            datetime_now = controller.mock_module('datetime.datetime').func('now')
+            self._mock_runs(controller, challenge, runs=runs)
 
-            service_rbac.async_func('validate_class').call_with(
-                self.login_account.id, enum.RoleType.normal,
-                scoreboard_id=self.scoreboard_id,
-            ).returns(True)
+            return await mock.unwrap(hardcode.view_team_contest_scoreboard_runs)(self.scoreboard_id, since=since)
 
-            db_scoreboard.async_func('read').call_with(self.scoreboard_id).returns(self.scoreboard)
+    async def test_happy_flow(self):
+        result = await self._view_runs(self.challenge, self.runs_result, request_time=self.now)
 
-            db_scoreboard_setting_team_contest.async_func('read').call_with(self.scoreboard.setting_id).returns(
-                self.setting_data,
-            )
+        self.assertEqual(result, self.result)
 
-            db_challenge.async_func('read').call_with(
-                challenge_id=self.scoreboard.challenge_id,
-            ).returns(self.challenge)
-            db_team.async_func('browse_with_team_label_filter').call_with(
-                class_id=self.challenge.class_id,
-                team_label_filter=self.setting_data.team_label_filter,
-            ).returns(self.teams)
+    async def test_since(self):
+        result = await self._view_runs(self.challenge, self.runs_result, request_time=self.now, since=9 * 60)
 
-            db_challenge.async_func('read').call_with(
-                self.scoreboard.challenge_id,
-            ).returns(self.challenge)
+        self.assertEqual(result, hardcode.ViewTeamContestScoreboardRunsOutput(
+            time=self.result.time,
+            runs=self.result.runs[1:],
+            cursor=30,
+        ))
 
-            db_judgment.async_func('get_class_all_team_submission_verdict_before_freeze').call_with(
-                problem_id=self.scoreboard.target_problem_ids[0],
-                class_id=self.challenge.class_id,
-                team_ids=[1, 2],
-                freeze_time=self.challenge.end_time - timedelta(hours=1),
-            ).returns(self.freeze_result)
+    async def test_since_no_new_run(self):
+        result = await self._view_runs(self.challenge, self.runs_result, request_time=self.now, since=12 * 60)
 
-            # for noMoreUpdate in TimeInfo
-            datetime_now.call_with().returns(self.now)
-            # for timeStamp in TimeInfo
-            datetime_now.call_with().returns(self.now)
+        self.assertEqual(result, hardcode.ViewTeamContestScoreboardRunsOutput(
+            time=self.result.time,
+            runs=[],
+            cursor=30,
+        ))
 
-            result = await mock.unwrap(hardcode.view_team_contest_scoreboard_runs)(self.scoreboard_id)
+    async def test_since_overlap(self):
+        # Judged (run 2 at 11 min) before the previous read, but may be committed after it
+        result = await self._view_runs(self.challenge, self.runs_result, request_time=self.now,
+                                       since=11 * 60 + 10)
 
-        self.assertEqual(result, self.result)
+        self.assertEqual(result, hardcode.ViewTeamContestScoreboardRunsOutput(
+            time=self.result.time,
+            runs=self.result.runs[1:],
+            cursor=30,
+        ))
+
+    def _freeze_challenge_and_runs(self):
+        challenge = copy.deepcopy(self.challenge)
+        challenge.end_time = self.time + timedelta(hours=2)
+        runs_result = [
+            (1, 1, self.time + timedelta(minutes=5), self.time + timedelta(minutes=6), enum.VerdictType.accepted),
+            (2, 3, self.time + timedelta(minutes=70), self.time + timedelta(minutes=71),  # after freeze
+             enum.VerdictType.accepted),
+            (2, 2, self.time + timedelta(minutes=10), self.time + timedelta(minutes=85),  # judged late
+             enum.VerdictType.wrong_answer),
+        ]
+        return challenge, runs_result
+
+    async def test_freeze(self):
+        challenge, runs_result = self._freeze_challenge_and_runs()
+
+        result = await self._view_runs(challenge, runs_result, request_time=self.time + timedelta(minutes=90))
+
+        self.assertEqual(result, hardcode.ViewTeamContestScoreboardRunsOutput(
+            time=hardcode.TimeInfo(
+                contestTime=7200,
+                noMoreUpdate=False,
+                timestamp=30,
+            ),
+            runs=[
+                self.result.runs[0],
+                hardcode.ReturnEachRun(
+                    id=2,
+                    team=2,
+                    problem=1,
+                    result="No - Wrong Answer",
+                    submissionTime=10,
+                ),
+            ],
+            cursor=90 * 60,
+        ))
+
+    async def test_since_freeze(self):
+        challenge, runs_result = self._freeze_challenge_and_runs()
+
+        result = await self._view_runs(challenge, runs_result, request_time=self.time + timedelta(hours=3),
+                                       since=90 * 60)
+
+        self.assertEqual(result, hardcode.ViewTeamContestScoreboardRunsOutput(
+            time=hardcode.TimeInfo(
+                contestTime=7200,
+                noMoreUpdate=False,
+                timestamp=30,
+            ),
+            runs=[  # hidden during the freeze, and shown at the end
+                hardcode.ReturnEachRun(
+                    id=3,
+                    team=2,
+                    problem=1,
+                    result="Yes",
+                    submissionTime=70,
+                ),
+            ],
+            cursor=3 * 60 * 60,
+        ))
 
     async def test_illegal_input(self):
         with (
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Optional, Sequence
 from uuid import UUID
 
-from fastapi import UploadFile, File, BackgroundTasks
+from fastapi import UploadFile, File, BackgroundTasks, Depends
 from pydantic import BaseModel, PositiveInt
 
 import const
@@ -253,6 +253,42 @@ async def add_testcase_under_problem(problem_id: int, data: AddTestcaseInput) ->
     return model.AddOutput(id=testcase_id)
 
 
+@dataclass
+class ImportTestcaseOutput:
+    filename: str
+    type: Optional[str]
+    id: Optional[int]
+    error: Optional[str]
+
+
+@router.post('/problem/{problem_id}/testcase/import', tags=['Testcase'],
+             dependencies=[Depends(util.file.valid_file_length(file_length=const.TESTCASE_IMPORT_UPLOAD_LIMIT))])
+@enveloped
+async def import_testcase_under_problem(problem_id: int, is_sample: bool, time_limit: PositiveInt,
+                                        memory_limit: PositiveInt, score: int = 0,
+                                        archive: UploadFile = File(...)) -> Sequence[ImportTestcaseOutput]:
+    """
+    ### 權限
+    - Class manager
+
+    ### Archive
+    - `<label>.in`, `<label>.out`: input / output data of the testcase of the label, added if not exist
+    - `assisting_data/<filename>`: assisting data of the filename, added if not exist
+
+    `score`, `time_limit` and `memory_limit` are only for the added testcases.
+    Each file is reported with its `type` (`input`, `output` or `assisting_data`), the `id` of its testcase or
+    assisting data, or its `error`; failed files are not imported.
+    """
+    if not await service.rbac.validate_class(context.account.id, RoleType.manager, problem_id=problem_id):
+        raise exc.NoPermission
+
+    results = await service.testcase_import.import_archive(problem_id=problem_id, file=archive.file,
+                                                           is_sample=is_sample, score=score,
+                                                           time_limit=time_limit, memory_limit=memory_limit)
+    return [ImportTestcaseOutput(filename=result.filename, type=result.type, id=result.id, error=result.error)
+            for result in results]
+
+
 @dataclass
 class ReadTestcaseOutput:
     id: int
@@ -339,8 +375,8 @@ async def add_assisting_data_under_problem(problem_id: int, assisting_data: Uplo
     if not await service.rbac.validate_class(context.account.id, RoleType.manager, problem_id=problem_id):
         raise exc.NoPermission
 
-    s3_file = await s3.assisting_data.upload(file=assisting_data.file)
-    s3_file_uuid = await db.s3_file.add_with_do(s3_file=s3_file)
+    s3_file_uuid = await service.storage.upload(assisting_data.file, bucket=s3.assisting_data.BUCKET_NAME,
+                                                upload_func=s3.assisting_data.upload)
 
     assisting_data_id = await db.assisting_data.add(problem_id=problem_id, s3_file_uuid=s3_file_uuid,
                                                     filename=assisting_data.filename)
@@ -472,21 +508,45 @@ async def get_score_by_best_under_problem(problem_id: int) -> GetScoreByTypeOutp
 
 @dataclass
 class RejudgeProblemOutput:
+    rejudge_job_id: int
     submission_count: int
 
 
 @router.post('/problem/{problem_id}/rejudge')
 @enveloped
-async def rejudge_problem(problem_id: int) -> RejudgeProblemOutput:
+async def rejudge_problem(problem_id: int, background_tasks: BackgroundTasks) -> RejudgeProblemOutput:
     """
     ### 權限
     - Class manager
+
+    ### Notes
+    - Judge tasks are published in background; check the progress with `GET /rejudge-job/{rejudge_job_id}`
     """
     if not await service.rbac.validate_class(context.account.id, RoleType.manager, problem_id=problem_id):
         raise exc.NoPermission
 
-    rejudged_submissions = await service.judge.judge_problem_submissions(problem_id)
-    return RejudgeProblemOutput(submission_count=len(rejudged_submissions))
+    submission_count = await db.submission.count_under_problem(problem_id)
+    rejudge_job_id = await db.rejudge_job.add(problem_id=problem_id, submitter_id=context.account.id,
+                                              total_count=submission_count, create_time=context.request_time)
+
+    util.background_task.launch(background_tasks, service.judge.rejudge_problem,
+                                rejudge_job_id=rejudge_job_id, problem_id=problem_id)
+
+    return RejudgeProblemOutput(rejudge_job_id=rejudge_job_id, submission_count=submission_count)
+
+
+@router.get('/rejudge-job/{rejudge_job_id}')
+@enveloped
+async def read_rejudge_job(rejudge_job_id: int) -> do.RejudgeJob:
+    """
+    ### 權限
+    - Class manager
+    """
+    rejudge_job = await db.rejudge_job.read(rejudge_job_id)
+    if not await service.rbac.validate_class(context.account.id, RoleType.manager, problem_id=rejudge_job.problem_id):
+        raise exc.NoPermission
+
+    return rejudge_job
 
 
 @dataclass
@@ -10,6 +10,7 @@ from fastapi import UploadFile, BackgroundTasks
 import const
 import exceptions as exc
 from base import enum, do
+import service
 from util import mock, model, security
 
 from . import problem
@@ -683,6 +684,65 @@ class TestAddTestCaseUnderProblem(unittest.IsolatedAsyncioTestCase):
                 await mock.unwrap(problem.add_testcase_under_problem)(problem_id=self.problem_id, data=self.data)  # noqa
 
 
+class TestImportTestcaseUnderProblem(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.account = security.AuthedAccount(id=1, cached_username='username')
+        self.problem_id = 1
+        self.archive = UploadFile(filename='testcases.zip')
+        self.results = [
+            service.testcase_import.FileResult(filename='1.in', type='input', id=1, error=None),
+            service.testcase_import.FileResult(filename='readme.md', type=None, id=None, error='IllegalInput'),
+        ]
+        self.expected_output = [
+            problem.ImportTestcaseOutput(filename='1.in', type='input', id=1, error=None),
+            problem.ImportTestcaseOutput(filename='readme.md', type=None, id=None, error='IllegalInput'),
+        ]
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            service_rbac = controller.mock_module('service.rbac')
+            service_testcase_import = controller.mock_module('service.testcase_import')
+
+            service_rbac.async_func('validate_class').call_with(
+                context.account.id, enum.RoleType.manager, problem_id=self.problem_id,
+            ).returns(True)
+            service_testcase_import.async_func('import_archive').call_with(
+                problem_id=self.problem_id, file=mock.AnyInstanceOf(type(self.archive.file)),
+                is_sample=True, score=0, time_limit=1000, memory_limit=65536,
+            ).returns(self.results)
+
+            result = await mock.unwrap(problem.import_testcase_under_problem)(
+                problem_id=self.problem_id, is_sample=True, time_limit=1000, memory_limit=65536,
+                archive=self.archive,
+            )
+
+        self.assertEqual(result, self.expected_output)
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            service_rbac = controller.mock_module('service.rbac')
+
+            service_rbac.async_func('validate_class').call_with(
+                context.account.id, enum.RoleType.manager, problem_id=self.problem_id,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await mock.unwrap(problem.import_testcase_under_problem)(
+                    problem_id=self.problem_id, is_sample=True, time_limit=1000, memory_limit=65536,
+                    archive=self.archive,
+                )
+
+
 class BrowseAllTestcaseUnderProblem(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.account = security.AuthedAccount(id=1, cached_username='username')
@@ -887,19 +947,16 @@ class TestAddAssistingDataUnderProblem(unittest.IsolatedAsyncioTestCase):
             context.set_account(self.account)
 
             service_rbac = controller.mock_module('service.rbac')
-            s3_assisting_data = controller.mock_module('persistence.s3.assisting_data')
-            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            service_storage = controller.mock_module('service.storage')
             db_assisting_data = controller.mock_module('persistence.database.assisting_data')
 
             service_rbac.async_func('validate_class').call_with(
                 context.account.id, enum.RoleType.manager, problem_id=self.problem_id,
             ).returns(True)
 
-            s3_assisting_data.async_func('upload').call_with(
-                file=mock.AnyInstanceOf(type(self.assisting_data.file)),
-            ).returns(self.s3_file)
-            db_s3_file.async_func('add_with_do').call_with(
-                s3_file=mock.AnyInstanceOf(type(self.s3_file)),
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(type(self.assisting_data.file)),
+                bucket=problem.s3.assisting_data.BUCKET_NAME, upload_func=problem.s3.assisting_data.upload,
             ).returns(self.s3_file.uuid)
 
             db_assisting_data.async_func('add').call_with(
@@ -1365,30 +1422,13 @@ class TestGetScoreByBestUnderProblem(unittest.IsolatedAsyncioTestCase):
 class TestRejudgeProblem(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.account = security.AuthedAccount(id=1, cached_username='username')
+        self.request_time = datetime(2023, 7, 29, 14, 36, 0)
         self.problem_id = 1
-        self.rejudged_submissions = [
-            do.Submission(
-                id=1,
-                account_id=1,
-                problem_id=1,
-                language_id=1,
-                content_file_uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
-                content_length=1,
-                filename='filename',
-                submit_time=datetime(2023, 7, 29),
-            ),
-            do.Submission(
-                id=2,
-                account_id=1,
-                problem_id=1,
-                language_id=1,
-                content_file_uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
-                content_length=1,
-                filename='filename',
-                submit_time=datetime(2023, 7, 29),
-            ),
-        ]
-        self.expected_output = problem.RejudgeProblemOutput(submission_count=len(self.rejudged_submissions))
+        self.submission_count = 2
+        self.rejudge_job_id = 1
+        self.background_tasks = BackgroundTasks()
+        self.expected_output = problem.RejudgeProblemOutput(rejudge_job_id=self.rejudge_job_id,
+                                                            submission_count=self.submission_count)
 
     async def test_happy_flow(self):
         with (
@@ -1396,19 +1436,28 @@ class TestRejudgeProblem(unittest.IsolatedAsyncioTestCase):
             mock.Context() as context,
         ):
             context.set_account(self.account)
+            context.set_request_time(self.request_time)
 
             service_rbac = controller.mock_module('service.rbac')
-            service_judge = controller.mock_module('service.judge')
+            db_submission = controller.mock_module('persistence.database.submission')
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+            util_background_task = controller.mock_module('util.background_task')
 
             service_rbac.async_func('validate_class').call_with(
                 context.account.id, enum.RoleType.manager, problem_id=self.problem_id,
             ).returns(True)
+            db_submission.async_func('count_under_problem').call_with(self.problem_id).returns(self.submission_count)
+            db_rejudge_job.async_func('add').call_with(
+                problem_id=self.problem_id, submitter_id=context.account.id,
+                total_count=self.submission_count, create_time=self.request_time,
+            ).returns(self.rejudge_job_id)
+            util_background_task.func('launch').call_with(
+                mock.AnyInstanceOf(type(self.background_tasks)), mock.AnyInstanceOf(object),
+                rejudge_job_id=self.rejudge_job_id, problem_id=self.problem_id,
+            ).returns(None)
 
-            service_judge.async_func('judge_problem_submissions').call_with(
-                self.problem_id,
-            ).returns(self.rejudged_submissions)
-
-            result = await mock.unwrap(problem.rejudge_problem)(problem_id=self.problem_id)
+            result = await mock.unwrap(problem.rejudge_problem)(problem_id=self.problem_id,
+                                                                background_tasks=self.background_tasks)
 
         self.assertEqual(result, self.expected_output)
 
@@ -1426,7 +1475,63 @@ class TestRejudgeProblem(unittest.IsolatedAsyncioTestCase):
             ).returns(False)
 
             with self.assertRaises(exc.NoPermission):
-                await mock.unwrap(problem.rejudge_problem)(problem_id=self.problem_id)
+                await mock.unwrap(problem.rejudge_problem)(problem_id=self.problem_id,
+                                                           background_tasks=self.background_tasks)
+
+
+class TestReadRejudgeJob(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.account = security.AuthedAccount(id=1, cached_username='username')
+        self.rejudge_job = do.RejudgeJob(
+            id=1,
+            problem_id=1,
+            submitter_id=1,
+            status=enum.RejudgeJobStatus.running,
+            total_count=2,
+            published_count=1,
+            skipped_count=0,
+            create_time=datetime(2023, 7, 29, 14, 36, 0),
+            finish_time=None,
+            error_message=None,
+        )
+        self.expected_output = copy.deepcopy(self.rejudge_job)
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+            service_rbac = controller.mock_module('service.rbac')
+
+            db_rejudge_job.async_func('read').call_with(self.rejudge_job.id).returns(self.rejudge_job)
+            service_rbac.async_func('validate_class').call_with(
+                context.account.id, enum.RoleType.manager, problem_id=self.rejudge_job.problem_id,
+            ).returns(True)
+
+            result = await mock.unwrap(problem.read_rejudge_job)(rejudge_job_id=self.rejudge_job.id)
+
+        self.assertEqual(result, self.expected_output)
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+            service_rbac = controller.mock_module('service.rbac')
+
+            db_rejudge_job.async_func('read').call_with(self.rejudge_job.id).returns(self.rejudge_job)
+            service_rbac.async_func('validate_class').call_with(
+                context.account.id, enum.RoleType.manager, problem_id=self.rejudge_job.problem_id,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await mock.unwrap(problem.read_rejudge_job)(rejudge_job_id=self.rejudge_job.id)
 
 
 class TestGetProblemStatistics(unittest.IsolatedAsyncioTestCase):
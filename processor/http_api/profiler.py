@@ -0,0 +1,56 @@
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+
+from .docs import get_current_username_dependency
+
+
+def _hook_stacks(app: FastAPI, url: str):
+    import middleware.profiler
+
+    @app.get(url, include_in_schema=False, response_class=PlainTextResponse)
+    async def read_handler(route: str = None):
+        return middleware.profiler.stack_aggregator.collapsed(route=route)
+
+    @app.delete(url, include_in_schema=False, response_class=PlainTextResponse)
+    async def clear_handler():
+        return _collapse_and_clear(middleware.profiler.stack_aggregator)
+
+
+def _hook_secret_stacks(app: FastAPI, url: str, username: str, password: str):
+    import middleware.profiler
+
+    @app.get(url, include_in_schema=False, response_class=PlainTextResponse)
+    async def read_handler(route: str = None, _=Depends(get_current_username_dependency(username, password))):
+        return middleware.profiler.stack_aggregator.collapsed(route=route)
+
+    @app.delete(url, include_in_schema=False, response_class=PlainTextResponse)
+    async def clear_handler(_=Depends(get_current_username_dependency(username, password))):
+        return _collapse_and_clear(middleware.profiler.stack_aggregator)
+
+
+def _collapse_and_clear(aggregator) -> str:
+    """
+    Returns the stacks cleared, so that none collected between reading and clearing is lost.
+    """
+    collapsed = aggregator.collapsed()
+    aggregator.clear()
+    return collapsed
+
+
+def hook_profiler(app: FastAPI):
+    """
+    Expose aggregated profiler stacks in collapsed-stack format, protected the same way as docs.
+    `GET` reads the stacks (of `?route=` if given); `DELETE` reads and clears all stacks.
+    """
+    from config import app_config, profiler_config
+
+    if not (profiler_config.enabled and profiler_config.aggregate and profiler_config.stacks_url):
+        return
+
+    username = app_config.docs_username
+    password = app_config.docs_password
+
+    if username and password:
+        _hook_secret_stacks(app, url=profiler_config.stacks_url, username=username, password=password)
+    else:
+        _hook_stacks(app, url=profiler_config.stacks_url)
@@ -1,7 +1,13 @@
+import asyncio
 from dataclasses import dataclass
+from typing import Sequence
 from uuid import UUID
 
+import pydantic
+from pydantic import BaseModel
+
 import exceptions as exc
+from base import do
 from base.enum import RoleType
 from middleware import APIRouter, response, enveloped, auth
 import persistence.database as db
@@ -40,3 +46,51 @@ async def get_s3_file_url(s3_file_uuid: UUID, filename: str, as_attachment: bool
     except exc.persistence.NotFound:  # 如果 db 找不到的話就代表在 temp 裡面
         return S3FileUrlOutput(url=await s3.tools.sign_url(bucket='temp', key=str(s3_file_uuid),
                                                            filename=filename, as_attachment=as_attachment))
+
+
+class BatchGetS3FileUrlInput(BaseModel):
+    s3_file_uuid: UUID
+    filename: str
+    as_attachment: bool
+
+
+@dataclass
+class BatchGetS3FileUrlOutput:
+    s3_file_uuid: UUID
+    url: str
+
+
+@router.get('/s3-file/url/batch')
+@enveloped
+async def batch_get_s3_file_url(files: pydantic.Json) -> Sequence[BatchGetS3FileUrlOutput]:
+    """
+    ### 權限
+    - SN
+
+    ### Notes
+    - `files`: list of `{"s3_file_uuid": str, "filename": str, "as_attachment": bool}`
+    - 回傳順序與 `files` 相同
+    - 目前所有 url 都有時間限制 (超時會自動過期)
+    """
+    files = pydantic.parse_obj_as(list[BatchGetS3FileUrlInput], files)
+    if not files:
+        return []
+
+    if not await service.rbac.validate_system(context.account.id, min_role=RoleType.normal):
+        raise exc.NoPermission
+
+    s3_files = {s3_file.uuid: s3_file
+                for s3_file in await db.s3_file.browse_with_uuids([file.s3_file_uuid for file in files])
+                if s3_file}
+
+    async def sign(file: BatchGetS3FileUrlInput) -> BatchGetS3FileUrlOutput:
+        s3_file = s3_files.get(file.s3_file_uuid)
+        if s3_file is None:  # 如果 db 找不到的話就代表在 temp 裡面
+            s3_file = do.S3File(uuid=file.s3_file_uuid, bucket='temp', key=str(file.s3_file_uuid))
+        return BatchGetS3FileUrlOutput(
+            s3_file_uuid=file.s3_file_uuid,
+            url=await s3.tools.sign_url(bucket=s3_file.bucket, key=s3_file.key,
+                                        filename=file.filename, as_attachment=file.as_attachment),
+        )
+
+    return await asyncio.gather(*(sign(file) for file in files))
@@ -97,3 +97,82 @@ class TestGetS3FileUrl(unittest.IsolatedAsyncioTestCase):
 
             with self.assertRaises(exc.NoPermission):
                 await mock.unwrap(s3_file.get_s3_file_url)(self.s3_file_uuid, self.filename, self.as_attachment)
+
+
+class TestBatchGetS3FileUrl(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.account = security.AuthedAccount(id=1, cached_username='self')
+
+        self.files_json = None
+        self.s3_file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
+        self.temp_file_uuid = UUID('4ab2eaf0-7bb7-4b5b-a8e0-3fb0a1f1bb0e')
+        self.files = [
+            s3_file.BatchGetS3FileUrlInput(s3_file_uuid=self.s3_file_uuid, filename='filename',
+                                           as_attachment=True),
+            s3_file.BatchGetS3FileUrlInput(s3_file_uuid=self.temp_file_uuid, filename='temp',
+                                           as_attachment=False),
+        ]
+        self.s3_file = do.S3File(
+            uuid=self.s3_file_uuid,
+            bucket="bucket",
+            key="key",
+        )
+
+        self.expected_happy_flow_result = [
+            s3_file.BatchGetS3FileUrlOutput(s3_file_uuid=self.s3_file_uuid, url='url'),
+            s3_file.BatchGetS3FileUrlOutput(s3_file_uuid=self.temp_file_uuid, url='temp_url'),
+        ]
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            service_rbac = controller.mock_module('service.rbac')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[s3_file.BatchGetS3FileUrlInput], self.files_json,
+            ).returns(self.files)
+            service_rbac.async_func('validate_system').call_with(
+                self.account.id,
+                min_role=enum.RoleType.normal,
+            ).returns(True)
+            db_s3_file.async_func('browse_with_uuids').call_with(
+                [self.s3_file_uuid, self.temp_file_uuid],
+            ).returns([self.s3_file, None])
+            s3_tools.async_func('sign_url').call_with(
+                bucket=self.s3_file.bucket, key=self.s3_file.key,
+                filename='filename', as_attachment=True,
+            ).returns('url')
+            s3_tools.async_func('sign_url').call_with(
+                bucket='temp', key=str(self.temp_file_uuid),
+                filename='temp', as_attachment=False,
+            ).returns('temp_url')
+
+            result = await mock.unwrap(s3_file.batch_get_s3_file_url)(self.files_json)
+
+        self.assertEqual(result, self.expected_happy_flow_result)
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+
+            service_rbac = controller.mock_module('service.rbac')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[s3_file.BatchGetS3FileUrlInput], self.files_json,
+            ).returns(self.files)
+            service_rbac.async_func('validate_system').call_with(
+                self.account.id,
+                min_role=enum.RoleType.normal,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await mock.unwrap(s3_file.batch_get_s3_file_url)(self.files_json)
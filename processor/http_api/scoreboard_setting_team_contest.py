@@ -1,11 +1,15 @@
 import datetime
+import functools
 import math
 from dataclasses import dataclass
 from typing import Optional, Sequence
 
+from fastapi import Request
 from pydantic import BaseModel, constr
 
+from base import do
 from base.enum import RoleType, ScoreboardType, VerdictType
+import const
 import exceptions as exc
 from middleware import APIRouter, response, enveloped, auth
 import persistence.database as db
@@ -55,6 +59,15 @@ async def view_team_contest_scoreboard(scoreboard_id: int) \
     if scoreboard.type != ScoreboardType.team_contest:
         raise exc.IllegalInput
 
+    return await _compute_team_contest_scoreboard(scoreboard)
+
+
+async def _compute_team_contest_scoreboard(scoreboard: do.Scoreboard, respect_freeze: bool = False) \
+        -> Sequence[ViewTeamContestScoreboardOutput]:
+    """
+    :param respect_freeze: only count submissions before the freeze time during the freeze window,
+                           as `/hardcode/team-contest-scoreboard/{scoreboard_id}/runs`
+    """
     setting_data = await db.scoreboard_setting_team_contest.read(scoreboard.setting_id)
 
     class_id = (await db.challenge.read(challenge_id=scoreboard.challenge_id)).class_id
@@ -62,12 +75,23 @@ async def view_team_contest_scoreboard(scoreboard_id: int) \
                                                         team_label_filter=setting_data.team_label_filter)
     challenge = await db.challenge.read(scoreboard.challenge_id)
 
+    freeze_time = None
+    if respect_freeze:
+        freeze_time = challenge.end_time - datetime.timedelta(seconds=const.SCOREBOARD_FREEZE_SECS)
+        if not freeze_time < datetime.datetime.now() < challenge.end_time:
+            freeze_time = None
+
     team_problem_datas: dict[int, list[ViewTeamContestScoreboardProblemScoreOutput]] = {team.id: [] for team in teams}
 
     for problem_id in scoreboard.target_problem_ids:
 
-        team_verdict_infos = await db.judgment.get_class_all_team_all_submission_verdict(
-            problem_id=problem_id, class_id=class_id, team_ids=[team.id for team in teams])
+        if freeze_time:
+            team_verdict_infos = await db.judgment.get_class_all_team_submission_verdict_before_freeze(
+                problem_id=problem_id, class_id=class_id, team_ids=[team.id for team in teams],
+                freeze_time=freeze_time)
+        else:
+            team_verdict_infos = await db.judgment.get_class_all_team_all_submission_verdict(
+                problem_id=problem_id, class_id=class_id, team_ids=[team.id for team in teams])
 
         first_solve_team_id = None
         team_solve_mins: dict[int, int] = {}
@@ -114,6 +138,35 @@ async def view_team_contest_scoreboard(scoreboard_id: int) \
     ) for team in teams]
 
 
+@router.get('/team-contest-scoreboard/view/{scoreboard_id}/stream', response_class=response.EventSourceResponse)
+async def stream_team_contest_scoreboard(scoreboard_id: int, request: Request):
+    """
+    ### 權限
+    - Class Normal
+
+    ### Notes
+    - Server-sent events, not enveloped: a `snapshot` event of all the team rows (as the view),
+      then an `update` event of the changed team rows as new judgments are saved,
+      at most once per `SCOREBOARD_STREAM_MIN_INTERVAL` seconds; a new `snapshot` event if the teams change
+    - Frozen in the last hour of the challenge, as `/hardcode/team-contest-scoreboard/{scoreboard_id}/runs`
+    """
+    if not await service.rbac.validate_class(context.account.id, RoleType.normal, scoreboard_id=scoreboard_id):
+        raise exc.NoPermission
+
+    scoreboard = await db.scoreboard.read(scoreboard_id)
+    if scoreboard.type != ScoreboardType.team_contest:
+        raise exc.IllegalInput
+
+    challenge = await db.challenge.read(scoreboard.challenge_id)
+
+    return response.EventSourceResponse(service.scoreboard_event.stream(
+        scoreboard_id=scoreboard.id, problem_ids=scoreboard.target_problem_ids,
+        compute=functools.partial(_compute_team_contest_scoreboard, scoreboard, respect_freeze=True),
+        is_disconnected=request.is_disconnected,
+        refresh_times=[challenge.end_time],  # unfreeze
+    ))
+
+
 class EditScoreboardInput(BaseModel):
     challenge_label: str = None
     title: str = None
@@ -228,6 +228,62 @@ class TestViewTeamContestScoreboard(unittest.IsolatedAsyncioTestCase):
                 )
 
 
+class TestStreamTeamContestScoreboard(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.login_account = security.AuthedAccount(id=1, cached_username='self')
+        self.scoreboard_id = 1
+        self.scoreboard_project = do.Scoreboard(
+            id=1,
+            challenge_id=2,
+            challenge_label='label2',
+            title='title2',
+            target_problem_ids=[3, 4],
+            is_deleted=False,
+            type=enum.ScoreboardType.team_project,
+            setting_id=2,
+        )
+
+    async def test_illegal_input(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.login_account)
+
+            service_rbac = controller.mock_module('service.rbac')
+            db_scoreboard = controller.mock_module('persistence.database.scoreboard')
+
+            service_rbac.async_func('validate_class').call_with(
+                self.login_account.id, enum.RoleType.normal, scoreboard_id=self.scoreboard_id,
+            ).returns(True)
+            db_scoreboard.async_func('read').call_with(self.scoreboard_id).returns(
+                self.scoreboard_project,
+            )
+
+            with self.assertRaises(exc.IllegalInput):
+                await scoreboard_setting_team_contest.stream_team_contest_scoreboard(
+                    scoreboard_id=self.scoreboard_id, request=None,
+                )
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.login_account)
+
+            service_rbac = controller.mock_module('service.rbac')
+
+            service_rbac.async_func('validate_class').call_with(
+                self.login_account.id, enum.RoleType.normal, scoreboard_id=self.scoreboard_id,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await scoreboard_setting_team_contest.stream_team_contest_scoreboard(
+                    scoreboard_id=self.scoreboard_id, request=None,
+                )
+
+
 class TestEditTeamContestScoreboard(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
 
@@ -1,8 +1,11 @@
 from dataclasses import dataclass
+import functools
 from typing import Optional, Sequence
 
+from fastapi import Request
 from pydantic import BaseModel, constr
 
+from base import do
 from base.enum import RoleType, ScoreboardType, VerdictType
 import exceptions as exc
 from middleware import APIRouter, response, enveloped, auth
@@ -48,6 +51,10 @@ async def view_team_project_scoreboard(scoreboard_id: int) \
     if scoreboard.type != ScoreboardType.team_project:
         raise exc.IllegalInput
 
+    return await _compute_team_project_scoreboard(scoreboard)
+
+
+async def _compute_team_project_scoreboard(scoreboard: do.Scoreboard) -> Sequence[ViewTeamProjectScoreboardOutput]:
     setting_data = await db.scoreboard_setting_team_project.read(scoreboard.setting_id)
 
     class_id = (await db.challenge.read(challenge_id=scoreboard.challenge_id)).class_id
@@ -99,6 +106,31 @@ async def view_team_project_scoreboard(scoreboard_id: int) \
     ) for team in teams]
 
 
+@router.get('/team-project-scoreboard/view/{scoreboard_id}/stream', response_class=response.EventSourceResponse)
+async def stream_team_project_scoreboard(scoreboard_id: int, request: Request):
+    """
+    ### 權限
+    - Class normal
+
+    ### Notes
+    - Server-sent events, not enveloped: a `snapshot` event of all the team rows (as the view),
+      then an `update` event of the changed team rows as new judgments are saved,
+      at most once per `SCOREBOARD_STREAM_MIN_INTERVAL` seconds; a new `snapshot` event if the teams change
+    """
+    if not await service.rbac.validate_class(context.account.id, RoleType.normal, scoreboard_id=scoreboard_id):
+        raise exc.NoPermission
+
+    scoreboard = await db.scoreboard.read(scoreboard_id)
+    if scoreboard.type != ScoreboardType.team_project:
+        raise exc.IllegalInput
+
+    return response.EventSourceResponse(service.scoreboard_event.stream(
+        scoreboard_id=scoreboard.id, problem_ids=scoreboard.target_problem_ids,
+        compute=functools.partial(_compute_team_project_scoreboard, scoreboard),
+        is_disconnected=request.is_disconnected,
+    ))
+
+
 class EditScoreboardInput(BaseModel):
     challenge_label: str = None
     title: str = None
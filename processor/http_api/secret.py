@@ -66,7 +66,8 @@ async def add_account(data: AddAccountInput) -> None:
         raise exc.account.StudentCardExists
 
     try:
-        account_id = await db.account.add(username=data.username, pass_hash=security.hash_password(data.password),
+        account_id = await db.account.add(username=data.username,
+                                          pass_hash=await security.hash_password(data.password),
                                           nickname=data.nickname, real_name=data.real_name, role=enum.RoleType.guest)
     except exc.persistence.UniqueViolationError:
         raise exc.account.UsernameExists
@@ -106,9 +107,10 @@ async def login(data: LoginInput) -> LoginOutput:
         if not security.verify_password_4s(to_test=data.password, hashed=pass_hash):
             raise exc.account.LoginFailed  # Not to let user know why login failed
         else:
-            await db.account.edit_pass_hash(account_id=account_id, pass_hash=security.hash_password(data.password))
+            await db.account.edit_pass_hash(account_id=account_id,
+                                            pass_hash=await security.hash_password(data.password))
     else:
-        if not security.verify_password(to_test=data.password, hashed=pass_hash):
+        if not await security.verify_password(to_test=data.password, hashed=pass_hash):
             raise exc.account.LoginFailed  # Not to let user know why login failed
 
     # Get jwt
@@ -141,7 +143,7 @@ async def add_normal_account(data: AddNormalAccountInput) -> model.AddOutput:
 
     try:
         account_id = await db.account.add_normal(username=data.username,
-                                                 pass_hash=security.hash_password(data.password),
+                                                 pass_hash=await security.hash_password(data.password),
                                                  real_name=data.real_name, nickname=data.nickname,
                                                  alternative_email=data.alternative_email
                                                  if data.alternative_email is not ... else None)
@@ -181,16 +183,16 @@ async def edit_password(account_id: int, data: EditPasswordInput):
     is_self = context.account.id == account_id
     if is_self:
         pass_hash = await db.account.read_pass_hash(account_id=account_id, include_4s_hash=False)
-        if not security.verify_password(to_test=data.old_password, hashed=pass_hash):
+        if not await security.verify_password(to_test=data.old_password, hashed=pass_hash):
             raise exc.account.PasswordVerificationFailed
 
         return await db.account.edit_pass_hash(account_id=account_id,
-                                               pass_hash=security.hash_password(data.new_password))
+                                               pass_hash=await security.hash_password(data.new_password))
 
     is_manager = await service.rbac.validate_system(context.account.id, RoleType.manager)
     if is_manager:
         return await db.account.edit_pass_hash(account_id=account_id,
-                                               pass_hash=security.hash_password(data.new_password))
+                                               pass_hash=await security.hash_password(data.new_password))
 
     raise exc.NoPermission
 
@@ -203,4 +205,4 @@ class ResetPasswordInput(BaseModel):
 @router.post('/account/reset-password', tags=['Account'], response_class=JSONResponse)
 @enveloped
 async def reset_password(data: ResetPasswordInput) -> None:
-    await db.account.reset_password(code=data.code, password_hash=security.hash_password(data.password))
+    await db.account.reset_password(code=data.code, password_hash=await security.hash_password(data.password))
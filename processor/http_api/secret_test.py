@@ -104,7 +104,7 @@ class TestAddAccount(unittest.IsolatedAsyncioTestCase):
                 self.data.institute_id, include_disabled=False,
             ).returns(self.institute)
             db_student_card.async_func('is_duplicate').call_with(self.institute.id, self.data.student_id).returns(False)
-            security_.func('hash_password').call_with(self.data.password).returns(self.hashed_password)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.hashed_password)
             db_account.async_func('add').call_with(
                 username=self.data.username, pass_hash=self.hashed_password,
                 nickname=self.data.nickname, real_name=self.data.real_name, role=enum.RoleType.guest,
@@ -141,7 +141,7 @@ class TestAddAccount(unittest.IsolatedAsyncioTestCase):
             db_student_card.async_func('is_duplicate').call_with(
                 self.institute.id, self.data_with_alt.student_id,
             ).returns(False)
-            security_.func('hash_password').call_with(self.data_with_alt.password).returns(self.hashed_password)
+            security_.async_func('hash_password').call_with(self.data_with_alt.password).returns(self.hashed_password)
             db_account.async_func('add').call_with(
                 username=self.data_with_alt.username, pass_hash=self.hashed_password,
                 nickname=self.data_with_alt.nickname, real_name=self.data_with_alt.real_name, role=enum.RoleType.guest,
@@ -186,7 +186,7 @@ class TestAddAccount(unittest.IsolatedAsyncioTestCase):
             db_student_card.async_func('is_duplicate').call_with(
                 self.institute.id, self.data_no_alt.student_id,
             ).returns(False)
-            security_.func('hash_password').call_with(self.data_no_alt.password).returns(self.hashed_password)
+            security_.async_func('hash_password').call_with(self.data_no_alt.password).returns(self.hashed_password)
             db_account.async_func('add').call_with(
                 username=self.data_no_alt.username, pass_hash=self.hashed_password,
                 nickname=self.data_no_alt.nickname, real_name=self.data_no_alt.real_name, role=enum.RoleType.guest,
@@ -263,7 +263,7 @@ class TestAddAccount(unittest.IsolatedAsyncioTestCase):
                 self.data.institute_id, include_disabled=False,
             ).returns(self.institute)
             db_student_card.async_func('is_duplicate').call_with(self.institute.id, self.data.student_id).returns(False)
-            security_.func('hash_password').call_with(self.data.password).returns(self.hashed_password)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.hashed_password)
             db_account.async_func('add').call_with(
                 username=self.data.username, pass_hash=self.hashed_password,
                 nickname=self.data.nickname, real_name=self.data.real_name, role=enum.RoleType.guest,
@@ -285,7 +285,7 @@ class TestAddAccount(unittest.IsolatedAsyncioTestCase):
                 self.data.institute_id, include_disabled=False,
             ).returns(self.institute)
             db_student_card.async_func('is_duplicate').call_with(self.institute.id, self.data.student_id).returns(False)
-            security_.func('hash_password').call_with(self.data.password).returns(self.hashed_password)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.hashed_password)
             db_account.async_func('add').call_with(
                 username=self.data.username, pass_hash=self.hashed_password,
                 nickname=self.data.nickname, real_name=self.data.real_name, role=enum.RoleType.guest,
@@ -348,7 +348,9 @@ class TestLogin(unittest.IsolatedAsyncioTestCase):
             db_account.async_func('read_login_by_username').call_with(username=self.data.username).returns(
                 (self.account_id, self.pass_hash, False),
             )
-            security_.func('verify_password').call_with(to_test=self.data.password, hashed=self.pass_hash).returns(True)
+            security_.async_func('verify_password').call_with(
+                to_test=self.data.password, hashed=self.pass_hash,
+            ).returns(True)
             security_.func('encode_jwt').call_with(
                 account_id=self.account_id, expire=config.login_expire, cached_username=self.data.username,
             ).returns(self.login_token)
@@ -370,7 +372,7 @@ class TestLogin(unittest.IsolatedAsyncioTestCase):
             security_.func('verify_password_4s').call_with(
                 to_test=self.data.password, hashed=self.pass_hash,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data.password).returns(self.pass_hash)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.pass_hash)
             db_account.async_func('edit_pass_hash').call_with(
                 account_id=self.account_id, pass_hash=self.pass_hash,
             ).returns(None)
@@ -405,8 +407,9 @@ class TestLogin(unittest.IsolatedAsyncioTestCase):
             db_account.async_func('read_login_by_username').call_with(username=self.data.username).returns(
                 (self.account_id, self.pass_hash, False),
             )
-            security_.func('verify_password').call_with(to_test=self.data.password,
-                                                        hashed=self.pass_hash).returns(False)
+            security_.async_func('verify_password').call_with(
+                to_test=self.data.password, hashed=self.pass_hash,
+            ).returns(False)
 
             with self.assertRaises(exc.account.LoginFailed):
                 await mock.unwrap(secret.login)(self.data)
@@ -473,7 +476,7 @@ class TestAddNormalAccount(unittest.IsolatedAsyncioTestCase):
             service_rbac.async_func('validate_system').call_with(
                 context.account.id, enum.RoleType.manager,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data.password).returns(self.pass_hash)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.pass_hash)
             db_account.async_func('add_normal').call_with(
                 username=self.data.username,
                 pass_hash=self.pass_hash,
@@ -501,7 +504,7 @@ class TestAddNormalAccount(unittest.IsolatedAsyncioTestCase):
             service_rbac.async_func('validate_system').call_with(
                 context.account.id, enum.RoleType.manager,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data_no_alt.password).returns(self.pass_hash)
+            security_.async_func('hash_password').call_with(self.data_no_alt.password).returns(self.pass_hash)
             db_account.async_func('add_normal').call_with(
                 username=self.data_no_alt.username,
                 pass_hash=self.pass_hash,
@@ -561,7 +564,7 @@ class TestAddNormalAccount(unittest.IsolatedAsyncioTestCase):
             service_rbac.async_func('validate_system').call_with(
                 context.account.id, enum.RoleType.manager,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data.password).returns(self.pass_hash)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.pass_hash)
             db_account.async_func('add_normal').call_with(
                 username=self.data.username,
                 pass_hash=self.pass_hash,
@@ -661,10 +664,10 @@ class TestEditPassword(unittest.IsolatedAsyncioTestCase):
             db_account.async_func('read_pass_hash').call_with(
                 account_id=self.account_id, include_4s_hash=False,
             ).returns(self.pass_hash_old)
-            security_.func('verify_password').call_with(
+            security_.async_func('verify_password').call_with(
                 to_test=self.data.old_password, hashed=self.pass_hash_old,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data.new_password).returns(self.pass_hash_new)
+            security_.async_func('hash_password').call_with(self.data.new_password).returns(self.pass_hash_new)
             db_account.async_func('edit_pass_hash').call_with(
                 account_id=self.account_id, pass_hash=self.pass_hash_new,
             ).returns(None)
@@ -687,7 +690,7 @@ class TestEditPassword(unittest.IsolatedAsyncioTestCase):
             service_rbac.async_func('validate_system').call_with(
                 context.account.id, enum.RoleType.manager,
             ).returns(True)
-            security_.func('hash_password').call_with(self.data.new_password).returns(self.pass_hash_new)
+            security_.async_func('hash_password').call_with(self.data.new_password).returns(self.pass_hash_new)
             db_account.async_func('edit_pass_hash').call_with(
                 account_id=self.account_id, pass_hash=self.pass_hash_new,
             ).returns(None)
@@ -709,7 +712,7 @@ class TestEditPassword(unittest.IsolatedAsyncioTestCase):
             db_account.async_func('read_pass_hash').call_with(
                 account_id=self.account_id, include_4s_hash=False,
             ).returns(self.pass_hash_old)
-            security_.func('verify_password').call_with(
+            security_.async_func('verify_password').call_with(
                 to_test=self.data.old_password, hashed=self.pass_hash_old,
             ).returns(False)
 
@@ -757,7 +760,7 @@ class TestResetPassword(unittest.IsolatedAsyncioTestCase):
             security_ = controller.mock_module('processor.http_api.secret.security')
             db_account = controller.mock_module('persistence.database.account')
 
-            security_.func('hash_password').call_with(self.data.password).returns(self.pass_hash)
+            security_.async_func('hash_password').call_with(self.data.password).returns(self.pass_hash)
             db_account.async_func('reset_password').call_with(
                 code=self.data.code, password_hash=self.pass_hash,
             ).returns(None)
@@ -1,7 +1,8 @@
+import asyncio
 from typing import Sequence
 
 import pydantic
-from fastapi import BackgroundTasks, File, UploadFile, Depends
+from fastapi import BackgroundTasks, File, UploadFile, Depends, Request
 from pydantic import BaseModel
 
 from base import do, popo
@@ -112,8 +113,7 @@ async def submit(problem_id: int, language_id: int, background_tasks: Background
     if language.is_disabled:
         raise exc.IllegalInput
 
-    file_length = len(await content_file.read())
-    await content_file.seek(0)
+    file_length = util.file.get_length(content_file.file)
     submission_id = await service.submission.submit(file=content_file.file, filename=content_file.filename,
                                                     account_id=context.account.id, problem_id=problem.id,
                                                     file_length=file_length,
@@ -189,6 +189,59 @@ async def batch_get_submission_judgment(submission_ids: pydantic.Json) -> Sequen
     return await db.judgment.browse_latest_with_submission_ids(submission_ids=submission_ids)
 
 
+async def _can_view_judgments(submission_ids: Sequence[int]) -> bool:
+    owners = await db.submission.browse_account_and_class_ids(submission_ids=submission_ids)
+    if len(owners) < len(set(submission_ids)):
+        raise exc.persistence.NotFound
+
+    # 可以看自己的
+    class_ids = {class_id for _, account_id, class_id in owners if account_id != context.account.id}
+    if None in class_ids:
+        return False
+
+    # 助教可以看管理的 class 的; checked once per class, not per submission
+    for class_id in sorted(class_ids):
+        if not await service.rbac.validate_class(context.account.id, RoleType.manager, class_id=class_id):
+            return False
+    return True
+
+
+@router.get('/submission/judgment/stream', response_class=response.EventSourceResponse)
+async def stream_submission_judgment(submission_ids: pydantic.Json, request: Request):
+    """
+    ### 權限
+    - Self: see self
+    - Class manager: see class
+
+    ### Notes
+    - `submission_ids`: list of int
+    - Server-sent events, not enveloped: a `judgment` event of the latest judgment of each given submission,
+      then a `judgment` event whenever a new judgment of the given submissions is saved
+    """
+    submission_ids = pydantic.parse_obj_as(list[int], submission_ids)
+
+    if not await _can_view_judgments(submission_ids):
+        raise exc.NoPermission
+
+    async def _events():
+        async with service.judgment_event.subscribe(submission_ids) as judgment_ids:
+            # Subscribe first to not miss judgments saved in between
+            for judgment in await db.judgment.browse_latest_with_submission_ids(submission_ids=submission_ids):
+                yield 'judgment', judgment
+
+            # The request span would otherwise keep growing with every event until the client disconnects
+            with util.tracing.detached():
+                while not await request.is_disconnected():
+                    try:
+                        judgment_id = await asyncio.wait_for(judgment_ids.get(), timeout=const.SSE_HEARTBEAT_SECS)
+                    except asyncio.TimeoutError:
+                        yield None, None
+                    else:
+                        yield 'judgment', await db.judgment.read(judgment_id)
+
+    return response.EventSourceResponse(_events())
+
+
 @router.get('/submission/{submission_id}')
 @enveloped
 async def read_submission(submission_id: int) -> do.Submission:
@@ -1,3 +1,5 @@
+import asyncio
+import contextlib
 import copy
 from datetime import datetime
 import typing
@@ -690,6 +692,223 @@ class TestBatchGetSubmissionJudgment(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result, self.expected_no_submission_ids_result)
 
 
+class TestStreamSubmissionJudgment(unittest.IsolatedAsyncioTestCase):
+    class _Request:
+        def __init__(self, disconnects: list[bool]):
+            self._disconnects = disconnects
+
+        async def is_disconnected(self) -> bool:
+            return self._disconnects.pop(0)
+
+    def setUp(self) -> None:
+        self.account = security.AuthedAccount(id=1, cached_username='self')
+        self.submission_ids_json = None
+        self.submission_ids = [1]
+        self.class_id = 1
+        self.submission = do.Submission(
+            id=1,
+            account_id=2,
+            problem_id=1,
+            language_id=1,
+            content_file_uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
+            content_length=0,
+            filename="filename",
+            submit_time=datetime(2023, 7, 29, 12),
+        )
+        self.latest_judgment = do.Judgment(
+            id=1,
+            submission_id=1,
+            verdict=enum.VerdictType.wrong_answer,
+            total_time=1,
+            max_memory=1,
+            score=0,
+            error_message=None,
+            judge_time=datetime(2023, 7, 29, 12),
+        )
+        self.new_judgment = do.Judgment(
+            id=2,
+            submission_id=1,
+            verdict=enum.VerdictType.accepted,
+            total_time=1,
+            max_memory=1,
+            score=100,
+            error_message=None,
+            judge_time=datetime(2023, 7, 29, 13),
+        )
+
+    async def test_happy_flow(self):
+        judgment_ids = asyncio.Queue()
+        judgment_ids.put_nowait(self.new_judgment.id)
+
+        @contextlib.asynccontextmanager
+        async def subscribe():
+            yield judgment_ids
+
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+            service_judgment_event = controller.mock_module('service.judgment_event')
+            db_judgment = controller.mock_module('persistence.database.judgment')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(self.submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([(self.submission.id, self.account.id, self.class_id)])
+            service_judgment_event.func('subscribe').call_with(self.submission_ids).returns(subscribe())
+            db_judgment.async_func('browse_latest_with_submission_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([self.latest_judgment])
+            db_judgment.async_func('read').call_with(self.new_judgment.id).returns(self.new_judgment)
+
+            result = await submission.stream_submission_judgment(self.submission_ids_json,
+                                                                 request=self._Request([False, True]))
+            events = [event async for event in result.body_iterator]
+
+        self.assertEqual(len(events), 2)
+        self.assertTrue(events[0].startswith('event: judgment\ndata: {"id":1,'))
+        self.assertTrue(events[1].startswith('event: judgment\ndata: {"id":2,'))
+
+    async def test_happy_flow_class_manager(self):
+        @contextlib.asynccontextmanager
+        async def subscribe():
+            yield asyncio.Queue()
+
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+            service_rbac = controller.mock_module('service.rbac')
+            service_judgment_event = controller.mock_module('service.judgment_event')
+            db_judgment = controller.mock_module('persistence.database.judgment')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(self.submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([(self.submission.id, self.submission.account_id, self.class_id)])
+            service_rbac.async_func('validate_class').call_with(
+                self.account.id, enum.RoleType.manager, class_id=self.class_id,
+            ).returns(True)
+            service_judgment_event.func('subscribe').call_with(self.submission_ids).returns(subscribe())
+            db_judgment.async_func('browse_latest_with_submission_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([self.latest_judgment])
+
+            result = await submission.stream_submission_judgment(self.submission_ids_json,
+                                                                 request=self._Request([True]))
+            events = [event async for event in result.body_iterator]
+
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0].startswith('event: judgment\ndata: {"id":1,'))
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+            service_rbac = controller.mock_module('service.rbac')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(self.submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([(self.submission.id, self.submission.account_id, self.class_id)])
+            service_rbac.async_func('validate_class').call_with(
+                self.account.id, enum.RoleType.manager, class_id=self.class_id,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await submission.stream_submission_judgment(self.submission_ids_json,
+                                                            request=self._Request([]))
+
+    async def test_batched_permission(self):
+        @contextlib.asynccontextmanager
+        async def subscribe():
+            yield asyncio.Queue()
+
+        submission_ids = [1, 2, 3]
+
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+            service_rbac = controller.mock_module('service.rbac')
+            service_judgment_event = controller.mock_module('service.judgment_event')
+            db_judgment = controller.mock_module('persistence.database.judgment')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=submission_ids,
+            ).returns([(1, self.account.id, self.class_id), (2, 2, self.class_id), (3, 3, self.class_id)])
+            # Once for the class, instead of once per submission
+            service_rbac.async_func('validate_class').call_with(
+                self.account.id, enum.RoleType.manager, class_id=self.class_id,
+            ).returns(True)
+            service_judgment_event.func('subscribe').call_with(submission_ids).returns(subscribe())
+            db_judgment.async_func('browse_latest_with_submission_ids').call_with(
+                submission_ids=submission_ids,
+            ).returns([])
+
+            result = await submission.stream_submission_judgment(self.submission_ids_json,
+                                                                 request=self._Request([True]))
+            events = [event async for event in result.body_iterator]
+
+        self.assertEqual(events, [])
+
+    async def test_deleted_problem(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(self.submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([(self.submission.id, self.submission.account_id, None)])
+
+            with self.assertRaises(exc.NoPermission):
+                await submission.stream_submission_judgment(self.submission_ids_json,
+                                                            request=self._Request([]))
+
+    async def test_not_found(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.account)
+            db_submission = controller.mock_module('persistence.database.submission')
+
+            controller.mock_global_func('pydantic.parse_obj_as').call_with(
+                list[int], self.submission_ids_json,
+            ).returns(self.submission_ids)
+            db_submission.async_func('browse_account_and_class_ids').call_with(
+                submission_ids=self.submission_ids,
+            ).returns([])
+
+            with self.assertRaises(exc.persistence.NotFound):
+                await submission.stream_submission_judgment(self.submission_ids_json,
+                                                            request=self._Request([]))
+
+
 class TestReadSubmission(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.account = security.AuthedAccount(id=1, cached_username='self')
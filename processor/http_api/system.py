@@ -1,8 +1,11 @@
 from typing import Sequence
 
+from fastapi import BackgroundTasks
+
 from base.enum import RoleType
 from base import do
 import exceptions as exc
+import log
 from middleware import APIRouter, response, enveloped, auth
 from persistence import database as db
 import service
@@ -52,3 +55,23 @@ async def browse_access_log(
 
     access_logs, total_count = await db.access_log.browse(limit=limit, offset=offset, filters=filters, sorters=sorters)
     return BrowseAccessLogOutput(access_logs, total_count=total_count)
+
+
+@router.post('/s3-file/inline/backfill')
+@enveloped
+async def backfill_inline_s3_file(background_tasks: BackgroundTasks) -> None:
+    """
+    ### 權限
+    - System manager
+
+    Keeps inline the small submission files uploaded before the inline tier was enabled; safe to call again.
+    """
+    if not await service.rbac.validate_system(context.account.id, RoleType.manager):
+        raise exc.NoPermission
+
+    async def _task() -> None:
+        log.info('Start backfilling inline s3 files')
+        backfilled_count = await service.storage.backfill_inline()
+        log.info(f'Backfilled {backfilled_count} inline s3 files')
+
+    util.background_task.launch(background_tasks, _task)
@@ -1,6 +1,9 @@
 import datetime
+import typing
 import unittest
 
+from fastapi import BackgroundTasks
+
 from base import enum, do
 import exceptions as exc
 from util import mock, security, model
@@ -93,3 +96,58 @@ class TestBrowseAccessLog(unittest.IsolatedAsyncioTestCase):
                     self.limit, self.offset,
                     self.filter, self.sorter,
                 )
+
+
+class TestBackfillInlineS3File(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.login_account = security.AuthedAccount(id=1, cached_username='self')
+        self.background_tasks = BackgroundTasks()
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.login_account)
+
+            service_rbac = controller.mock_module('service.rbac')
+            service_storage = controller.mock_module('service.storage')
+            util_background_task = controller.mock_module('util.background_task')
+
+            service_rbac.async_func('validate_system').call_with(
+                context.account.id, enum.RoleType.manager,
+            ).returns(True)
+
+            todo_async_task: typing.Callable[..., typing.Awaitable] = None  # noqa
+
+            def _set_task(_, async_task):
+                nonlocal todo_async_task
+                todo_async_task = async_task
+
+            util_background_task.func('launch').call_with(
+                mock.AnyInstanceOf(type(self.background_tasks)), mock.AnyInstanceOf(object),
+            ).executes(_set_task)
+
+            result = await mock.unwrap(system.backfill_inline_s3_file)(self.background_tasks)
+
+            service_storage.async_func('backfill_inline').call_with().returns(3)
+
+            await todo_async_task()
+
+        self.assertIsNone(result)
+
+    async def test_no_permission(self):
+        with (
+            mock.Controller() as controller,
+            mock.Context() as context,
+        ):
+            context.set_account(self.login_account)
+
+            service_rbac = controller.mock_module('service.rbac')
+
+            service_rbac.async_func('validate_system').call_with(
+                context.account.id, enum.RoleType.manager,
+            ).returns(False)
+
+            with self.assertRaises(exc.NoPermission):
+                await mock.unwrap(system.backfill_inline_s3_file)(self.background_tasks)
@@ -91,11 +91,10 @@ async def upload_testcase_input_data(testcase_id: int, input_file: UploadFile =
     # Issue #26: CRLF
     no_cr_file = util.file.replace_cr(input_file.file)
 
-    # 流程: 先 upload 到 s3 取得 bucket, key
+    # 流程: 先 upload 到 s3 取得 bucket, key (內容相同則沿用既有的)
     #       bucket, key 進 s3_file db 得到 file id
     #       file_id 進 testcase db
-    s3_file = await s3.testdata.upload(no_cr_file)
-    file_id = await db.s3_file.add_with_do(s3_file=s3_file)
+    file_id = await service.storage.upload(no_cr_file, bucket=s3.testdata.BUCKET_NAME, upload_func=s3.testdata.upload)
     await db.testcase.edit(testcase_id=testcase_id, input_file_uuid=file_id, input_filename=input_file.filename)
 
 
@@ -112,11 +111,10 @@ async def upload_testcase_output_data(testcase_id: int, output_file: UploadFile
     # Issue #26: CRLF
     no_cr_file = util.file.replace_cr(output_file.file)
 
-    # 流程: 先 upload 到 s3 取得 bucket, key
+    # 流程: 先 upload 到 s3 取得 bucket, key (內容相同則沿用既有的)
     #       bucket, key 進 s3_file db 得到 file id
     #       file_id 進 testcase db
-    s3_file = await s3.testdata.upload(no_cr_file)
-    file_id = await db.s3_file.add_with_do(s3_file=s3_file)
+    file_id = await service.storage.upload(no_cr_file, bucket=s3.testdata.BUCKET_NAME, upload_func=s3.testdata.upload)
     await db.testcase.edit(testcase_id=testcase_id, output_file_uuid=file_id, output_filename=output_file.filename)
 
 
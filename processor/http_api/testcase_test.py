@@ -277,8 +277,7 @@ class TestUploadTestcaseInputData(unittest.IsolatedAsyncioTestCase):
 
             service_rbac = controller.mock_module('service.rbac')
             util_file = controller.mock_module('util.file')
-            s3_testdata = controller.mock_module('processor.http_api.testcase.s3.testdata')
-            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            service_storage = controller.mock_module('service.storage')
             db_testcase = controller.mock_module('persistence.database.testcase')
 
             service_rbac.async_func('validate_class').call_with(
@@ -287,10 +286,10 @@ class TestUploadTestcaseInputData(unittest.IsolatedAsyncioTestCase):
             util_file.func('replace_cr').call_with(
                 mock.AnyInstanceOf(type(self.input_file.file)),
             ).returns(self.no_cr_file)
-            s3_testdata.async_func('upload').call_with(
+            service_storage.async_func('upload').call_with(
                 mock.AnyInstanceOf(type(self.no_cr_file)),
-            ).returns(self.s3_file)
-            db_s3_file.async_func('add_with_do').call_with(s3_file=self.s3_file).returns(self.file_id)
+                bucket=testcase.s3.testdata.BUCKET_NAME, upload_func=testcase.s3.testdata.upload,
+            ).returns(self.file_id)
             db_testcase.async_func('edit').call_with(
                 testcase_id=self.testcase_id, input_file_uuid=self.file_id, input_filename=self.input_file.filename,
             ).returns(None)
@@ -338,8 +337,7 @@ class TestUploadTestcaseOutputData(unittest.IsolatedAsyncioTestCase):
 
             service_rbac = controller.mock_module('service.rbac')
             util_file = controller.mock_module('util.file')
-            s3_testdata = controller.mock_module('processor.http_api.testcase.s3.testdata')
-            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            service_storage = controller.mock_module('service.storage')
             db_testcase = controller.mock_module('persistence.database.testcase')
 
             service_rbac.async_func('validate_class').call_with(
@@ -348,10 +346,10 @@ class TestUploadTestcaseOutputData(unittest.IsolatedAsyncioTestCase):
             util_file.func('replace_cr').call_with(
                 mock.AnyInstanceOf(type(self.output_file.file)),
             ).returns(self.no_cr_file)
-            s3_testdata.async_func('upload').call_with(
+            service_storage.async_func('upload').call_with(
                 mock.AnyInstanceOf(type(self.no_cr_file)),
-            ).returns(self.s3_file)
-            db_s3_file.async_func('add_with_do').call_with(s3_file=self.s3_file).returns(self.file_id)
+                bucket=testcase.s3.testdata.BUCKET_NAME, upload_func=testcase.s3.testdata.upload,
+            ).returns(self.file_id)
             db_testcase.async_func('edit').call_with(
                 testcase_id=self.testcase_id, output_file_uuid=self.file_id, output_filename=self.output_file.filename,
             ).returns(None)
@@ -7,10 +7,14 @@ from . import (
     csv,
     downloader,
     judge,
+    judgment_event,
     moss,
     rbac,
     scoreboard,
+    scoreboard_event,
     statistics,
+    storage,
     submission,
     task,
+    testcase_import,
 )
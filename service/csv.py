@@ -10,6 +10,7 @@ import persistence.database as db
 import persistence.s3 as s3
 import util
 
+
 ACCOUNT_TEMPLATE = b'RealName,Username,Password,AlternativeEmail,Nickname'
 ACCOUNT_TEMPLATE_FILENAME = 'account_template.csv'
 
@@ -23,21 +24,34 @@ async def get_account_template() -> tuple[do.S3File, str]:
         return s3_file, ACCOUNT_TEMPLATE_FILENAME
 
 
+def _read_csv(file: typing.IO) -> tuple[list[str], list[dict[str, str]]]:
+    """
+    Decodes and parses the whole csv file; run in executor since it is CPU-bound for large files.
+
+    :return: fieldnames and rows
+    """
+    reader = csv.DictReader(codecs.iterdecode(file, 'utf_8_sig'))
+    return reader.fieldnames, list(reader)
+
+
 async def import_account(account_file: typing.IO):
     try:
         standard_headers = ACCOUNT_TEMPLATE.decode('utf_8_sig').split(',')
-        rows = csv.DictReader(codecs.iterdecode(account_file, 'utf_8_sig'))
-        data = []
+        fieldnames, rows = await util.executor.run_cpu(util.executor.CSV, _read_csv, account_file)
+        valid_rows = []
 
-        if set(rows.fieldnames) != set(standard_headers):
+        if set(fieldnames) != set(standard_headers):
             raise exc.IllegalInput
 
         for row in rows:
             for header in standard_headers:
                 if header != 'AlternativeEmail' and row[header] == "":
                     raise exc.IllegalInput
-            data.append((row['RealName'], row['Username'], util.security.hash_password(row['Password']),
-                         row['AlternativeEmail'], row['Nickname']))
+            valid_rows.append(row)
+
+        pass_hashes = await util.security.hash_passwords([row['Password'] for row in valid_rows])
+        data = [(row['RealName'], row['Username'], pass_hash, row['AlternativeEmail'], row['Nickname'])
+                for row, pass_hash in zip(valid_rows, pass_hashes)]
         await db.account.batch_add_normal(data)
     except UnicodeDecodeError:
         raise exc.FileDecodeError
@@ -59,10 +73,10 @@ async def get_team_template() -> tuple[do.S3File, str]:
 async def import_team(team_file: typing.IO, class_id: int, label: str):
     try:
         standard_headers = TEAM_TEMPLATE.decode('utf_8_sig').split(',')
-        rows = csv.DictReader(codecs.iterdecode(team_file, 'utf_8_sig'))
+        fieldnames, rows = await util.executor.run_cpu(util.executor.CSV, _read_csv, team_file)
         data = []
 
-        if set(rows.fieldnames) != set(standard_headers):
+        if set(fieldnames) != set(standard_headers):
             raise exc.IllegalInput
 
         for row in rows:
@@ -87,10 +101,10 @@ GRADE_TEMPLATE_FILENAME = 'grade_template.csv'
 async def import_class_grade(grade_file: typing.IO, title: str, class_id: int, update_time: datetime):
     try:
         standard_headers = GRADE_TEMPLATE.decode('utf_8_sig').split('\n')[0].split(',')
-        rows = csv.DictReader(codecs.iterdecode(grade_file, 'utf_8_sig'))
+        fieldnames, rows = await util.executor.run_cpu(util.executor.CSV, _read_csv, grade_file)
         data = []
 
-        if set(rows.fieldnames) != set(standard_headers):
+        if set(fieldnames) != set(standard_headers):
             raise exc.IllegalInput
 
         for row in rows:
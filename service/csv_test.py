@@ -81,12 +81,9 @@ class TestImportAccount(unittest.IsolatedAsyncioTestCase):
             controller.mock_global_func('csv.DictReader').call_with(
                 mock.AnyInstanceOf(type(self.generator)),
             ).returns(self.rows)
-            util_security.func('hash_password').call_with(
-                'password',
-            ).returns('password' + '-hash')
-            util_security.func('hash_password').call_with(
-                'password2',
-            ).returns('password2' + '-hash')
+            util_security.async_func('hash_passwords').call_with(
+                ['password', 'password2'],
+            ).returns(['password' + '-hash', 'password2' + '-hash'])
 
             db_account.async_func('batch_add_normal').call_with(
                 self.data,
@@ -109,12 +106,9 @@ class TestImportAccount(unittest.IsolatedAsyncioTestCase):
             controller.mock_global_func('csv.DictReader').call_with(
                 mock.AnyInstanceOf(type(self.generator)),
             ).returns(self.rows_loss_alternative_email)
-            util_security.func('hash_password').call_with(
-                'password',
-            ).returns('password' + '-hash')
-            util_security.func('hash_password').call_with(
-                'password2',
-            ).returns('password2' + '-hash')
+            util_security.async_func('hash_passwords').call_with(
+                ['password', 'password2'],
+            ).returns(['password' + '-hash', 'password2' + '-hash'])
 
             db_account.async_func('batch_add_normal').call_with(
                 self.data_loss_alternative_email,
@@ -1,29 +1,94 @@
-import io
-import zipfile
-
+import asyncio
+from datetime import datetime, timedelta
+import hashlib
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+import const
+import exceptions as exc
 import log
 import persistence.database as db
 import persistence.s3 as s3
 import util.text
-from base import do
+from base import do, enum
+
+from . import moss, storage
+
+
+def _fingerprint(content_version: Any) -> str:
+    return hashlib.sha1(repr(content_version).encode()).hexdigest()
+
+
+async def _reuse_or_export(type_: enum.ExportArtifactType, target_id: int, fingerprint: str,
+                           export: Callable[[], Awaitable[do.S3File]]) -> do.S3File:
+    """
+    Reuses the temp file exported for the same content within `const.EXPORT_ARTIFACT_REUSE_SECS`,
+    otherwise exports and records it; expired artifacts are cleaned up by `clean_expired_artifacts_periodically`.
+    """
+    now = datetime.now()
+    try:
+        artifact = await db.export_artifact.read_latest(
+            type_, target_id=target_id, fingerprint=fingerprint,
+            created_after=now - timedelta(seconds=const.EXPORT_ARTIFACT_REUSE_SECS),
+        )
+    except exc.persistence.NotFound:
+        pass
+    else:
+        log.info(f'Reusing export artifact {artifact.id=} for {type_=} {target_id=}')
+        return do.S3File(uuid=UUID(artifact.key), bucket=artifact.bucket, key=artifact.key)
 
-from . import moss
+    s3_file = await export()
+    await db.export_artifact.add(type_, target_id=target_id, fingerprint=fingerprint,
+                                 bucket=s3_file.bucket, key=s3_file.key, create_time=now)
+
+    return s3_file
+
+
+async def clean_expired_artifacts() -> None:
+    """
+    Deletes the artifacts older than `const.EXPORT_ARTIFACT_KEEP_SECS` and their temp files.
+    Temp files failed to delete are logged and left to the bucket.
+    """
+    # Deleted with RETURNING, so each expired artifact is cleaned by exactly one worker
+    for artifact in await db.export_artifact.delete_created_before(
+            datetime.now() - timedelta(seconds=const.EXPORT_ARTIFACT_KEEP_SECS)):
+        try:
+            await s3.tools.delete(bucket=artifact.bucket, key=artifact.key)
+        except Exception as e:
+            log.exception(e, msg=f'Failed to delete expired export artifact {artifact.id=} {artifact.key=}')
+
+
+async def clean_expired_artifacts_periodically() -> None:
+    """
+    Runs `clean_expired_artifacts` every `const.EXPORT_ARTIFACT_CLEAN_INTERVAL_SECS` until cancelled,
+    so that artifacts expire even if nothing is exported anymore.
+    """
+    while True:
+        try:
+            await clean_expired_artifacts()
+        except Exception as e:
+            log.exception(e, msg='Failed to clean expired export artifacts', info_level=True)
+        await asyncio.sleep(const.EXPORT_ARTIFACT_CLEAN_INTERVAL_SECS)
 
 
 async def all_essay_submissions(essay_id: int) -> do.S3File:
     log.info(f'Downloading all essay submissions for {essay_id=}')
 
     essay_submissions = await db.essay_submission.browse_with_essay_id(essay_id=essay_id)
-    files = {
-        essay_submission.filename: await db.s3_file.read(s3_file_uuid=essay_submission.content_file_uuid)
-        for essay_submission in essay_submissions
-    }
-
-    zip_buffer = await s3.tools.zipper(files=files)
 
-    s3_file = await s3.temp.put_object(body=zip_buffer.getvalue())
+    async def export() -> do.S3File:
+        files = {
+            essay_submission.filename: await db.s3_file.read(s3_file_uuid=essay_submission.content_file_uuid)
+            for essay_submission in essay_submissions
+        }
+        return await s3.temp.zipper(files=files)
 
-    return s3_file
+    return await _reuse_or_export(
+        enum.ExportArtifactType.all_essay_submissions, target_id=essay_id,
+        fingerprint=_fingerprint([(essay_submission.filename, essay_submission.content_file_uuid)
+                                  for essay_submission in essay_submissions]),
+        export=export,
+    )
 
 
 async def all_submissions(challenge_id: int) -> do.S3File:
@@ -44,64 +109,83 @@ async def all_submissions(challenge_id: int) -> do.S3File:
         # return language.file_extension
         return 'py' if language.name.lower().startswith('py') else 'cpp'  # FIXME: put into db
 
-    log.info('Create zip...')
+    # Selecting the files is a few cheap reads, and the selection is exactly what the archive holds
+    to_zip: list[tuple[str, do.S3File]] = []
+    for problem in problems:
+        problem_folder_name = util.text.get_valid_filename(problem.challenge_label)
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_STORED, False) as zipper:
-        for problem in problems:
-            problem_folder_name = util.text.get_valid_filename(problem.challenge_label)
+        submissions = await db.submission.browse_by_problem_selected(
+            problem_id=problem.id, selection_type=challenge.selection_type, end_time=challenge.end_time)
+        account_referrals = await db.account.browse_referral_wth_ids(submission.account_id
+                                                                     for submission in submissions)
+        s3_files = await db.s3_file.browse_with_uuids(submission.content_file_uuid
+                                                      for submission in submissions)
 
-            submissions = await db.submission.browse_by_problem_selected(problem_id=problem.id,
-                                                                         selection_type=challenge.selection_type,
-                                                                         end_time=challenge.end_time)
-            account_referrals = await db.account.browse_referral_wth_ids(submission.account_id
-                                                                         for submission in submissions)
-            s3_files = await db.s3_file.browse_with_uuids(submission.content_file_uuid for submission in submissions)
+        for referral, submission, s3_file in zip(account_referrals, submissions, s3_files):
+            if not referral or not s3_file:
+                continue
+            file_ext = await get_language_ext(submission.language_id)
+            filename = util.text.get_valid_filename(f'{referral}.{file_ext}')
+            to_zip.append((f'{problem_folder_name}/{filename}', s3_file))
 
-            for referral, submission, s3_file in zip(account_referrals, submissions, s3_files):
-                if not referral or not s3_file:
-                    continue
-                file_ext = await get_language_ext(submission.language_id)
-                filename = util.text.get_valid_filename(f'{referral}.{file_ext}')
-                zipper.writestr(f'{problem_folder_name}/{filename}',
-                                data=await s3.tools.get_file_content_from_do(s3_file))
+    async def export() -> do.S3File:
+        log.info('Create zip...')
 
-    log.info('Make s3 file...')
+        async with s3.temp.zip_uploader() as zip_uploader:
+            await storage.write_zip(zip_uploader, to_zip, event='download all submissions')
 
-    s3_file = await s3.temp.put_object(body=zip_buffer.getvalue())
-    return s3_file
+        return zip_uploader.s3_file
+
+    return await _reuse_or_export(
+        enum.ExportArtifactType.all_submissions, target_id=challenge_id,
+        fingerprint=_fingerprint([(arcname, s3_file.uuid) for arcname, s3_file in to_zip]),
+        export=export,
+    )
 
 
 async def all_assisting_data(problem_id: int) -> do.S3File:
     assisting_datas = await db.assisting_data.browse(problem_id=problem_id)
-    files = {
-        assisting_data.filename: await db.s3_file.read(s3_file_uuid=assisting_data.s3_file_uuid)
-        for assisting_data in assisting_datas
-    }
 
-    zip_buffer = await s3.tools.zipper(files=files)
+    async def export() -> do.S3File:
+        files = {
+            assisting_data.filename: await db.s3_file.read(s3_file_uuid=assisting_data.s3_file_uuid)
+            for assisting_data in assisting_datas
+        }
+        return await s3.temp.zipper(files=files)
 
-    s3_file = await s3.temp.put_object(body=zip_buffer.getvalue())
-    return s3_file
+    return await _reuse_or_export(
+        enum.ExportArtifactType.all_assisting_data, target_id=problem_id,
+        fingerprint=_fingerprint([(assisting_data.filename, assisting_data.s3_file_uuid)
+                                  for assisting_data in assisting_datas]),
+        export=export,
+    )
 
 
 async def all_testcase(problem_id: int, is_sample: bool) -> do.S3File:
     testcases = await db.testcase.browse(problem_id=problem_id, is_sample=is_sample, include_disabled=True)
-    input_files = {
-        testcase.input_filename: await db.s3_file.read(s3_file_uuid=testcase.input_file_uuid)
-        for testcase in testcases
-        if testcase.input_file_uuid
-    }
-    output_files = {
-        testcase.output_filename: await db.s3_file.read(s3_file_uuid=testcase.output_file_uuid)
-        for testcase in testcases
-        if testcase.output_file_uuid
-    }
-
-    zip_buffer = await s3.tools.zipper(files=input_files | output_files)
-
-    s3_file = await s3.temp.put_object(body=zip_buffer.getvalue())
-    return s3_file
+
+    async def export() -> do.S3File:
+        input_files = {
+            testcase.input_filename: await db.s3_file.read(s3_file_uuid=testcase.input_file_uuid)
+            for testcase in testcases
+            if testcase.input_file_uuid
+        }
+        output_files = {
+            testcase.output_filename: await db.s3_file.read(s3_file_uuid=testcase.output_file_uuid)
+            for testcase in testcases
+            if testcase.output_file_uuid
+        }
+        return await s3.temp.zipper(files=input_files | output_files)
+
+    # File uuids change on every upload of testcase data
+    return await _reuse_or_export(
+        enum.ExportArtifactType.all_sample_testcase if is_sample else enum.ExportArtifactType.all_testcase,
+        target_id=problem_id,
+        fingerprint=_fingerprint([(testcase.input_filename, testcase.input_file_uuid,
+                                   testcase.output_filename, testcase.output_file_uuid)
+                                  for testcase in testcases]),
+        export=export,
+    )
 
 
 async def moss_report(report_url: str) -> do.S3File:
@@ -111,13 +195,9 @@ async def moss_report(report_url: str) -> do.S3File:
 
     log.info(f'generating report zipfile for moss {report_url=}')
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'a', zipfile.ZIP_STORED, False) as zipper:
-        zipper.writestr('index.html', report_index_file)
+    async with s3.temp.zip_uploader() as zip_uploader:
+        await zip_uploader.writestr('index.html', report_index_file)
         for filename, file in other_files.items():
-            zipper.writestr(filename, file)
+            await zip_uploader.writestr(filename, file)
 
-    log.info(f'Make report s3 file for moss {report_url=}')
-
-    s3_file = await s3.temp.put_object(body=zip_buffer.getvalue())
-    return s3_file
+    return zip_uploader.s3_file
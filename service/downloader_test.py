@@ -0,0 +1,233 @@
+from datetime import datetime, timedelta
+import unittest
+from uuid import UUID
+
+import const
+from base import do, enum
+import exceptions as exc
+from util import mock
+
+from . import downloader
+
+
+class TestReuseOrExport(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = datetime(2023, 4, 9)
+        self.type = enum.ExportArtifactType.all_submissions
+        self.target_id = 1
+        self.fingerprint = 'fingerprint'
+        self.s3_file = do.S3File(
+            uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
+            bucket='temp',
+            key='d8ec7a6a-27e1-4cee-8229-4304ef933544',
+        )
+        self.artifact = do.ExportArtifact(
+            id=1,
+            type=self.type,
+            target_id=self.target_id,
+            fingerprint=self.fingerprint,
+            bucket=self.s3_file.bucket,
+            key=self.s3_file.key,
+            create_time=self.now - timedelta(days=1),
+        )
+        self.exported_count = 0
+
+    async def export(self) -> do.S3File:
+        self.exported_count += 1
+        return self.s3_file
+
+    async def test_reuse(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            datetime_ = controller.mock_module('service.downloader.datetime')
+            db_export_artifact = controller.mock_module('persistence.database.export_artifact')
+
+            datetime_.func('now').call_with().returns(self.now)
+            db_export_artifact.async_func('read_latest').call_with(
+                self.type, target_id=self.target_id, fingerprint=self.fingerprint,
+                created_after=self.now - timedelta(seconds=const.EXPORT_ARTIFACT_REUSE_SECS),
+            ).returns(self.artifact)
+
+            result = await downloader._reuse_or_export(self.type, target_id=self.target_id,
+                                                       fingerprint=self.fingerprint, export=self.export)
+
+        self.assertEqual(result, self.s3_file)
+        self.assertEqual(self.exported_count, 0)
+
+    async def test_export(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            datetime_ = controller.mock_module('service.downloader.datetime')
+            db_export_artifact = controller.mock_module('persistence.database.export_artifact')
+
+            datetime_.func('now').call_with().returns(self.now)
+            db_export_artifact.async_func('read_latest').call_with(
+                self.type, target_id=self.target_id, fingerprint=self.fingerprint,
+                created_after=self.now - timedelta(seconds=const.EXPORT_ARTIFACT_REUSE_SECS),
+            ).raises(exc.persistence.NotFound)
+            db_export_artifact.async_func('add').call_with(
+                self.type, target_id=self.target_id, fingerprint=self.fingerprint,
+                bucket=self.s3_file.bucket, key=self.s3_file.key, create_time=self.now,
+            ).returns(self.artifact.id)
+
+            result = await downloader._reuse_or_export(self.type, target_id=self.target_id,
+                                                       fingerprint=self.fingerprint, export=self.export)
+
+        self.assertEqual(result, self.s3_file)
+        self.assertEqual(self.exported_count, 1)
+
+
+class TestCleanExpiredArtifacts(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = datetime(2023, 4, 9)
+        self.artifacts = [
+            do.ExportArtifact(
+                id=i,
+                type=enum.ExportArtifactType.all_assisting_data,
+                target_id=1,
+                fingerprint='fingerprint',
+                bucket='temp',
+                key=str(UUID(int=i)),
+                create_time=self.now - timedelta(seconds=const.EXPORT_ARTIFACT_KEEP_SECS + i),
+            )
+            for i in range(1, 3)
+        ]
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            datetime_ = controller.mock_module('service.downloader.datetime')
+            db_export_artifact = controller.mock_module('persistence.database.export_artifact')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+
+            datetime_.func('now').call_with().returns(self.now)
+            db_export_artifact.async_func('delete_created_before').call_with(
+                self.now - timedelta(seconds=const.EXPORT_ARTIFACT_KEEP_SECS),
+            ).returns(self.artifacts)
+            for artifact in self.artifacts:
+                s3_tools.async_func('delete').call_with(bucket=artifact.bucket, key=artifact.key).returns(None)
+
+            await downloader.clean_expired_artifacts()
+
+    async def test_delete_failed(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            datetime_ = controller.mock_module('service.downloader.datetime')
+            db_export_artifact = controller.mock_module('persistence.database.export_artifact')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+            log = controller.mock_module('service.downloader.log')
+
+            datetime_.func('now').call_with().returns(self.now)
+            db_export_artifact.async_func('delete_created_before').call_with(
+                self.now - timedelta(seconds=const.EXPORT_ARTIFACT_KEEP_SECS),
+            ).returns(self.artifacts)
+            s3_tools.async_func('delete').call_with(
+                bucket=self.artifacts[0].bucket, key=self.artifacts[0].key,
+            ).raises(ConnectionError)
+            log.func('exception').call_with(
+                mock.AnyInstanceOf(ConnectionError), msg=mock.AnyInstanceOf(str),
+            ).returns(None)
+            s3_tools.async_func('delete').call_with(
+                bucket=self.artifacts[1].bucket, key=self.artifacts[1].key,
+            ).returns(None)
+
+            await downloader.clean_expired_artifacts()
+
+
+class TestAllSubmissions(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = datetime(2023, 4, 9)
+        self.challenge = do.Challenge(
+            id=1,
+            class_id=1,
+            publicize_type=enum.ChallengePublicizeType.end_time,
+            selection_type=enum.TaskSelectionType.last,
+            title='title',
+            setter_id=1,
+            description=None,
+            start_time=self.now - timedelta(days=2),
+            end_time=self.now - timedelta(days=1),
+            is_deleted=False,
+        )
+        self.problem = do.Problem(
+            id=1,
+            challenge_id=self.challenge.id,
+            challenge_label='A',
+            judge_type=enum.ProblemJudgeType.normal,
+            setting_id=None,
+            title='title',
+            setter_id=1,
+            full_score=None,
+            description=None,
+            io_description=None,
+            source=None,
+            hint=None,
+            is_lazy_judge=False,
+            is_deleted=False,
+            reviser_settings=[],
+        )
+        self.submission = do.Submission(
+            id=1,
+            account_id=1,
+            problem_id=self.problem.id,
+            language_id=1,
+            content_file_uuid=UUID(int=1),
+            content_length=10,
+            filename='main.py',
+            submit_time=self.now - timedelta(days=1, hours=1),
+        )
+        self.s3_file = do.S3File(uuid=UUID(int=1), bucket='submission', key=str(UUID(int=1)))
+        self.language = do.SubmissionLanguage(id=1, name='Python', version='3.10', is_disabled=False)
+        self.artifact = do.ExportArtifact(
+            id=1,
+            type=enum.ExportArtifactType.all_submissions,
+            target_id=self.challenge.id,
+            fingerprint='fingerprint',
+            bucket='temp',
+            key='d8ec7a6a-27e1-4cee-8229-4304ef933544',
+            create_time=self.now - timedelta(hours=1),
+        )
+
+    async def test_reuse_by_selection(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_challenge = controller.mock_module('persistence.database.challenge')
+            db_problem = controller.mock_module('persistence.database.problem')
+            db_submission = controller.mock_module('persistence.database.submission')
+            db_account = controller.mock_module('persistence.database.account')
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            datetime_ = controller.mock_module('service.downloader.datetime')
+            db_export_artifact = controller.mock_module('persistence.database.export_artifact')
+
+            db_challenge.async_func('read').call_with(self.challenge.id).returns(self.challenge)
+            db_problem.async_func('browse_by_challenge').call_with(
+                challenge_id=self.challenge.id,
+            ).returns([self.problem])
+            db_submission.async_func('browse_by_problem_selected').call_with(
+                problem_id=self.problem.id, selection_type=self.challenge.selection_type,
+                end_time=self.challenge.end_time,
+            ).returns([self.submission])
+            db_account.async_func('browse_referral_wth_ids').call_with(
+                mock.AnyInstanceOf(object),
+            ).returns(['b12345678'])
+            db_s3_file.async_func('browse_with_uuids').call_with(
+                mock.AnyInstanceOf(object),
+            ).returns([self.s3_file])
+            db_submission.async_func('read_language').call_with(self.submission.language_id).returns(self.language)
+            datetime_.func('now').call_with().returns(self.now)
+            db_export_artifact.async_func('read_latest').call_with(
+                enum.ExportArtifactType.all_submissions, target_id=self.challenge.id,
+                # Renaming an entry (e.g. a changed referral) changes the fingerprint
+                fingerprint=downloader._fingerprint([('A/b12345678.py', self.s3_file.uuid)]),
+                created_after=self.now - timedelta(seconds=const.EXPORT_ARTIFACT_REUSE_SECS),
+            ).returns(self.artifact)
+
+            result = await downloader.all_submissions(self.challenge.id)
+
+        self.assertEqual(result, do.S3File(uuid=UUID(self.artifact.key), bucket=self.artifact.bucket,
+                                           key=self.artifact.key))
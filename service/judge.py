@@ -1,8 +1,14 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import hashlib
 from typing import Sequence, Optional
 from uuid import UUID
 
+import cachetools
+
 import log
-from base import do, enum, popo
+from base import do, enum
 import const
 import common.const
 import common.do
@@ -22,43 +28,147 @@ async def judge_submission(submission_id: int, rejudge=False):
                  customized_judge_setting=customized_judge_setting, reviser_settings=reviser_settings)
 
 
-async def judge_problem_submissions(problem_id: int) -> Sequence[do.Submission]:
+async def rejudge_problem(rejudge_job_id: int, problem_id: int) -> None:
+    """
+    Publishes judge tasks of all submissions under the problem, recording the progress to the rejudge job.
+    """
+    try:
+        await _rejudge_problem(rejudge_job_id, problem_id)
+    except Exception as e:
+        await db.rejudge_job.finish(rejudge_job_id, status=enum.RejudgeJobStatus.failed, finish_time=datetime.now(),
+                                    error_message=log.format_exc(e))
+        raise
+
+    await db.rejudge_job.finish(rejudge_job_id, status=enum.RejudgeJobStatus.finished, finish_time=datetime.now())
+
+
+async def fail_stale_rejudge_jobs() -> None:
+    """
+    Marks the running rejudge jobs without progress for `const.REJUDGE_JOB_STALE_SECS` as failed,
+    since the worker running them is gone. Jobs running in other live workers keep their heartbeat.
+    """
+    now = datetime.now()
+    rejudge_job_ids = await db.rejudge_job.fail_stale(
+        heartbeat_before=now - timedelta(seconds=const.REJUDGE_JOB_STALE_SECS), finish_time=now,
+        error_message=f'No progress in {const.REJUDGE_JOB_STALE_SECS} seconds, the job was interrupted',
+    )
+    if rejudge_job_ids:
+        log.info(f'Failed stale rejudge jobs {rejudge_job_ids}')
+
+
+async def fail_stale_rejudge_jobs_periodically() -> None:
+    """
+    Runs `fail_stale_rejudge_jobs` every `const.REJUDGE_JOB_CHECK_INTERVAL_SECS` until cancelled.
+    """
+    while True:
+        try:
+            await fail_stale_rejudge_jobs()
+        except Exception as e:
+            log.exception(e, msg='Failed to fail stale rejudge jobs', info_level=True)
+        await asyncio.sleep(const.REJUDGE_JOB_CHECK_INTERVAL_SECS)
+
+
+async def _rejudge_problem(rejudge_job_id: int, problem_id: int):
     judge_problem, judge_testcases, judge_assisting_datas, customized_judge_setting, reviser_settings = \
         await _prepare_problem(problem_id)
+    language_queue_names = await db.submission.browse_language_queue_name(include_disabled=False)
 
-    submissions: list[do.Submission] = []
-    offset, batch_size = 0, 100
-    while True:
-        batch_submissions, _ = await db.submission.browse(offset=offset, limit=batch_size, filters=[
-            popo.Filter(col_name='problem_id', op=enum.FilterOperator.equal, value=problem_id),
-        ], sorters=[])
-        if not batch_submissions:
-            break
-        submissions += batch_submissions
-        offset += batch_size
+    semaphore = asyncio.Semaphore(const.REJUDGE_SIGN_CONCURRENCY)
+
+    async def make_task(submission: do.Submission, s3_file: do.S3File) -> tuple[common.do.JudgeTask, str]:
+        async with semaphore:
+            file_url = await s3.tools.sign_url_from_do(s3_file=s3_file, expire_secs=const.S3_EXPIRE_SECS,
+                                                       filename=submission.filename, as_attachment=True)
+        return common.do.JudgeTask(
+            problem=judge_problem,
+            submission=common.do.Submission(id=submission.id, file_url=file_url),
+            testcases=judge_testcases,
+            assisting_data=judge_assisting_datas,
+            customized_judge_setting=customized_judge_setting,
+            reviser_settings=reviser_settings,
+        ), language_queue_names[submission.language_id]
+
+    published_count = skipped_count = after_id = 0
+    while submissions := await db.submission.browse_under_problem_after(problem_id, after_id=after_id,
+                                                                        limit=const.REJUDGE_BATCH_SIZE):
+        after_id = submissions[-1].id
+
+        s3_files = {s3_file.uuid: s3_file
+                    for s3_file in await db.s3_file.browse_with_uuids([submission.content_file_uuid
+                                                                       for submission in submissions])
+                    if s3_file}
+        to_judge = [submission for submission in submissions
+                    if submission.language_id in language_queue_names and submission.content_file_uuid in s3_files]
 
-    for submission in submissions:
-        await _judge(submission, judge_problem=judge_problem, priority=common.const.PRIORITY_REJUDGE_BATCH,
-                     judge_testcases=judge_testcases, judge_assisting_datas=judge_assisting_datas,
-                     customized_judge_setting=customized_judge_setting, reviser_settings=reviser_settings)
+        tasks = await asyncio.gather(*(make_task(submission, s3_files[submission.content_file_uuid])
+                                       for submission in to_judge))
+        await publisher.judge.send_judge_batch(tasks, priority=common.const.PRIORITY_REJUDGE_BATCH)
 
-    return submissions
+        published_count += len(to_judge)
+        skipped_count += len(submissions) - len(to_judge)
+        await db.rejudge_job.edit_progress(rejudge_job_id, published_count=published_count,
+                                           skipped_count=skipped_count, heartbeat_time=datetime.now())
 
+    log.info(f'Rejudge job {rejudge_job_id} published {published_count} submissions,'
+             f' skipped {skipped_count} submissions with disabled language or missing file')
 
-async def _prepare_problem(problem_id: int) -> tuple[
+
+_PreparedProblem = tuple[
     common.do.Problem,
     Sequence[common.do.Testcase],
     Sequence[common.do.AssistingData],
     Optional[common.do.CustomizedJudgeSetting],
     Sequence[common.do.ReviserSetting],
-]:
+]
+
+
+@dataclass
+class _CachedProblem:
+    version: str
+    prepared: _PreparedProblem
+
+
+# problem id -> prepared problem; entries are reused until shortly before the signed urls expire
+_prepared_problems: cachetools.TTLCache[int, _CachedProblem] = \
+    cachetools.TTLCache(maxsize=const.JUDGE_PREPARE_CACHE_SIZE, ttl=const.JUDGE_PREPARE_CACHE_SECS)
+
+
+async def _prepare_problem(problem_id: int) -> _PreparedProblem:
     problem = await db.problem.read(problem_id)
-    testcases = await db.testcase.browse(problem.id, include_disabled=False)
-    assisting_datas = await db.assisting_data.browse(problem.id)
-    customized_judge_setting = await db.problem_judge_setting_customized.read(problem.setting_id) \
-        if problem.judge_type is enum.ProblemJudgeType.customized else None
-    reviser_settings = [await db.problem_reviser_settings.read_customized(reviser_setting.id)
-                        for reviser_setting in problem.reviser_settings]
+    testcases, assisting_datas, customized_judge_setting, reviser_settings = await asyncio.gather(
+        db.testcase.browse(problem.id, include_disabled=False),
+        db.assisting_data.browse(problem.id),
+        _read_customized_judge_setting(problem),
+        _read_reviser_settings(problem),
+    )
+
+    # Any testcase, assisting data or setting edit changes the version, no matter which worker it is made on
+    version = hashlib.sha1(repr((problem, testcases, assisting_datas,
+                                 customized_judge_setting, reviser_settings)).encode()).hexdigest()
+    cached = _prepared_problems.get(problem_id)
+    if cached and cached.version == version:
+        return cached.prepared
+
+    to_sign: list[tuple[UUID, str]] = []
+    for i, testcase in enumerate(testcases):
+        if testcase.input_file_uuid:
+            to_sign.append((testcase.input_file_uuid, f'{i}.in'))
+        if testcase.output_file_uuid:
+            to_sign.append((testcase.output_file_uuid, f'{i}.out'))
+    to_sign += [(assisting_data.s3_file_uuid, assisting_data.filename) for assisting_data in assisting_datas]
+    if customized_judge_setting:
+        to_sign.append((customized_judge_setting.judge_code_file_uuid, customized_judge_setting.judge_code_filename))
+    to_sign += [(reviser_setting.judge_code_file_uuid, reviser_setting.judge_code_filename)
+                for reviser_setting in reviser_settings]
+
+    semaphore = asyncio.Semaphore(const.JUDGE_PREPARE_SIGN_CONCURRENCY)
+
+    async def sign(file_uuid: UUID, filename: str) -> str:
+        async with semaphore:
+            return await _sign_file_url(file_uuid, filename=filename)
+
+    # Consumed in the same order as `to_sign`
+    signed_urls = iter(await asyncio.gather(*(sign(file_uuid, filename) for file_uuid, filename in to_sign)))
 
     judge_problem = common.do.Problem(
         full_score=problem.full_score,
@@ -69,30 +179,38 @@ async def _prepare_problem(problem_id: int) -> tuple[
         id=testcase.id,
         score=testcase.score,
         label=testcase.label,
-        input_file_url=await _sign_file_url(testcase.input_file_uuid, filename=f'{i}.in')
-        if testcase.input_file_uuid else None,
-        output_file_url=await _sign_file_url(testcase.output_file_uuid, filename=f'{i}.out')
-        if testcase.output_file_uuid else None,
+        input_file_url=next(signed_urls) if testcase.input_file_uuid else None,
+        output_file_url=next(signed_urls) if testcase.output_file_uuid else None,
         time_limit=testcase.time_limit,
         memory_limit=testcase.memory_limit,
         is_sample=testcase.is_sample,
-    ) for i, testcase in enumerate(testcases)]
+    ) for testcase in testcases]
 
     judge_assisting_datas = [common.do.AssistingData(
-        file_url=await _sign_file_url(assisting_data.s3_file_uuid, filename=assisting_data.filename),
+        file_url=next(signed_urls),
         filename=assisting_data.filename,
     ) for assisting_data in assisting_datas]
 
-    customized_judge_setting = common.do.CustomizedJudgeSetting(await _sign_file_url(
-        customized_judge_setting.judge_code_file_uuid,
-        filename=customized_judge_setting.judge_code_filename)) \
-        if problem.judge_type is enum.ProblemJudgeType.customized else None
+    judge_customized_judge_setting = common.do.CustomizedJudgeSetting(next(signed_urls)) \
+        if customized_judge_setting else None
+
+    judge_reviser_settings = [common.do.ReviserSetting(next(signed_urls)) for _ in reviser_settings]
+
+    prepared = judge_problem, judge_testcases, judge_assisting_datas, judge_customized_judge_setting, \
+        judge_reviser_settings
+    _prepared_problems[problem_id] = _CachedProblem(version=version, prepared=prepared)
+    return prepared
+
 
-    reviser_settings = [common.do.ReviserSetting(await _sign_file_url(reviser_setting.judge_code_file_uuid,
-                                                                      filename=reviser_setting.judge_code_filename))
-                        for reviser_setting in reviser_settings]
+async def _read_customized_judge_setting(problem: do.Problem) -> Optional[do.ProblemJudgeSettingCustomized]:
+    if problem.judge_type is not enum.ProblemJudgeType.customized:
+        return None
+    return await db.problem_judge_setting_customized.read(problem.setting_id)
 
-    return judge_problem, judge_testcases, judge_assisting_datas, customized_judge_setting, reviser_settings
+
+async def _read_reviser_settings(problem: do.Problem) -> Sequence[do.ProblemJudgeSettingCustomized]:
+    return await asyncio.gather(*(db.problem_reviser_settings.read_customized(reviser_setting.id)
+                                  for reviser_setting in problem.reviser_settings))
 
 
 async def _judge(submission: do.Submission, judge_problem: common.do.Problem, priority: int,
@@ -106,19 +224,24 @@ async def _judge(submission: do.Submission, judge_problem: common.do.Problem, pr
                  f" submission language id {submission.language_id} is disabled")
         return
 
+    file_url, language_queue_name = await asyncio.gather(
+        _sign_file_url(submission.content_file_uuid, filename=submission.filename),
+        db.submission.read_language_queue_name(submission_language.id),
+    )
+
     await publisher.judge.send_judge(
         common.do.JudgeTask(
             problem=judge_problem,
             submission=common.do.Submission(
                 id=submission.id,
-                file_url=await _sign_file_url(submission.content_file_uuid, filename=submission.filename),
+                file_url=file_url,
             ),
             testcases=judge_testcases,
             assisting_data=judge_assisting_datas,
             customized_judge_setting=customized_judge_setting,
             reviser_settings=reviser_settings,
         ),
-        language_queue_name=await db.submission.read_language_queue_name(submission_language.id),
+        language_queue_name=language_queue_name,
         priority=priority,
     )
 
@@ -5,7 +5,7 @@ import uuid
 
 import common.do
 import common.const
-from base import enum, do, popo
+from base import enum, do
 import const
 from util import mock
 
@@ -109,8 +109,9 @@ class TestJudgeSubmission(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(result)
 
 
-class TestJudgeProblemSubmissions(unittest.IsolatedAsyncioTestCase):
+class TestRejudgeProblem(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
+        self.rejudge_job_id = 1
         self.problem_id = 1
         self.judge_problem = common.do.Problem(
             full_score=20,
@@ -119,16 +120,6 @@ class TestJudgeProblemSubmissions(unittest.IsolatedAsyncioTestCase):
         self.judge_testcases = [
             common.do.Testcase(
                 id=1,
-                score=0,
-                label='sample',
-                is_sample=True,
-                input_file_url=None,
-                output_file_url=None,
-                time_limit=1000,
-                memory_limit=1024,
-            ),
-            common.do.Testcase(
-                id=2,
                 score=20,
                 label='non_testcase',
                 is_sample=False,
@@ -138,26 +129,12 @@ class TestJudgeProblemSubmissions(unittest.IsolatedAsyncioTestCase):
                 memory_limit=1024,
             ),
         ]
-        self.judge_assisting_datas = [
-            common.do.AssistingData(
-                file_url='.../assisting_data',
-                filename='assisting_data',
-            ),
-        ]
-        self.customized_judge_setting = [
-            common.do.CustomizedJudgeSetting(
-                file_url='.../customized_judge_setting',
-            ),
-        ]
-        self.reviser_settings = [
-            common.do.ReviserSetting(
-                file_url='.../reviser_settings',
-            ),
-        ]
-        self.offset = 0
-        self.batch_size = 100
+        self.judge_assisting_datas = []
+        self.customized_judge_setting = None
+        self.reviser_settings = []
+        self.language_queue_names = {1: 'cpp17'}
 
-        self.batch_submissions = [
+        self.submissions = [
             do.Submission(
                 id=1,
                 account_id=1,
@@ -172,19 +149,26 @@ class TestJudgeProblemSubmissions(unittest.IsolatedAsyncioTestCase):
                 id=2,
                 account_id=2,
                 problem_id=1,
-                language_id=1,
+                language_id=2,  # disabled
                 content_file_uuid=uuid.UUID('12345678123456781234567812345679'),
                 content_length=10,
                 filename='submission',
                 submit_time=datetime.datetime(2023, 4, 9),
             ),
         ]
-        self.submissions = copy.deepcopy(self.batch_submissions)
-        self.result = copy.deepcopy(self.submissions)
+        self.s3_files = [
+            do.S3File(uuid=submission.content_file_uuid, bucket='bucket', key=str(submission.content_file_uuid))
+            for submission in self.submissions
+        ]
+        self.file_url = '.../file_url'
 
     async def test_happy_flow(self):
         with mock.Controller() as controller:
             db_submission = controller.mock_module('persistence.database.submission')
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+            publisher_judge = controller.mock_module('persistence.amqp_publisher.judge')
 
             controller.mock_global_async_func('service.judge._prepare_problem').call_with(
                 self.problem_id,
@@ -192,28 +176,85 @@ class TestJudgeProblemSubmissions(unittest.IsolatedAsyncioTestCase):
                 self.judge_problem, self.judge_testcases, self.judge_assisting_datas,
                 self.customized_judge_setting, self.reviser_settings,
             )
-            db_submission.async_func('browse').call_with(
-                offset=self.offset, limit=self.batch_size, filters=[
-                    popo.Filter(col_name='problem_id', op=enum.FilterOperator.equal, value=self.problem_id),
-                ], sorters=[]).returns((self.batch_submissions, len(self.batch_submissions)))
-            db_submission.async_func('browse').call_with(
-                offset=self.offset + self.batch_size, limit=self.batch_size, filters=[
-                    popo.Filter(col_name='problem_id', op=enum.FilterOperator.equal, value=self.problem_id),
-                ], sorters=[]).returns(([], 0))
-            for submission in self.submissions:
-                controller.mock_global_async_func('service.judge._judge').call_with(
-                    submission, judge_problem=self.judge_problem, priority=common.const.PRIORITY_REJUDGE_BATCH,
-                    judge_testcases=self.judge_testcases, judge_assisting_datas=self.judge_assisting_datas,
-                    customized_judge_setting=self.customized_judge_setting, reviser_settings=self.reviser_settings,
-                ).returns(None)
-
-            result = await judge.judge_problem_submissions(self.problem_id)
+            db_submission.async_func('browse_language_queue_name').call_with(include_disabled=False).returns(
+                self.language_queue_names,
+            )
+            db_submission.async_func('browse_under_problem_after').call_with(
+                self.problem_id, after_id=0, limit=const.REJUDGE_BATCH_SIZE,
+            ).returns(self.submissions)
+            db_s3_file.async_func('browse_with_uuids').call_with(
+                [submission.content_file_uuid for submission in self.submissions],
+            ).returns(self.s3_files)
+            s3_tools.async_func('sign_url_from_do').call_with(
+                s3_file=self.s3_files[0], expire_secs=const.S3_EXPIRE_SECS,
+                filename=self.submissions[0].filename, as_attachment=True,
+            ).returns(self.file_url)
+            publisher_judge.async_func('send_judge_batch').call_with(
+                [(common.do.JudgeTask(
+                    problem=self.judge_problem,
+                    submission=common.do.Submission(id=self.submissions[0].id, file_url=self.file_url),
+                    testcases=self.judge_testcases,
+                    assisting_data=self.judge_assisting_datas,
+                    customized_judge_setting=self.customized_judge_setting,
+                    reviser_settings=self.reviser_settings,
+                ), self.language_queue_names[1])],
+                priority=common.const.PRIORITY_REJUDGE_BATCH,
+            ).returns(None)
+            db_rejudge_job.async_func('edit_progress').call_with(
+                self.rejudge_job_id, published_count=1, skipped_count=1,
+                heartbeat_time=mock.AnyInstanceOf(datetime.datetime),
+            ).returns(None)
+            db_submission.async_func('browse_under_problem_after').call_with(
+                self.problem_id, after_id=self.submissions[-1].id, limit=const.REJUDGE_BATCH_SIZE,
+            ).returns([])
+            db_rejudge_job.async_func('finish').call_with(
+                self.rejudge_job_id, status=enum.RejudgeJobStatus.finished,
+                finish_time=mock.AnyInstanceOf(datetime.datetime),
+            ).returns(None)
 
-        self.assertEqual(result, self.result)
+            result = await judge.rejudge_problem(self.rejudge_job_id, self.problem_id)
+
+        self.assertIsNone(result)
+
+    async def test_failed(self):
+        with mock.Controller() as controller:
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+
+            controller.mock_global_async_func('service.judge._prepare_problem').call_with(
+                self.problem_id,
+            ).raises(Exception('expected exception for testing'))
+            db_rejudge_job.async_func('finish').call_with(
+                self.rejudge_job_id, status=enum.RejudgeJobStatus.failed,
+                finish_time=mock.AnyInstanceOf(datetime.datetime), error_message=mock.AnyInstanceOf(str),
+            ).returns(None)
+
+            with self.assertRaises(Exception):
+                await judge.rejudge_problem(self.rejudge_job_id, self.problem_id)
+
+
+class TestFailStaleRejudgeJobs(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = datetime.datetime(2023, 4, 9)
+
+    async def test_happy_flow(self):
+        with mock.Controller() as controller:
+            datetime_ = controller.mock_module('service.judge.datetime')
+            db_rejudge_job = controller.mock_module('persistence.database.rejudge_job')
+
+            datetime_.func('now').call_with().returns(self.now)
+            db_rejudge_job.async_func('fail_stale').call_with(
+                heartbeat_before=self.now - datetime.timedelta(seconds=const.REJUDGE_JOB_STALE_SECS),
+                finish_time=self.now, error_message=mock.AnyInstanceOf(str),
+            ).returns([1, 2])
+
+            result = await judge.fail_stale_rejudge_jobs()
+
+        self.assertIsNone(result)
 
 
 class TestPrepareProblem(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
+        judge._prepared_problems.clear()
         self.problem_id = 1
         self.problem_normal = do.Problem(
             id=self.problem_id,
@@ -431,6 +472,63 @@ class TestPrepareProblem(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, self.result_customized)
 
+    def _mock_read(self, controller: mock.Controller, testcases):
+        db_problem = controller.mock_module('persistence.database.problem')
+        db_testcase = controller.mock_module('persistence.database.testcase')
+        db_assisting_data = controller.mock_module('persistence.database.assisting_data')
+        db_problem_reviser_settings = controller.mock_module('persistence.database.problem_reviser_settings')
+
+        db_problem.async_func('read').call_with(self.problem_id).returns(self.problem_normal)
+        db_testcase.async_func('browse').call_with(self.problem_normal.id, include_disabled=False).returns(testcases)
+        db_assisting_data.async_func('browse').call_with(self.problem_normal.id).returns(self.assisting_datas)
+        for i, reviser_setting in enumerate(self.problem_normal.reviser_settings):
+            db_problem_reviser_settings.async_func('read_customized').call_with(reviser_setting.id).returns(
+                self.reviser_settings[i],
+            )
+
+    def _mock_sign(self, controller: mock.Controller, testcases):
+        controller.mock_global_async_func('service.judge._sign_file_url').call_with(
+            testcases[0].input_file_uuid, filename='0.in',
+        ).returns(self.judge_testcases[0].input_file_url)
+        controller.mock_global_async_func('service.judge._sign_file_url').call_with(
+            testcases[0].output_file_uuid, filename='0.out',
+        ).returns(self.judge_testcases[0].output_file_url)
+        controller.mock_global_async_func('service.judge._sign_file_url').call_with(
+            self.assisting_datas[0].s3_file_uuid, filename=self.assisting_datas[0].filename,
+        ).returns(self.judge_assisting_datas[0].file_url)
+        controller.mock_global_async_func('service.judge._sign_file_url').call_with(
+            self.reviser_settings[0].judge_code_file_uuid, filename=self.reviser_settings[0].judge_code_filename,
+        ).returns(self.judge_reviser_settings[0].file_url)
+
+    async def test_cached(self):
+        with mock.Controller() as controller:
+            self._mock_read(controller, self.testcases)
+            self._mock_sign(controller, self.testcases)
+            first_result = await judge._prepare_problem(self.problem_id)
+
+        with mock.Controller() as controller:
+            self._mock_read(controller, self.testcases)
+            second_result = await judge._prepare_problem(self.problem_id)
+
+        self.assertEqual(first_result, self.result_normal)
+        self.assertEqual(second_result, self.result_normal)
+
+    async def test_cache_invalidated_by_edit(self):
+        edited_testcases = copy.deepcopy(self.testcases)
+        edited_testcases[0].input_file_uuid = uuid.UUID('12345678123456781234567812345682')
+
+        with mock.Controller() as controller:
+            self._mock_read(controller, self.testcases)
+            self._mock_sign(controller, self.testcases)
+            await judge._prepare_problem(self.problem_id)
+
+        with mock.Controller() as controller:
+            self._mock_read(controller, edited_testcases)
+            self._mock_sign(controller, edited_testcases)
+            result = await judge._prepare_problem(self.problem_id)
+
+        self.assertEqual(result, self.result_normal)
+
 
 class TestJudge(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
@@ -0,0 +1,64 @@
+"""
+Fans out judgment-added notifications (from any worker) to subscribers in this worker.
+
+Notifications arrive only after the transaction adding the judgment commits (Postgres delivers `pg_notify` on commit),
+so a subscriber reading the notified judgment always finds it.
+"""
+
+import asyncio
+import collections
+import contextlib
+from typing import AsyncIterator, Collection
+
+import log
+import persistence.database as db
+
+
+_subscribers: dict[int, set[asyncio.Queue]] = collections.defaultdict(set)
+_problem_subscribers: dict[int, set[asyncio.Queue]] = collections.defaultdict(set)
+
+
+def _on_judgment_added(payload: str):
+    submission_id, judgment_id, problem_id = (int(value) for value in payload.split(','))
+    for queue in _subscribers.get(submission_id, ()):
+        queue.put_nowait(judgment_id)
+    for queue in _problem_subscribers.get(problem_id, ()):
+        queue.put_nowait(judgment_id)
+
+
+@contextlib.asynccontextmanager
+async def _subscribe(subscribers: dict[int, set[asyncio.Queue]], keys: Collection[int]) \
+        -> AsyncIterator[asyncio.Queue]:
+    await db.listener.listen_handler.listen(db.judgment.ADDED_CHANNEL, _on_judgment_added)
+
+    queue = asyncio.Queue()
+    for key in keys:
+        subscribers[key].add(queue)
+
+    try:
+        yield queue
+    finally:
+        for key in keys:
+            subscribers[key].discard(queue)
+            if not subscribers[key]:
+                del subscribers[key]
+
+
+@contextlib.asynccontextmanager
+async def subscribe(submission_ids: Collection[int]) -> AsyncIterator[asyncio.Queue]:
+    """
+    :return: a queue of ids of judgments added to the submissions
+    """
+    async with _subscribe(_subscribers, submission_ids) as queue:
+        log.info(f'Subscribed judgments of {len(submission_ids)} submissions')
+        yield queue
+
+
+@contextlib.asynccontextmanager
+async def subscribe_problems(problem_ids: Collection[int]) -> AsyncIterator[asyncio.Queue]:
+    """
+    :return: a queue of ids of judgments added to submissions of the problems
+    """
+    async with _subscribe(_problem_subscribers, problem_ids) as queue:
+        log.info(f'Subscribed judgments of {len(problem_ids)} problems')
+        yield queue
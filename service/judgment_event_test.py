@@ -0,0 +1,60 @@
+import unittest
+
+import persistence.database as db
+from util import mock
+
+from . import judgment_event
+
+
+class TestSubscribe(unittest.IsolatedAsyncioTestCase):
+    def expect_listen(self, controller: mock.Controller, times: int):
+        listen_handler = controller.mock_module('persistence.database.listener.listen_handler')
+        for _ in range(times):
+            listen_handler.async_func('listen').call_with(
+                db.judgment.ADDED_CHANNEL, judgment_event._on_judgment_added,
+            ).returns(None)
+
+    async def test_fan_out(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            self.expect_listen(controller, times=4)
+
+            async with (
+                judgment_event.subscribe([1, 2]) as queue_1,
+                judgment_event.subscribe([1]) as queue_2,
+                judgment_event.subscribe([3]) as queue_3,
+                judgment_event.subscribe_problems([10]) as problem_queue,
+            ):
+                judgment_event._on_judgment_added('1,5,10')
+                judgment_event._on_judgment_added('2,6,11')
+
+                self.assertEqual([queue_1.get_nowait(), queue_1.get_nowait()], [5, 6])
+                self.assertEqual(queue_2.get_nowait(), 5)
+                self.assertTrue(queue_2.empty())
+                self.assertTrue(queue_3.empty())
+                self.assertEqual(problem_queue.get_nowait(), 5)
+                self.assertTrue(problem_queue.empty())
+
+        self.assertEqual(judgment_event._subscribers, {})
+        self.assertEqual(judgment_event._problem_subscribers, {})
+
+    async def test_unsubscribe(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            self.expect_listen(controller, times=2)
+
+            async with judgment_event.subscribe([1]) as queue_1:
+                async with judgment_event.subscribe([1]) as queue_2:
+                    pass
+
+                judgment_event._on_judgment_added('1,5,10')
+
+                self.assertEqual(queue_1.get_nowait(), 5)
+                self.assertTrue(queue_2.empty())
+
+        self.assertEqual(judgment_event._subscribers, {})
+
+    async def test_no_subscriber(self):
+        judgment_event._on_judgment_added('1,5,10')
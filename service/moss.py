@@ -8,10 +8,13 @@ from bs4 import BeautifulSoup
 
 from base import do
 import log
-from persistence import database as db, s3
+from persistence import database as db
 from persistence import http_client
+import util.executor
 import util.text
 
+from . import storage
+
 
 @dataclass
 class MossOptions:
@@ -156,12 +159,16 @@ async def check_all_submissions_moss(title: str, challenge: do.Challenge, proble
                                                                  for submission in submissions)
     s3_files = await db.s3_file.browse_with_uuids(submission.content_file_uuid for submission in submissions)
 
+    to_fetch: list[tuple[str, do.S3File]] = []
     for referral, submission, s3_file in zip(account_referrals, submissions, s3_files):
         if not referral or not s3_file:
             continue
         file_ext = await get_language_ext(submission.language_id)
         filename = util.text.get_valid_filename(f'{referral}.{file_ext}')
-        submission_files[filename] = await s3.tools.get_file_content_from_do(s3_file)
+        to_fetch.append((filename, s3_file))
+
+    async for i, content in storage.fetch_many([s3_file for _, s3_file in to_fetch], event='moss'):
+        submission_files[to_fetch[i][0]] = content
 
     if not submission_files:
         log.info(f'No submission files found for moss task {problem.id=}')
@@ -231,7 +238,7 @@ async def download_report(index_url: str, sub_folder: str) -> tuple[bytes, dict[
 
     log.info('Parsed index file, parsing match files...')
 
-    parsed_index, extracted_urls = _parse(index_url, index, sub_folder)
+    parsed_index, extracted_urls = await util.executor.run_cpu(util.executor.HTML, _parse, index_url, index, sub_folder)
     match_files = {
         rel_url: downloaded
         for rel_url, downloaded
@@ -240,9 +247,13 @@ async def download_report(index_url: str, sub_folder: str) -> tuple[bytes, dict[
 
     log.info('Parsed match files, parsing inner files...')
 
+    parsed_match_files = await asyncio.gather(*(
+        util.executor.run_cpu(util.executor.HTML, _parse, index_url, file, sub_folder='')
+        for file in match_files.values()
+    ))
+
     match_inner_files = {}
-    for match_file_url, file in match_files.items():
-        parsed_file, other_extracted_urls = _parse(index_url, file, sub_folder='')
+    for match_file_url, (parsed_file, other_extracted_urls) in zip(list(match_files), parsed_match_files):
         match_files[match_file_url] = parsed_file
         match_inner_files |= {
             os.path.join(sub_folder, rel_url): downloaded
@@ -0,0 +1,191 @@
+"""
+Shares one live computation of each scoreboard among all its viewers in this worker:
+the scoreboard is recomputed at most once per `config.scoreboard_stream_min_interval` seconds
+when judgments of its problems are added, and only the changed team rows are sent to the viewers.
+"""
+
+import asyncio
+import contextlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Optional, Sequence
+
+from config import config
+import const
+import log
+from util import metric, tracing
+
+from . import judgment_event
+
+
+# Each row should have `team_id`, and should be comparable (e.g. dataclass)
+ComputeFunc = Callable[[], Awaitable[Sequence[Any]]]
+
+
+class Viewer:
+    """
+    Changes not yet taken by the viewer are merged, so a slow viewer costs at most one row per team.
+    """
+
+    def __init__(self, board: '_Board'):
+        self._board = board
+        self._changed_rows: dict[int, Any] = {}
+        self._is_reset = False
+        self._has_change = asyncio.Event()
+
+    def snapshot(self) -> Sequence[Any]:
+        self._changed_rows, self._is_reset = {}, False
+        self._has_change.clear()
+        return list(self._board.rows.values())
+
+    async def wait(self) -> None:
+        await self._has_change.wait()
+
+    def pop_change(self) -> tuple[bool, Sequence[Any]]:
+        """
+        :return: whether the rows are a new snapshot (e.g. teams changed), and the rows
+        """
+        if self._is_reset:
+            return True, self.snapshot()
+        changed_rows, self._changed_rows = self._changed_rows, {}
+        self._has_change.clear()
+        return False, list(changed_rows.values())
+
+    def _notify(self, changed_rows: Sequence[Any], is_reset: bool):
+        if is_reset:
+            self._is_reset = True
+        else:
+            self._changed_rows.update((row.team_id, row) for row in changed_rows)
+        self._has_change.set()
+
+
+class _Board:
+    def __init__(self, scoreboard_id: int, problem_ids: Collection[int], compute: ComputeFunc,
+                 refresh_times: Collection[datetime]):
+        self.scoreboard_id = scoreboard_id
+        self.rows: dict[int, Any] = {}
+        self.viewers: set[Viewer] = set()
+        self._problem_ids = problem_ids
+        self._compute = compute
+        self._refresh_times = sorted(refresh_times)
+        self._ready = asyncio.get_running_loop().create_future()
+        self._task: asyncio.Task = None
+
+    def start(self):
+        # Shared by all the viewers, so its spans should not be recorded under the request of the first viewer
+        with tracing.detached():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    async def wait_ready(self):
+        await asyncio.shield(self._ready)
+
+    async def _run(self):
+        async with judgment_event.subscribe_problems(self._problem_ids) as judgment_ids:
+            try:
+                self.rows = {row.team_id: row for row in await self._timed_compute()}
+            except Exception as e:
+                self._ready.set_exception(e)
+                return
+            self._ready.set_result(None)
+
+            while True:
+                await self._wait_change(judgment_ids)
+                while not judgment_ids.empty():  # Coalesce all the judgments added so far
+                    judgment_ids.get_nowait()
+
+                try:
+                    self._update(await self._timed_compute())
+                except Exception as e:
+                    log.exception(e, msg=f'Failed to compute scoreboard {self.scoreboard_id}, keeping previous rows')
+
+                await asyncio.sleep(config.scoreboard_stream_min_interval)
+
+    async def _wait_change(self, judgment_ids: asyncio.Queue):
+        """
+        Waits until a judgment is added, or until the next refresh time (e.g. scoreboard unfreezes)
+        """
+        now = datetime.now()
+        while self._refresh_times and self._refresh_times[0] <= now:
+            self._refresh_times.pop(0)
+        timeout = (self._refresh_times[0] - now).total_seconds() if self._refresh_times else None
+
+        try:
+            await asyncio.wait_for(judgment_ids.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _timed_compute(self) -> Sequence[Any]:
+        start_time = datetime.now()
+        try:
+            return await self._compute()
+        finally:
+            metric.scoreboard_stream_compute_time((datetime.now() - start_time).total_seconds() * 1000)
+
+    def _update(self, rows: Sequence[Any]):
+        new_rows = {row.team_id: row for row in rows}
+        is_reset = new_rows.keys() != self.rows.keys()
+        changed_rows = [row for team_id, row in new_rows.items() if self.rows.get(team_id) != row]
+        self.rows = new_rows
+
+        if not is_reset and not changed_rows:
+            return
+        for viewer in self.viewers:
+            viewer._notify(changed_rows, is_reset=is_reset)
+
+
+_boards: dict[int, _Board] = {}
+
+
+@contextlib.asynccontextmanager
+async def subscribe(scoreboard_id: int, problem_ids: Collection[int], compute: ComputeFunc,
+                    refresh_times: Collection[datetime] = ()) -> AsyncIterator[Viewer]:
+    """
+    The first viewer of a scoreboard starts its computation with the given `compute`, `problem_ids` and
+    `refresh_times`; later viewers share it until the last viewer leaves.
+
+    :param compute: should not depend on the viewer (e.g. permission), and should decide freezing by itself
+    :param refresh_times: times to recompute even if no judgment is added, e.g. when the scoreboard unfreezes
+    """
+    board = _boards.get(scoreboard_id)
+    if board is None:
+        board = _boards[scoreboard_id] = _Board(scoreboard_id, problem_ids=problem_ids, compute=compute,
+                                                refresh_times=refresh_times)
+        board.start()
+
+    viewer = Viewer(board)
+    board.viewers.add(viewer)
+    metric.scoreboard_stream_viewers(1)
+    try:
+        await board.wait_ready()
+        yield viewer
+    finally:
+        metric.scoreboard_stream_viewers(-1)
+        board.viewers.discard(viewer)
+        if not board.viewers and _boards.get(scoreboard_id) is board:
+            del _boards[scoreboard_id]
+            board.stop()
+
+
+async def stream(scoreboard_id: int, problem_ids: Collection[int], compute: ComputeFunc,
+                 is_disconnected: Callable[[], Awaitable[bool]], refresh_times: Collection[datetime] = ()) \
+        -> AsyncIterator[tuple[Optional[str], Any]]:
+    """
+    Server-sent events for `middleware.response.EventSourceResponse`:
+    a `snapshot` event of all the rows, then an `update` event of the changed rows,
+    or a new `snapshot` event if the teams changed.
+    """
+    async with subscribe(scoreboard_id, problem_ids=problem_ids, compute=compute,
+                         refresh_times=refresh_times) as viewer:
+        yield 'snapshot', viewer.snapshot()
+
+        while not await is_disconnected():
+            try:
+                await asyncio.wait_for(viewer.wait(), timeout=const.SSE_HEARTBEAT_SECS)
+            except asyncio.TimeoutError:
+                yield None, None
+                continue
+
+            is_reset, rows = viewer.pop_change()
+            yield 'snapshot' if is_reset else 'update', rows
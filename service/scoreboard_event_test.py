@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+from dataclasses import dataclass
+import unittest
+
+from util import mock
+
+from . import scoreboard_event
+
+
+@dataclass
+class Row:
+    team_id: int
+    score: int
+
+
+class TestSubscribe(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.scoreboard_id = 1
+        self.problem_ids = [1, 2]
+        self.computed_rows = [
+            [Row(team_id=1, score=0), Row(team_id=2, score=0)],
+            [Row(team_id=1, score=0), Row(team_id=2, score=100)],
+        ]
+        self.judgment_ids = asyncio.Queue()
+        self.compute_count = 0
+
+    async def compute(self):
+        self.compute_count += 1
+        return self.computed_rows[self.compute_count - 1]
+
+    async def compute_not_expected(self):
+        raise AssertionError('compute of later viewers is not expected to be called')
+
+    @contextlib.asynccontextmanager
+    async def subscribe_problems(self):
+        yield self.judgment_ids
+
+    async def test_shared_by_viewers(self):
+        with mock.Controller() as controller:
+            judgment_event = controller.mock_module('service.scoreboard_event.judgment_event')
+            judgment_event.func('subscribe_problems').call_with(self.problem_ids).returns(self.subscribe_problems())
+
+            async with (
+                scoreboard_event.subscribe(self.scoreboard_id, problem_ids=self.problem_ids,
+                                           compute=self.compute) as viewer_1,
+                scoreboard_event.subscribe(self.scoreboard_id, problem_ids=self.problem_ids,
+                                           compute=self.compute_not_expected) as viewer_2,
+            ):
+                self.assertEqual(viewer_1.snapshot(), self.computed_rows[0])
+                self.assertEqual(viewer_2.snapshot(), self.computed_rows[0])
+
+                self.judgment_ids.put_nowait(1)
+                self.judgment_ids.put_nowait(2)
+
+                await asyncio.wait_for(viewer_1.wait(), timeout=1)
+                self.assertEqual(viewer_1.pop_change(), (False, [Row(team_id=2, score=100)]))
+                await asyncio.wait_for(viewer_2.wait(), timeout=1)
+                self.assertEqual(viewer_2.pop_change(), (False, [Row(team_id=2, score=100)]))
+
+        self.assertEqual(self.compute_count, 2)
+        self.assertEqual(scoreboard_event._boards, {})
+
+    async def test_teams_changed(self):
+        self.computed_rows[1] = [Row(team_id=1, score=0)]
+
+        with mock.Controller() as controller:
+            judgment_event = controller.mock_module('service.scoreboard_event.judgment_event')
+            judgment_event.func('subscribe_problems').call_with(self.problem_ids).returns(self.subscribe_problems())
+
+            async with scoreboard_event.subscribe(self.scoreboard_id, problem_ids=self.problem_ids,
+                                                  compute=self.compute) as viewer:
+                self.assertEqual(viewer.snapshot(), self.computed_rows[0])
+
+                self.judgment_ids.put_nowait(1)
+
+                await asyncio.wait_for(viewer.wait(), timeout=1)
+                self.assertEqual(viewer.pop_change(), (True, [Row(team_id=1, score=0)]))
+
+    async def test_compute_failed(self):
+        async def compute():
+            raise ValueError
+
+        with mock.Controller() as controller:
+            judgment_event = controller.mock_module('service.scoreboard_event.judgment_event')
+            judgment_event.func('subscribe_problems').call_with(self.problem_ids).returns(self.subscribe_problems())
+
+            with self.assertRaises(ValueError):
+                async with scoreboard_event.subscribe(self.scoreboard_id, problem_ids=self.problem_ids,
+                                                      compute=compute):
+                    pass
+
+        self.assertEqual(scoreboard_event._boards, {})
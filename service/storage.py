@@ -0,0 +1,155 @@
+"""
+Files are stored in two tiers behind `s3_file`:
+- all files are in S3, so that signed urls (e.g. for the judge and the browser) keep working
+- small submission files are also kept inline in the database, so that server-side reads skip S3
+
+Uploads are deduplicated by content within a bucket: files of the same content in the same bucket share one S3 object
+and one `s3_file`. Files are never shared across buckets, since the bucket (e.g. `testdata`) shows in signed urls.
+"""
+
+import asyncio
+import io
+import typing
+from typing import AsyncIterator, Awaitable, Callable, Optional, Sequence
+from uuid import UUID
+
+from base import do
+from config import s3_config
+import const
+import exceptions as exc
+import log
+import persistence.database as db
+import persistence.s3 as s3
+import util
+from util import executor, metric
+
+
+UploadFunc = Callable[[typing.IO], Awaitable[do.S3File]]
+
+
+async def _find(bucket: str, content_hash: str) -> Optional[do.S3File]:
+    try:
+        s3_file = await db.s3_file.read_by_content_hash(bucket=bucket, content_hash=content_hash)
+    except exc.persistence.NotFound:
+        metric.upload_deduplicated(hit=False)
+        return None
+
+    metric.upload_deduplicated(hit=True)
+    log.info(f'Reusing {s3_file=} of the same content')
+    return s3_file
+
+
+async def upload(file: typing.IO, bucket: str, upload_func: UploadFunc, inline: bool = False) -> UUID:
+    """
+    Seekable files are hashed before uploading, and not uploaded if the content exists;
+    other files are hashed while uploading, and the uploaded object is deleted if the content exists.
+
+    :param bucket: bucket that `upload_func` uploads to, e.g. `s3.testdata.BUCKET_NAME`; only files in it are reused
+    :param upload_func: uploads the file to `bucket`, e.g. `s3.testdata.upload`
+    :param inline: also keep the content inline if the file is seekable and not larger than
+                   `s3_config.inline_max_bytes`
+    :return: uuid of the `s3_file` with the same content
+    """
+    content_hash = await executor.run_cpu(executor.DISK, util.file.hash_content, file)
+    inline_content = None
+
+    if content_hash is not None:
+        if existing := await _find(bucket, content_hash):
+            return existing.uuid
+        if inline and util.file.get_length(file) <= s3_config.inline_max_bytes:
+            inline_content = file.read()
+            file = io.BytesIO(inline_content)
+        s3_file = await upload_func(file)
+
+    else:
+        hashing_file = util.file.HashingReader(file)
+        s3_file = await upload_func(hashing_file)
+        content_hash = hashing_file.hexdigest()
+        if existing := await _find(bucket, content_hash):
+            await s3.tools.delete(bucket=s3_file.bucket, key=s3_file.key)
+            return existing.uuid
+
+    s3_file_uuid = await db.s3_file.add_with_do(s3_file=s3_file, content_hash=content_hash)
+    if inline_content is not None:
+        await db.s3_file.add_inline_content(s3_file_uuid=s3_file_uuid, content=inline_content)
+    return s3_file_uuid
+
+
+async def fetch_many(s3_files: Sequence[do.S3File], event: str, ordered: bool = True) \
+        -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Same as `s3.tools.fetch_many`, but files kept inline are read from the database instead of S3.
+    """
+    inline_contents = await db.s3_file.browse_inline_contents(s3_file.uuid for s3_file in s3_files)
+    metric.inline_read(hit_count=len(inline_contents), miss_count=len(s3_files) - len(inline_contents))
+
+    to_fetch = [i for i, s3_file in enumerate(s3_files) if s3_file.uuid not in inline_contents]
+    fetched = s3.tools.fetch_many([s3_files[i] for i in to_fetch], event=event, ordered=ordered)
+
+    if not ordered:
+        for i, s3_file in enumerate(s3_files):
+            if s3_file.uuid in inline_contents:
+                yield i, inline_contents[s3_file.uuid]
+        async for j, content in fetched:
+            yield to_fetch[j], content
+        return
+
+    for i, s3_file in enumerate(s3_files):
+        if s3_file.uuid in inline_contents:
+            yield i, inline_contents[s3_file.uuid]
+        else:
+            _, content = await anext(fetched)
+            yield i, content
+    async for _ in fetched:  # Finishes the batch, for its metrics
+        pass
+
+
+async def write_zip(zip_uploader: s3.tools.ZipUploader, files: Sequence[tuple[str, do.S3File]], event: str) -> None:
+    """
+    Writes the files into the zip: those kept inline are read from the database, the rest are streamed from S3
+    (see `s3.tools.ZipUploader.write_s3_files`), so large files are never held in memory as a whole.
+
+    :param files: arcname and S3 file of each entry
+    """
+    inline_contents = await db.s3_file.browse_inline_contents(s3_file.uuid for _, s3_file in files)
+    metric.inline_read(hit_count=len(inline_contents), miss_count=len(files) - len(inline_contents))
+
+    for arcname, s3_file in files:
+        if s3_file.uuid in inline_contents:
+            await zip_uploader.writestr(arcname, inline_contents[s3_file.uuid])
+
+    await zip_uploader.write_s3_files([(arcname, s3_file) for arcname, s3_file in files
+                                       if s3_file.uuid not in inline_contents], event=event)
+
+
+async def backfill_inline() -> int:
+    """
+    Keeps inline the small submission files uploaded before the inline tier (or when it was disabled).
+    Files failed to fetch are skipped and logged.
+
+    :return: number of files backfilled
+    """
+    if not s3_config.inline_max_bytes:
+        return 0
+
+    backfilled_count = 0
+    after_uuid = None
+    while s3_files := await db.s3_file.browse_small_submission_files_not_inline(
+            max_content_length=s3_config.inline_max_bytes, limit=const.S3_INLINE_BACKFILL_BATCH_SIZE,
+            after_uuid=after_uuid):
+        after_uuid = s3_files[-1].uuid
+
+        contents = await asyncio.gather(*(s3.tools.get_file_content_from_do(s3_file) for s3_file in s3_files),
+                                        return_exceptions=True)
+        for s3_file, content in zip(s3_files, contents):
+            if isinstance(content, Exception):
+                log.exception(content, msg=f'Failed to backfill inline content of {s3_file=}', info_level=True)
+                continue
+            if len(content) > s3_config.inline_max_bytes:  # content length of the submission may be inaccurate
+                continue
+            await db.s3_file.add_inline_content(s3_file_uuid=s3_file.uuid, content=content)
+            backfilled_count += 1
+
+        log.info(f'Backfilled {backfilled_count} inline contents, up to {after_uuid=}')
+
+    return backfilled_count
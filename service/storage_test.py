@@ -0,0 +1,188 @@
+import hashlib
+import io
+import unittest
+from uuid import UUID
+
+from base import do
+import exceptions as exc
+from util import mock
+
+from . import storage
+
+
+class _ReadOnceFile:
+    def __init__(self, content: bytes):
+        self._file = io.BytesIO(content)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+class TestUpload(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.content = b'content'
+        self.content_hash = hashlib.sha256(self.content).hexdigest()
+        self.s3_file = do.S3File(
+            uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
+            bucket='bucket',
+            key='d8ec7a6a-27e1-4cee-8229-4304ef933544',
+        )
+        self.existing_s3_file = do.S3File(
+            uuid=UUID('12345678-1234-5678-1234-567812345678'),
+            bucket='bucket',
+            key='12345678-1234-5678-1234-567812345678',
+        )
+        self.uploaded_contents = []
+
+    async def upload_func(self, file) -> do.S3File:
+        self.uploaded_contents.append(file.read(-1))
+        return self.s3_file
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+
+            db_s3_file.async_func('read_by_content_hash').call_with(
+                bucket='bucket', content_hash=self.content_hash,
+            ).raises(exc.persistence.NotFound)
+            db_s3_file.async_func('add_with_do').call_with(
+                s3_file=self.s3_file, content_hash=self.content_hash,
+            ).returns(self.s3_file.uuid)
+
+            result = await storage.upload(io.BytesIO(self.content), bucket='bucket', upload_func=self.upload_func)
+
+        self.assertEqual(result, self.s3_file.uuid)
+        self.assertEqual(self.uploaded_contents, [self.content])
+
+    async def test_reuse(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+
+            db_s3_file.async_func('read_by_content_hash').call_with(
+                bucket='bucket', content_hash=self.content_hash,
+            ).returns(self.existing_s3_file)
+
+            result = await storage.upload(io.BytesIO(self.content), bucket='bucket', upload_func=self.upload_func)
+
+        self.assertEqual(result, self.existing_s3_file.uuid)
+        self.assertEqual(self.uploaded_contents, [])
+
+    async def test_reuse_not_seekable(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+
+            db_s3_file.async_func('read_by_content_hash').call_with(
+                bucket='bucket', content_hash=self.content_hash,
+            ).returns(self.existing_s3_file)
+            s3_tools.async_func('delete').call_with(
+                bucket=self.s3_file.bucket, key=self.s3_file.key,
+            ).returns(None)
+
+            result = await storage.upload(_ReadOnceFile(self.content), bucket='bucket', upload_func=self.upload_func)
+
+        self.assertEqual(result, self.existing_s3_file.uuid)
+        self.assertEqual(self.uploaded_contents, [self.content])
+
+    async def test_inline(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+
+            db_s3_file.async_func('read_by_content_hash').call_with(
+                bucket='bucket', content_hash=self.content_hash,
+            ).raises(exc.persistence.NotFound)
+            db_s3_file.async_func('add_with_do').call_with(
+                s3_file=self.s3_file, content_hash=self.content_hash,
+            ).returns(self.s3_file.uuid)
+            db_s3_file.async_func('add_inline_content').call_with(
+                s3_file_uuid=self.s3_file.uuid, content=self.content,
+            ).returns(None)
+
+            result = await storage.upload(io.BytesIO(self.content), bucket='bucket', upload_func=self.upload_func,
+                                          inline=True)
+
+        self.assertEqual(result, self.s3_file.uuid)
+        self.assertEqual(self.uploaded_contents, [self.content])
+
+
+class TestFetchMany(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.s3_files = [
+            do.S3File(uuid=UUID(int=i), bucket='bucket', key=str(UUID(int=i)))
+            for i in range(4)
+        ]
+        self.inline_contents = {
+            self.s3_files[0].uuid: b'0',
+            self.s3_files[2].uuid: b'2',
+        }
+
+    async def fetch_many(self, s3_files, event, ordered):
+        for i, s3_file in enumerate(s3_files):
+            yield i, s3_file.key[-1].encode()
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            s3_tools = controller.mock_module('persistence.s3.tools')
+
+            db_s3_file.async_func('browse_inline_contents').call_with(
+                mock.AnyInstanceOf(object),
+            ).returns(self.inline_contents)
+            s3_tools.func('fetch_many').call_with(
+                [self.s3_files[1], self.s3_files[3]], event='event', ordered=True,
+            ).executes(self.fetch_many)
+
+            result = [item async for item in storage.fetch_many(self.s3_files, event='event')]
+
+        self.assertEqual(result, [(0, b'0'), (1, b'1'), (2, b'2'), (3, b'3')])
+
+
+class _FakeZipUploader:
+    def __init__(self):
+        self.written: list[tuple[str, bytes]] = []
+        self.streamed: list[tuple[str, do.S3File]] = []
+
+    async def writestr(self, arcname: str, data: bytes) -> None:
+        self.written.append((arcname, data))
+
+    async def write_s3_files(self, files, event: str) -> None:
+        self.streamed += files
+
+
+class TestWriteZip(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.files = [
+            (f'{i}.txt', do.S3File(uuid=UUID(int=i), bucket='bucket', key=str(UUID(int=i))))
+            for i in range(4)
+        ]
+        self.inline_contents = {
+            self.files[0][1].uuid: b'0',
+            self.files[2][1].uuid: b'2',
+        }
+
+    async def test_happy_flow(self):
+        zip_uploader = _FakeZipUploader()
+
+        with (
+            mock.Controller() as controller,
+        ):
+            db_s3_file = controller.mock_module('persistence.database.s3_file')
+
+            db_s3_file.async_func('browse_inline_contents').call_with(
+                mock.AnyInstanceOf(object),
+            ).returns(self.inline_contents)
+
+            await storage.write_zip(zip_uploader, self.files, event='event')
+
+        self.assertEqual(zip_uploader.written, [('0.txt', b'0'), ('2.txt', b'2')])
+        self.assertEqual(zip_uploader.streamed, [self.files[1], self.files[3]])
@@ -5,13 +5,13 @@ import uuid
 import persistence.database as db
 import persistence.s3 as s3
 
+from . import storage
+
 
 async def submit(file: typing.IO, filename: str, account_id: int, problem_id: int, language_id: int,
                  file_length: int, submit_time: datetime) -> int:
-    file_uuid = uuid.uuid4()
-    s3_file = await s3.submission.upload(file, file_uuid=file_uuid)
-
-    content_file_uuid = await db.s3_file.add_with_do(s3_file=s3_file)
+    content_file_uuid = await storage.upload(file, bucket=s3.submission.BUCKET_NAME,
+                                             upload_func=s3.submission.upload, inline=True)
 
     submission_id = await db.submission.add(account_id=account_id, problem_id=problem_id,
                                             language_id=language_id,
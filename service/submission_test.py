@@ -4,6 +4,7 @@ import unittest
 from uuid import UUID
 
 from base import do
+import persistence.s3 as s3
 from util import mock
 
 from . import submission
@@ -20,13 +21,7 @@ class TestSubmit(unittest.IsolatedAsyncioTestCase):
         self.submit_time = datetime(2023, 7, 29, 12)
 
         self.submission_id = 1
-        self.file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
         self.content_file_uuid = UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544')
-        self.s3_file = do.S3File(
-            uuid=UUID('d8ec7a6a-27e1-4cee-8229-4304ef933544'),
-            bucket="bucket",
-            key="key",
-        )
 
         self.expected_happy_flow_result = self.submission_id
 
@@ -34,18 +29,12 @@ class TestSubmit(unittest.IsolatedAsyncioTestCase):
         with (
             mock.Controller() as controller,
         ):
-            s3_submission = controller.mock_module('persistence.s3.submission')
-            db_s3_file = controller.mock_module('persistence.database.s3_file')
+            service_storage = controller.mock_module('service.submission.storage')
             db_submission = controller.mock_module('persistence.database.submission')
 
-            controller.mock_global_func('uuid.uuid4').call_with().returns(
-                self.file_uuid,
-            )
-            s3_submission.async_func('upload').call_with(
-                mock.AnyInstanceOf(type(self.file)), file_uuid=self.file_uuid,
-            ).returns(self.s3_file)
-            db_s3_file.async_func('add_with_do').call_with(
-                s3_file=self.s3_file,
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(type(self.file)),
+                bucket=s3.submission.BUCKET_NAME, upload_func=s3.submission.upload, inline=True,
             ).returns(self.content_file_uuid)
             db_submission.async_func('add').call_with(
                 account_id=self.account_id, problem_id=self.problem_id, language_id=self.language_id,
@@ -0,0 +1,143 @@
+"""
+Imports the testcases and assisting data of a problem from a zip archive:
+- `<label>.in` and `<label>.out` at the root are the input and output data of the testcase labelled `<label>`
+- files in `assisting_data/` are the assisting data, named by their filenames
+
+Testcases (of the same `is_sample`) and assisting data are matched by label and filename, and added if not exist.
+The archive is validated as a whole; other errors are reported per file, and the failed files are not imported.
+"""
+
+import asyncio
+import re
+import typing
+import zipfile
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from uuid import UUID
+
+from config import s3_config
+import const
+import exceptions as exc
+import log
+import persistence.database as db
+import persistence.s3 as s3
+import util
+
+from . import storage
+
+
+INPUT = 'input'
+OUTPUT = 'output'
+ASSISTING_DATA = 'assisting_data'
+
+_TESTDATA_PATTERN = re.compile(r'(?P<label>[^/]+)\.(?P<extension>in|out)')
+_TESTDATA_TYPES = {'in': INPUT, 'out': OUTPUT}
+
+
+@dataclass
+class FileResult:
+    filename: str
+    type: Optional[str]  # `INPUT`, `OUTPUT` or `ASSISTING_DATA`; None if not recognized
+    id: Optional[int]  # id of the testcase or assisting data
+    error: Optional[str]  # error code
+
+
+def _classify(filename: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    :return: type of the file, and the testcase label or assisting data filename
+    """
+    if match := _TESTDATA_PATTERN.fullmatch(filename):
+        return _TESTDATA_TYPES[match['extension']], match['label']
+
+    if filename.startswith(const.TESTCASE_IMPORT_ASSISTING_DATA_DIR):
+        name = filename[len(const.TESTCASE_IMPORT_ASSISTING_DATA_DIR):]
+        if name and '/' not in name:
+            return ASSISTING_DATA, name
+
+    return None, None
+
+
+def _open_archive(file: typing.IO) -> tuple[zipfile.ZipFile, Sequence[zipfile.ZipInfo]]:
+    try:
+        archive = zipfile.ZipFile(util.file.as_seekable(file))
+    except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+        raise exc.IllegalInput(cause=e)
+
+    infos = [info for info in archive.infolist() if not info.is_dir()]
+    filenames = [info.filename for info in infos]
+    if (len(infos) > const.TESTCASE_IMPORT_MAX_FILES
+            or sum(info.file_size for info in infos) > const.TESTCASE_IMPORT_MAX_UNCOMPRESSED_SIZE
+            or len(set(filenames)) != len(filenames)):
+        archive.close()
+        raise exc.IllegalInput
+
+    return archive, infos
+
+
+async def import_archive(problem_id: int, file: typing.IO, is_sample: bool, score: int,
+                         time_limit: int, memory_limit: int) -> Sequence[FileResult]:
+    """
+    Files are uploaded to S3 with at most `s3_config.upload_concurrency` at once,
+    then the testcases and assisting data are imported in one transaction.
+
+    :param score, time_limit, memory_limit: for the added testcases; existing testcases keep theirs
+    :return: result of each file in the archive
+    """
+    archive, infos = _open_archive(file)
+
+    with archive:
+        results = [FileResult(filename=info.filename, type=None, id=None, error=None) for info in infos]
+        names = []
+        for result in results:
+            result.type, name = _classify(result.filename)
+            names.append(name)
+            if result.type is None:
+                result.error = exc.IllegalInput.__name__
+
+        semaphore = asyncio.Semaphore(s3_config.upload_concurrency)
+
+        async def upload(info: zipfile.ZipInfo, type_: str) -> UUID:
+            async with semaphore:
+                with archive.open(info) as member:
+                    if type_ == ASSISTING_DATA:
+                        return await storage.upload(member, bucket=s3.assisting_data.BUCKET_NAME,
+                                                    upload_func=s3.assisting_data.upload)
+                    # Issue #26: CRLF
+                    return await storage.upload(util.file.replace_cr(member), bucket=s3.testdata.BUCKET_NAME,
+                                                upload_func=s3.testdata.upload)
+
+        to_upload = [i for i, result in enumerate(results) if result.type is not None]
+        uploaded = await asyncio.gather(*(upload(infos[i], results[i].type) for i in to_upload),
+                                        return_exceptions=True)
+
+    testcase_files: dict[str, list] = {}
+    assisting_data_files: dict[str, UUID] = {}
+    for i, s3_file_uuid in zip(to_upload, uploaded):
+        result, name = results[i], names[i]
+        if isinstance(s3_file_uuid, Exception):
+            if isinstance(s3_file_uuid, exc.PdogsException):
+                result.error = s3_file_uuid.__class__.__name__
+            else:
+                log.exception(s3_file_uuid, msg=f'Failed to upload {result.filename=} of {problem_id=}')
+                result.error = exc.SystemException.__name__
+            continue
+
+        if result.type == ASSISTING_DATA:
+            assisting_data_files[name] = s3_file_uuid
+            continue
+        files = testcase_files.setdefault(name, [None, None, None, None])
+        offset = 0 if result.type == INPUT else 2
+        files[offset:offset + 2] = s3_file_uuid, result.filename
+
+    testcase_ids, assisting_data_ids = await db.problem.import_testcases_and_assisting_data(
+        problem_id=problem_id, is_sample=is_sample, score=score, time_limit=time_limit, memory_limit=memory_limit,
+        testcase_files={label: tuple(files) for label, files in testcase_files.items()},
+        assisting_data_files=assisting_data_files,
+    )
+
+    for result, name in zip(results, names):
+        if result.error is not None:
+            continue
+        result.id = assisting_data_ids[name] if result.type == ASSISTING_DATA else testcase_ids[name]
+
+    return results
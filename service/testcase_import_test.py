@@ -0,0 +1,96 @@
+import io
+import unittest
+import zipfile
+from uuid import UUID
+
+import exceptions as exc
+import persistence.s3 as s3
+from util import mock
+
+from . import testcase_import
+
+
+def _make_archive(files: dict[str, bytes]) -> io.BytesIO:
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, 'w') as archive:
+        for filename, content in files.items():
+            archive.writestr(filename, content)
+    file.seek(0)
+    return file
+
+
+class TestImportArchive(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.problem_id = 1
+        self.archive = _make_archive({
+            '1.in': b'1\r\n2\r\n',
+            '1.out': b'3\n',
+            '2.out': b'4\n',
+            'assisting_data/checker.py': b'print()\r\n',
+            'readme.md': b'readme',
+        })
+        self.input_uuid = UUID(int=1)
+        self.output_uuid = UUID(int=2)
+        self.checker_uuid = UUID(int=3)
+        self.uploaded_contents = []
+
+    def upload(self, uuid: UUID):
+        def upload(file, bucket, upload_func):
+            self.uploaded_contents.append(file.read())
+            return uuid
+        return upload
+
+    async def test_happy_flow(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            service_storage = controller.mock_module('service.testcase_import.storage')
+            db_problem = controller.mock_module('persistence.database.problem')
+
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(object), bucket=s3.testdata.BUCKET_NAME, upload_func=s3.testdata.upload,
+            ).executes(self.upload(self.input_uuid))
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(object), bucket=s3.testdata.BUCKET_NAME, upload_func=s3.testdata.upload,
+            ).executes(self.upload(self.output_uuid))
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(object), bucket=s3.testdata.BUCKET_NAME, upload_func=s3.testdata.upload,
+            ).raises(exc.FileDecodeError)
+            service_storage.async_func('upload').call_with(
+                mock.AnyInstanceOf(object), bucket=s3.assisting_data.BUCKET_NAME, upload_func=s3.assisting_data.upload,
+            ).executes(self.upload(self.checker_uuid))
+            db_problem.async_func('import_testcases_and_assisting_data').call_with(
+                problem_id=self.problem_id, is_sample=False, score=2, time_limit=1000, memory_limit=65536,
+                testcase_files={'1': (self.input_uuid, '1.in', self.output_uuid, '1.out')},
+                assisting_data_files={'checker.py': self.checker_uuid},
+            ).returns(({'1': 10}, {'checker.py': 20}))
+
+            result = await testcase_import.import_archive(problem_id=self.problem_id, file=self.archive,
+                                                          is_sample=False, score=2,
+                                                          time_limit=1000, memory_limit=65536)
+
+        self.assertEqual(result, [
+            testcase_import.FileResult(filename='1.in', type='input', id=10, error=None),
+            testcase_import.FileResult(filename='1.out', type='output', id=10, error=None),
+            testcase_import.FileResult(filename='2.out', type='output', id=None, error='FileDecodeError'),
+            testcase_import.FileResult(filename='assisting_data/checker.py', type='assisting_data', id=20,
+                                       error=None),
+            testcase_import.FileResult(filename='readme.md', type=None, id=None, error='IllegalInput'),
+        ])
+        self.assertEqual(self.uploaded_contents, [b'1\n2\n', b'3\n', b'print()\r\n'])
+
+    async def test_bad_zip(self):
+        with self.assertRaises(exc.IllegalInput):
+            await testcase_import.import_archive(problem_id=self.problem_id, file=io.BytesIO(b'not a zip'),
+                                                 is_sample=False, score=2, time_limit=1000, memory_limit=65536)
+
+    async def test_duplicate_filename(self):
+        with self.assertWarns(UserWarning):  # Duplicate name
+            archive = _make_archive({'1.in': b'1\n'})
+            with zipfile.ZipFile(archive, 'a') as file:
+                file.writestr('1.in', b'2\n')
+        archive.seek(0)
+
+        with self.assertRaises(exc.IllegalInput):
+            await testcase_import.import_archive(problem_id=self.problem_id, file=archive,
+                                                 is_sample=False, score=2, time_limit=1000, memory_limit=65536)
@@ -7,9 +7,12 @@ from . import (
     api_doc,
     background_task,
     context,
+    executor,
     file,
+    loop_monitor,
     metric,
     model,
     security,
     text,
+    tracing,
 )
@@ -0,0 +1,113 @@
+"""
+Bounded executor pools for running CPU-bound work off the event loop
+"""
+
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import functools
+import typing
+
+from config import executor_config
+
+from . import metric
+
+
+_T = typing.TypeVar('_T')
+
+
+class Pool:
+    """
+    A lazily-created process pool with back-pressure: at most `max_pending` tasks are submitted at a time,
+    the rest wait (and are counted as queue depth) on the event loop.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._executor: Executor = None  # Created on first use, need to be closed manually
+        self._semaphore: asyncio.Semaphore = None  # Created on first use
+
+    def _make_executor(self) -> Executor:
+        return ProcessPoolExecutor(max_workers=self._max_workers)
+
+    async def run(self, func: typing.Callable[..., _T], *args, **kwargs) -> _T:
+        if self._executor is None:
+            self._executor = self._make_executor()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_pending)
+
+        start_time = datetime.now()
+
+        metric.executor_queue_depth(self.name, 1)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            metric.executor_queue_depth(self.name, -1)
+
+        metric.executor_in_flight(self.name, 1)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor,
+                                                                    functools.partial(func, *args, **kwargs))
+        finally:
+            self._semaphore.release()
+            metric.executor_in_flight(self.name, -1)
+            metric.executor_task_time(self.name, (datetime.now() - start_time).total_seconds() * 1000)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ThreadPool(Pool):
+    """
+    For work that releases the GIL (e.g. zlib) or works on unpicklable objects (e.g. opened files).
+    """
+
+    def _make_executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=f'executor-{self.name}')
+
+
+PASSWORD = 'password'
+PASSWORD_BULK = 'password_bulk'  # Separated from PASSWORD, so bulk hashing (e.g. csv import) does not delay logins
+ZIP = 'zip'
+HTML = 'html'
+CSV = 'csv'
+DISK = 'disk'
+
+_pools: dict[str, Pool] = {
+    PASSWORD: Pool(PASSWORD,
+                   max_workers=executor_config.password_hash_workers,
+                   max_pending=executor_config.password_hash_max_pending),
+    PASSWORD_BULK: Pool(PASSWORD_BULK,
+                        max_workers=executor_config.password_bulk_hash_workers,
+                        max_pending=executor_config.password_bulk_hash_max_pending),
+    ZIP: ThreadPool(ZIP,
+                    max_workers=executor_config.zip_workers,
+                    max_pending=executor_config.zip_max_pending),
+    HTML: Pool(HTML,
+               max_workers=executor_config.html_workers,
+               max_pending=executor_config.html_max_pending),
+    CSV: ThreadPool(CSV,
+                    max_workers=executor_config.csv_workers,
+                    max_pending=executor_config.csv_max_pending),
+    DISK: ThreadPool(DISK,
+                     max_workers=executor_config.disk_workers,
+                     max_pending=executor_config.disk_max_pending),
+}
+
+
+async def run_cpu(pool_name: str, func: typing.Callable[..., _T], *args, **kwargs) -> _T:
+    """
+    Run `func(*args, **kwargs)` in the named pool.
+    For process pools, `func` and its arguments should be picklable (e.g. module-level functions).
+    """
+    return await _pools[pool_name].run(func, *args, **kwargs)
+
+
+def shutdown():
+    for pool in _pools.values():
+        pool.shutdown()
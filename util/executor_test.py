@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from . import executor
+
+
+class _FakeMetric:
+    def __init__(self):
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.task_times = []
+
+    def executor_queue_depth(self, pool_name: str, delta: int):
+        self.queue_depth += delta
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def executor_in_flight(self, pool_name: str, delta: int):
+        self.in_flight += delta
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def executor_task_time(self, pool_name: str, milliseconds: float):
+        self.task_times.append(milliseconds)
+
+
+class TestPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.metric = _FakeMetric()
+        self.pool = executor.ThreadPool('test', max_workers=4, max_pending=2)
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+
+    def work(self, i: int) -> int:
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        return i
+
+    async def test_back_pressure(self):
+        with (
+            patch.object(executor, 'metric', self.metric),
+        ):
+            result = await asyncio.gather(*(self.pool.run(self.work, i) for i in range(5)))
+
+        self.assertEqual(result, list(range(5)))
+        # Only `max_pending` tasks are submitted, though the pool has more workers
+        self.assertEqual(self.max_running, 2)
+        self.assertEqual(self.metric.max_in_flight, 2)
+        self.assertEqual(self.metric.max_queue_depth, 3)
+        self.assertEqual(self.metric.queue_depth, 0)
+        self.assertEqual(self.metric.in_flight, 0)
+        self.assertEqual(len(self.metric.task_times), 5)
+
+    async def test_raise(self):
+        def fail():
+            raise ValueError
+
+        with (
+            patch.object(executor, 'metric', self.metric),
+        ):
+            with self.assertRaises(ValueError):
+                await self.pool.run(fail)
+            # The slot is released
+            self.assertEqual(await asyncio.gather(*(self.pool.run(self.work, i) for i in range(2))), [0, 1])
+
+        self.assertEqual(self.metric.in_flight, 0)
+        self.assertEqual(len(self.metric.task_times), 3)
+
+    async def test_run_cpu(self):
+        with (
+            patch.dict(executor._pools, {'test': self.pool}),
+            patch.object(executor, 'metric', self.metric),
+        ):
+            self.assertEqual(await executor.run_cpu('test', self.work, i=1), 1)
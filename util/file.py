@@ -1,5 +1,8 @@
+import codecs
+import hashlib
+import io
 import typing
-from io import BytesIO
+from typing import Optional
 
 from fastapi import Header
 
@@ -7,6 +10,9 @@ import const
 import exceptions as exc
 
 
+_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
 def valid_file_length(file_length: int):
     async def validator(content_length: int = Header(..., lt=file_length)):
         return content_length
@@ -14,10 +20,137 @@ def valid_file_length(file_length: int):
 
 
 def replace_cr(file: typing.IO) -> typing.IO:
-    try:
-        return BytesIO(file.read()
-                       .decode(const.TESTDATA_ENCODING)
-                       .replace('\r\n', '\n')
-                       .encode(const.TESTDATA_ENCODING))
-    except UnicodeDecodeError:
-        raise exc.FileDecodeError
+    """
+    :return: a reader of the file with CRLF replaced by LF, which raises `exc.FileDecodeError` while reading
+    """
+    return _NoCrReader(file)
+
+
+def get_length(file: typing.IO) -> int:
+    """
+    Length of the rest of a seekable file, without reading it.
+    """
+    position = file.tell()
+    length = file.seek(0, io.SEEK_END) - position
+    file.seek(position)
+    return length
+
+
+def _is_seekable(file: typing.IO) -> bool:
+    # SpooledTemporaryFile has no `seekable` before python 3.11
+    return file.seekable() if hasattr(file, 'seekable') else hasattr(file, 'seek')
+
+
+def as_seekable(file: typing.IO) -> typing.IO:
+    """
+    :return: the file with `seekable()`, e.g. for `zipfile`
+    """
+    return file if hasattr(file, 'seekable') else _SeekableFile(file)
+
+
+class _SeekableFile:
+    def __init__(self, file: typing.IO):
+        self._file = file
+
+    def seekable(self) -> bool:
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def hash_content(file: typing.IO) -> Optional[str]:
+    """
+    Hashes the rest of a seekable file and seeks back, so the file can still be read.
+
+    :return: sha256 hex digest, or None if the file is not seekable
+    """
+    if not _is_seekable(file):
+        return None
+
+    position = file.tell()
+    content_hash = hashlib.sha256()
+    while chunk := file.read(_CHUNK_SIZE):
+        content_hash.update(chunk)
+    file.seek(position)
+    return content_hash.hexdigest()
+
+
+class HashingReader:
+    """
+    Hashes the content while it is being read, for files that can only be read once.
+    """
+
+    def __init__(self, file: typing.IO):
+        self._file = file
+        self._hash = hashlib.sha256()
+
+    def seekable(self) -> bool:
+        return False
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self._hash.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class _NoCrReader:
+    """
+    Replaces CRLF by LF chunk by chunk, holding only about one chunk (or the size to read) in memory.
+    Seekable to its start if the file is seekable, so it can be hashed and then read again.
+    """
+
+    def __init__(self, file: typing.IO):
+        self._file = file
+        self._start = file.tell() if _is_seekable(file) else None
+        self._reset()
+
+    def _reset(self):
+        self._decoder = codecs.getincrementaldecoder(const.TESTDATA_ENCODING)()
+        self._buffer = bytearray()
+        self._has_pending_cr = False  # a CR at the end of a chunk, may be followed by LF in the next chunk
+        self._is_eof = False
+        self._position = 0
+
+    def seekable(self) -> bool:
+        return self._start is not None
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if self._start is None or offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('can only seek to start')
+        self._file.seek(self._start)
+        self._reset()
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._is_eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._file.read(_CHUNK_SIZE)
+            self._is_eof = not chunk
+            self._buffer += self._replace_cr(chunk, is_final=self._is_eof)
+
+        if size < 0:
+            size = len(self._buffer)
+        content = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(content)
+        return content
+
+    def _replace_cr(self, chunk: bytes, is_final: bool) -> bytes:
+        try:
+            text = self._decoder.decode(chunk, final=is_final)
+        except UnicodeDecodeError:
+            raise exc.FileDecodeError
+
+        if self._has_pending_cr:
+            text = '\r' + text
+        self._has_pending_cr = not is_final and text.endswith('\r')
+        if self._has_pending_cr:
+            text = text[:-1]
+
+        return text.replace('\r\n', '\n').encode(const.TESTDATA_ENCODING)
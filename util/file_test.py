@@ -0,0 +1,43 @@
+import hashlib
+import io
+import unittest
+
+import exceptions as exc
+
+from . import file
+
+
+class TestReplaceCr(unittest.TestCase):
+    def test_happy_flow(self):
+        no_cr_file = file.replace_cr(io.BytesIO('a\r\nb\r\n測試\r\r\n'.encode()))
+
+        self.assertEqual(no_cr_file.read(), 'a\nb\n測試\r\n'.encode())
+
+    def test_across_chunks(self):
+        content = b'a' * (file._CHUNK_SIZE - 1) + '\r\n測'.encode() + b'\r'
+        no_cr_file = file.replace_cr(io.BytesIO(content))
+
+        self.assertEqual(no_cr_file.read(file._CHUNK_SIZE), b'a' * (file._CHUNK_SIZE - 1) + b'\n')
+        self.assertEqual(no_cr_file.read(), '測'.encode() + b'\r')
+        self.assertEqual(no_cr_file.read(), b'')
+
+    def test_seek_to_start(self):
+        no_cr_file = file.replace_cr(io.BytesIO(b'a\r\nb'))
+
+        self.assertEqual(file.hash_content(no_cr_file), hashlib.sha256(b'a\nb').hexdigest())
+        self.assertEqual(no_cr_file.read(), b'a\nb')
+
+    def test_decode_error(self):
+        no_cr_file = file.replace_cr(io.BytesIO(b'\xff\xfe'))
+
+        with self.assertRaises(exc.FileDecodeError):
+            no_cr_file.read()
+
+
+class TestGetLength(unittest.TestCase):
+    def test_happy_flow(self):
+        content_file = io.BytesIO(b'content')
+        content_file.read(3)
+
+        self.assertEqual(file.get_length(content_file), 4)
+        self.assertEqual(content_file.read(), b'tent')
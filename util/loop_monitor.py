@@ -0,0 +1,85 @@
+"""
+Monitors event loop lag, and optionally captures the stack of code blocking the event loop
+"""
+
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from base import mcs
+from config import LoopMonitorConfig
+import log
+
+from . import metric
+
+
+_WATCHDOG_JOIN_TIMEOUT_SECS = 1
+
+class LoopMonitor(metaclass=mcs.Singleton):
+    def __init__(self):
+        self._task: asyncio.Task = None  # Need to be init/closed manually
+        self._watchdog: threading.Thread = None  # Need to be init/closed manually
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int = None
+
+    async def initialize(self, loop_monitor_config: LoopMonitorConfig):
+        if not loop_monitor_config.enabled or self._task is not None:
+            return
+
+        self._stopped = threading.Event()  # A watchdog of the last run may outlive its bounded join
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._measure_lag(interval=loop_monitor_config.interval))
+
+        if loop_monitor_config.capture_stack:
+            self._watchdog = threading.Thread(
+                target=self._watch_blocking,
+                kwargs={'stopped': self._stopped,
+                        'interval': loop_monitor_config.interval,
+                        'threshold': loop_monitor_config.block_threshold},
+                name='loop-monitor-watchdog',
+                daemon=True,
+            )
+            self._watchdog.start()
+
+    async def close(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog is not None:
+            # The watchdog wakes up on `_stopped`; joined off the event loop and bounded in case it is capturing
+            await asyncio.to_thread(self._watchdog.join, _WATCHDOG_JOIN_TIMEOUT_SECS)
+            self._watchdog = None
+
+    async def _measure_lag(self, interval: float):
+        while True:
+            start = time.monotonic()
+            self._heartbeat = start
+            await asyncio.sleep(interval)
+            metric.event_loop_lag(max(time.monotonic() - start - interval, 0))
+
+    def _watch_blocking(self, stopped: threading.Event, interval: float, threshold: float):
+        """
+        Runs in a separated thread; the heartbeat is not updated when the event loop is blocked.
+        """
+        reported_heartbeat = None
+        while not stopped.wait(threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_secs = time.monotonic() - heartbeat - interval
+            if blocked_secs <= threshold or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            metric.event_loop_blocked()
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else ''
+            log.warning(f'Event loop blocked for more than {blocked_secs:.3f} secs, stack:\n{stack}')
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import unittest
+
+from config import LoopMonitorConfig
+from util import mock
+
+from . import loop_monitor
+
+
+def _make_config(capture_stack: bool) -> LoopMonitorConfig:
+    config = LoopMonitorConfig()
+    config.enabled = True
+    config.interval = 0.05
+    config.capture_stack = capture_stack
+    config.block_threshold = 0.1
+    return config
+
+
+class _FakeStopped:
+    """
+    Stops the watchdog after waiting `times` times.
+    """
+
+    def __init__(self, times: int):
+        self._times = times
+
+    def wait(self, timeout: float) -> bool:
+        self._times -= 1
+        return self._times < 0
+
+
+class TestMeasureLag(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.monitor = loop_monitor.loop_monitor
+        self.interval = 0.05
+        self.lags = []
+
+    async def test_lag(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            time_ = controller.mock_module('util.loop_monitor.time')
+            asyncio_ = controller.mock_module('util.loop_monitor.asyncio')
+            metric = controller.mock_module('util.loop_monitor.metric')
+
+            time_.func('monotonic').call_with().returns(10.0)
+            asyncio_.async_func('sleep').call_with(self.interval).returns(None)
+            time_.func('monotonic').call_with().returns(10.25)  # Blocked for 0.2 secs
+            metric.func('event_loop_lag').call_with(mock.AnyInstanceOf(float)).executes(self.lags.append)
+            time_.func('monotonic').call_with().returns(10.25)
+            asyncio_.async_func('sleep').call_with(self.interval).returns(None)
+            time_.func('monotonic').call_with().returns(10.3)  # Not blocked
+            metric.func('event_loop_lag').call_with(mock.AnyInstanceOf(float)).executes(self.lags.append)
+            time_.func('monotonic').call_with().returns(10.3)
+            asyncio_.async_func('sleep').call_with(self.interval).raises(asyncio.CancelledError)
+
+            with self.assertRaises(asyncio.CancelledError):
+                await self.monitor._measure_lag(interval=self.interval)
+
+        self.assertEqual(len(self.lags), 2)
+        self.assertAlmostEqual(self.lags[0], 0.2)
+        self.assertAlmostEqual(self.lags[1], 0)
+        self.assertEqual(self.monitor._heartbeat, 10.3)
+
+
+class TestWatchBlocking(unittest.TestCase):
+    def setUp(self) -> None:
+        self.monitor = loop_monitor.loop_monitor
+        self.monitor._loop_thread_id = threading.get_ident()  # Captures the stack of this test
+        self.monitor._heartbeat = 10.0
+        self.interval = 0.05
+        self.threshold = 0.1
+        self.messages = []
+
+    def test_capture_stack(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            time_ = controller.mock_module('util.loop_monitor.time')
+            metric = controller.mock_module('util.loop_monitor.metric')
+            log = controller.mock_module('util.loop_monitor.log')
+
+            time_.func('monotonic').call_with().returns(10.1)  # Not blocked long enough
+            time_.func('monotonic').call_with().returns(10.2)
+            metric.func('event_loop_blocked').call_with().returns(None)
+            log.func('warning').call_with(mock.AnyInstanceOf(str)).executes(self.messages.append)
+            time_.func('monotonic').call_with().returns(10.3)  # Still the same block, reported once
+
+            self.monitor._watch_blocking(stopped=_FakeStopped(times=3),
+                                         interval=self.interval, threshold=self.threshold)
+
+        message, = self.messages
+        self.assertIn('Event loop blocked for more than 0.150 secs', message)
+        self.assertIn('test_capture_stack', message)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self) -> None:
+        await loop_monitor.loop_monitor.close()
+
+    async def test_close(self):
+        await loop_monitor.loop_monitor.initialize(loop_monitor_config=_make_config(capture_stack=True))
+        watchdog = loop_monitor.loop_monitor._watchdog
+        task = loop_monitor.loop_monitor._task
+
+        await loop_monitor.loop_monitor.close()
+        await asyncio.sleep(0)  # Lets the task be cancelled
+
+        self.assertFalse(watchdog.is_alive())
+        self.assertTrue(task.cancelled())
+        self.assertIsNone(loop_monitor.loop_monitor._watchdog)
+        self.assertIsNone(loop_monitor.loop_monitor._task)
+
+    async def test_disabled(self):
+        config = _make_config(capture_stack=True)
+        config.enabled = False
+
+        await loop_monitor.loop_monitor.initialize(loop_monitor_config=config)
+
+        self.assertIsNone(loop_monitor.loop_monitor._task)
+        self.assertIsNone(loop_monitor.loop_monitor._watchdog)
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Summary
+from prometheus_client import Counter, Gauge, Histogram, Summary
 
 
 ERROR_CODE = Counter(
@@ -21,3 +21,269 @@ SQL_TIME = Summary(
 
 def sql_time(event_name: str, time: float):
     SQL_TIME.labels(event_name).observe(time)
+
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "The delay of the event loop to resume a scheduled callback.",
+    buckets=(0.001, 0.005, 0.010, 0.025, 0.050, 0.100, 0.250, 0.500, 1, 2.5, 5, 10),
+)
+
+
+def event_loop_lag(lag: float):
+    EVENT_LOOP_LAG.observe(lag)
+
+
+EVENT_LOOP_BLOCKED = Counter(
+    "event_loop_blocked_total",
+    "Number of times the event loop was detected blocked longer than threshold.",
+)
+
+
+def event_loop_blocked():
+    EVENT_LOOP_BLOCKED.inc()
+
+
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "executor_queue_depth",
+    "Number of tasks waiting for a slot of the executor pool.",
+    labelnames=("pool",),
+    multiprocess_mode="livesum",
+)
+
+EXECUTOR_IN_FLIGHT = Gauge(
+    "executor_in_flight",
+    "Number of tasks submitted to and not yet finished by the executor pool.",
+    labelnames=("pool",),
+    multiprocess_mode="livesum",
+)
+
+EXECUTOR_TASK_TIME = Summary(
+    "executor_task_time_ms",
+    "The time taken for each task in the executor pool, including waiting.",
+    labelnames=("pool",),
+)
+
+
+def executor_queue_depth(pool: str, delta: int):
+    EXECUTOR_QUEUE_DEPTH.labels(pool).inc(delta)
+
+
+def executor_in_flight(pool: str, delta: int):
+    EXECUTOR_IN_FLIGHT.labels(pool).inc(delta)
+
+
+def executor_task_time(pool: str, time: float):
+    EXECUTOR_TASK_TIME.labels(pool).observe(time)
+
+
+AMQP_PUBLISH_IN_FLIGHT = Gauge(
+    "amqp_publish_in_flight",
+    "Number of AMQP messages published and not yet confirmed by the broker.",
+    labelnames=("queue_name",),
+    multiprocess_mode="livesum",
+)
+
+AMQP_PUBLISH_TIME = Summary(
+    "amqp_publish_time_ms",
+    "The time taken for each AMQP message to be published and confirmed.",
+    labelnames=("queue_name",),
+)
+
+AMQP_PUBLISH_FAILED = Counter(
+    "amqp_publish_failed_total",
+    "Number of AMQP messages nacked, returned or timed out on publish.",
+    labelnames=("queue_name",),
+)
+
+
+def amqp_publish_in_flight(queue_name: str, delta: int):
+    AMQP_PUBLISH_IN_FLIGHT.labels(queue_name).inc(delta)
+
+
+def amqp_publish_time(queue_name: str, time: float):
+    AMQP_PUBLISH_TIME.labels(queue_name).observe(time)
+
+
+def amqp_publish_failed(queue_name: str):
+    AMQP_PUBLISH_FAILED.labels(queue_name).inc()
+
+
+AMQP_CONSUME_IN_FLIGHT = Gauge(
+    "amqp_consume_in_flight",
+    "Number of AMQP messages being consumed.",
+    labelnames=("queue_name",),
+    multiprocess_mode="livesum",
+)
+
+AMQP_CONSUME_TIME = Summary(
+    "amqp_consume_time_ms",
+    "The time taken for each AMQP message to be consumed.",
+    labelnames=("queue_name",),
+)
+
+AMQP_CONSUME_BACKLOG = Gauge(
+    "amqp_consume_backlog",
+    "Number of AMQP messages ready in the queue, polled periodically.",
+    labelnames=("queue_name",),
+    multiprocess_mode="max",
+)
+
+
+def amqp_consume_in_flight(queue_name: str, delta: int):
+    AMQP_CONSUME_IN_FLIGHT.labels(queue_name).inc(delta)
+
+
+def amqp_consume_time(queue_name: str, time: float):
+    AMQP_CONSUME_TIME.labels(queue_name).observe(time)
+
+
+def amqp_consume_backlog(queue_name: str, count: int):
+    AMQP_CONSUME_BACKLOG.labels(queue_name).set(count)
+
+
+SCOREBOARD_STREAM_VIEWERS = Gauge(
+    "scoreboard_stream_viewers",
+    "Number of viewers connected to live scoreboard streams.",
+    multiprocess_mode="livesum",
+)
+
+SCOREBOARD_STREAM_COMPUTE_TIME = Summary(
+    "scoreboard_stream_compute_time_ms",
+    "The time taken for each computation of a live scoreboard, shared by all its viewers in the worker.",
+)
+
+
+def scoreboard_stream_viewers(delta: int):
+    SCOREBOARD_STREAM_VIEWERS.inc(delta)
+
+
+def scoreboard_stream_compute_time(time: float):
+    SCOREBOARD_STREAM_COMPUTE_TIME.observe(time)
+
+
+S3_SIGN_URL_CACHE = Counter(
+    "s3_sign_url_cache_total",
+    "Number of S3 url signs served from (hit) or missed (miss) the signed url cache.",
+    labelnames=("result",),
+)
+
+
+def s3_sign_url_cache(hit: bool):
+    S3_SIGN_URL_CACHE.labels("hit" if hit else "miss").inc()
+
+
+S3_FETCH_BATCH_TIME = Summary(
+    "s3_fetch_batch_time_ms",
+    "The time taken for each batch of S3 objects to be fetched.",
+    labelnames=("event_name",),
+)
+
+S3_FETCH_BATCH_BYTES = Summary(
+    "s3_fetch_batch_bytes",
+    "Total size of each batch of S3 objects fetched.",
+    labelnames=("event_name",),
+)
+
+S3_FETCH_BATCH_THROUGHPUT = Summary(
+    "s3_fetch_batch_throughput_bytes_per_second",
+    "Throughput of each batch of S3 objects fetched.",
+    labelnames=("event_name",),
+)
+
+S3_FETCH_RETRIED = Counter(
+    "s3_fetch_retried_total",
+    "Number of S3 object fetches retried.",
+    labelnames=("event_name",),
+)
+
+
+def s3_fetch_batch(event_name: str, time: float, size: int):
+    S3_FETCH_BATCH_TIME.labels(event_name).observe(time)
+    S3_FETCH_BATCH_BYTES.labels(event_name).observe(size)
+    if time:
+        S3_FETCH_BATCH_THROUGHPUT.labels(event_name).observe(size / time * 1000)
+
+
+def s3_fetch_retried(event_name: str):
+    S3_FETCH_RETRIED.labels(event_name).inc()
+
+
+S3_DISK_CACHE = Counter(
+    "s3_disk_cache_total",
+    "Number of S3 object reads served from (hit) or missed (miss) the on-disk cache.",
+    labelnames=("result",),
+)
+
+S3_DISK_CACHE_SIZE = Gauge(
+    "s3_disk_cache_bytes",
+    "Total size of the on-disk S3 object cache on the host, as of the last scan.",
+)
+
+S3_DISK_CACHE_EVICTED = Counter(
+    "s3_disk_cache_evicted_bytes_total",
+    "Total size of the files evicted from the on-disk S3 object cache.",
+)
+
+
+def s3_disk_cache(hit: bool):
+    S3_DISK_CACHE.labels("hit" if hit else "miss").inc()
+
+
+def s3_disk_cache_size(size: int, evicted: int):
+    S3_DISK_CACHE_SIZE.set(size)
+    S3_DISK_CACHE_EVICTED.inc(evicted)
+
+
+S3_OPERATION_TIME = Summary(
+    "s3_operation_time_ms",
+    "The time taken for each S3 operation.",
+    labelnames=("operation",),
+)
+
+S3_OPERATION_BYTES = Counter(
+    "s3_operation_bytes_total",
+    "Total size of the bodies sent or received by S3 operations.",
+    labelnames=("operation",),
+)
+
+S3_OPERATION_FAILED = Counter(
+    "s3_operation_failed_total",
+    "Number of S3 operations failed, after the retries of the client.",
+    labelnames=("operation",),
+)
+
+
+def s3_operation_time(operation: str, time: float):
+    S3_OPERATION_TIME.labels(operation).observe(time)
+
+
+def s3_operation_bytes(operation: str, size: int):
+    S3_OPERATION_BYTES.labels(operation).inc(size)
+
+
+def s3_operation_failed(operation: str):
+    S3_OPERATION_FAILED.labels(operation).inc()
+
+
+UPLOAD_DEDUPLICATED = Counter(
+    "upload_deduplicated_total",
+    "Number of uploads reusing (hit) or not finding (miss) an existing S3 file of the same content.",
+    labelnames=("result",),
+)
+
+
+def upload_deduplicated(hit: bool):
+    UPLOAD_DEDUPLICATED.labels("hit" if hit else "miss").inc()
+
+
+INLINE_READ = Counter(
+    "s3_inline_read_total",
+    "Number of file reads served from the inline tier in the database (hit) or from S3 (miss).",
+    labelnames=("result",),
+)
+
+
+def inline_read(hit_count: int, miss_count: int):
+    INLINE_READ.labels("hit").inc(hit_count)
+    INLINE_READ.labels("miss").inc(miss_count)
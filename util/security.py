@@ -3,17 +3,20 @@ Handles encryption stuff
 """
 
 
+import asyncio
 from datetime import datetime, timedelta
 from functools import partial
-from typing import NamedTuple
+from typing import NamedTuple, Sequence
 
 import jwt
 from passlib.hash import argon2
 import hashlib
 
-from config import config, pd4s_config
+from config import config, executor_config, pd4s_config
 import exceptions as exc
 
+from . import executor
+
 
 _jwt_encoder = partial(jwt.encode, key=config.jwt_secret, algorithm=config.jwt_encode_algorithm)
 _jwt_decoder = partial(jwt.decode, key=config.jwt_secret, algorithms=[config.jwt_encode_algorithm])
@@ -54,13 +57,40 @@ def decode_jwt(encoded: str, time: datetime) -> AuthedAccount:
     )
 
 
-def hash_password(password: str) -> str:
+# Argon2 is CPU-heavy, so hashing & verifying are run in process pool to avoid blocking the event loop
+
+
+def _hash_password(password: str) -> str:
     return argon2.hash(password)
 
 
-def verify_password(to_test: str, hashed: str) -> bool:
+def _hash_passwords(passwords: Sequence[str]) -> list[str]:
+    return [argon2.hash(password) for password in passwords]
+
+
+def _verify_password(to_test: str, hashed: str) -> bool:
     return argon2.verify(to_test, hashed)
 
 
+async def hash_password(password: str) -> str:
+    return await executor.run_cpu(executor.PASSWORD, _hash_password, password)
+
+
+async def hash_passwords(passwords: Sequence[str]) -> list[str]:
+    """
+    Hash passwords in chunks on the bulk pool, so that logins are not queued behind; returns hashes in the same order.
+    """
+    chunk_size = executor_config.password_hash_chunk_size
+    hashed_chunks = await asyncio.gather(*(
+        executor.run_cpu(executor.PASSWORD_BULK, _hash_passwords, passwords[i:i + chunk_size])
+        for i in range(0, len(passwords), chunk_size)
+    ))
+    return [hashed for hashed_chunk in hashed_chunks for hashed in hashed_chunk]
+
+
+async def verify_password(to_test: str, hashed: str) -> bool:
+    return await executor.run_cpu(executor.PASSWORD, _verify_password, to_test, hashed)
+
+
 def verify_password_4s(to_test: str, hashed: str) -> bool:
     return hashlib.sha1((to_test + pd4s_config.pd4s_salt).encode()).hexdigest() == hashed
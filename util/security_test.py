@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch
+
+from util import mock
+
+from . import executor, security
+
+
+class TestHashPasswords(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        # A single thread runs the chunks in order, and only the bulk pool is available
+        self.pools = {executor.PASSWORD_BULK: executor.ThreadPool(executor.PASSWORD_BULK, max_workers=1,
+                                                                  max_pending=1)}
+
+    def tearDown(self) -> None:
+        self.pools[executor.PASSWORD_BULK].shutdown()
+
+    async def test_chunks(self):
+        with (
+            mock.Controller() as controller,
+            patch.dict(executor._pools, self.pools, clear=True),
+            patch.object(security.executor_config, 'password_hash_chunk_size', 2),
+        ):
+            hash_passwords = controller.mock_global_func('util.security._hash_passwords')
+
+            hash_passwords.call_with(['a', 'b']).returns(['A', 'B'])
+            hash_passwords.call_with(['c', 'd']).returns(['C', 'D'])
+            hash_passwords.call_with(['e']).returns(['E'])
+
+            result = await security.hash_passwords(['a', 'b', 'c', 'd', 'e'])
+
+        self.assertEqual(result, ['A', 'B', 'C', 'D', 'E'])
+
+    async def test_empty(self):
+        with (
+            mock.Controller(),
+            patch.dict(executor._pools, self.pools, clear=True),
+        ):
+            result = await security.hash_passwords([])
+
+        self.assertEqual(result, [])
+
+    async def test_hash(self):
+        with (
+            patch.dict(executor._pools, self.pools, clear=True),
+        ):
+            hashed, = await security.hash_passwords(['password'])
+
+        self.assertTrue(security._verify_password('password', hashed))
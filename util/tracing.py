@@ -0,0 +1,233 @@
+"""
+Lightweight tracing spans keyed to request uuid, exported as span trees to a local file or an OTLP/HTTP collector.
+
+Usage:
+    async with tracing.span('name', key=value): ...
+
+    @tracing.span('name')
+    async def func(): ...
+
+Spans are only recorded under a root span (`root=True`), e.g. opened by `middleware.tracing` for each request.
+"""
+
+
+import asyncio
+import contextlib
+import contextvars
+import copy
+import dataclasses
+import json
+import secrets
+import time
+import typing
+import uuid
+
+import aiohttp
+
+from base import mcs
+from config import TracingConfig, tracing_config
+import log
+
+from .context import context
+
+
+@dataclasses.dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: typing.Optional[str]
+    name: str
+    start_time_ns: int
+    end_time_ns: typing.Optional[int] = None
+    attributes: dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+    error: typing.Optional[str] = None
+    children: list['Span'] = dataclasses.field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time_ns or time.time_ns()) - self.start_time_ns) / 1_000_000
+
+    def iter_spans(self) -> typing.Iterator['Span']:
+        yield self
+        for child in self.children:
+            yield from child.iter_spans()
+
+    def to_tree(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'name': self.name,
+            'start_time_ns': self.start_time_ns,
+            'duration_ms': self.duration_ms,
+            'attributes': {k: str(v) for k, v in self.attributes.items()},
+            'error': self.error,
+            'children': [child.to_tree() for child in self.children],
+        }
+
+    def to_otlp(self) -> dict:
+        otlp_span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_time_ns),
+            'endTimeUnixNano': str(self.end_time_ns),
+            'attributes': [{'key': k, 'value': {'stringValue': str(v)}} for k, v in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            otlp_span['parentSpanId'] = self.parent_id
+        return otlp_span
+
+
+_current_span: contextvars.ContextVar[typing.Optional[Span]] = contextvars.ContextVar('tracing_span', default=None)
+
+
+def current_span() -> typing.Optional[Span]:
+    return _current_span.get()
+
+
+@contextlib.contextmanager
+def detached() -> typing.Iterator[None]:
+    """
+    Records no span under the current span inside, e.g. for the events of a long-lived stream,
+    so that its request span stops growing once the stream is set up.
+    """
+    previous = _current_span.get()
+    _current_span.set(None)
+    try:
+        yield
+    finally:
+        _current_span.set(previous)
+
+
+class span(contextlib.AsyncContextDecorator):
+    """
+    Async context manager (and decorator) recording a span under the current span.
+    Does nothing if tracing is disabled, or there is no current span and `root` is not set.
+    """
+
+    def __init__(self, name: str, root: bool = False, **attributes: typing.Any):
+        self._name = name
+        self._root = root
+        self._attributes = attributes
+        self._span: typing.Optional[Span] = None
+        self._token: typing.Optional[contextvars.Token] = None
+
+    def _recreate_cm(self):
+        return copy.copy(self)
+
+    async def __aenter__(self) -> typing.Optional[Span]:
+        if not tracing_config.enabled:
+            return None
+
+        parent = _current_span.get()
+        if parent is None and not self._root:
+            return None
+
+        if parent is not None:
+            trace_id = parent.trace_id
+        else:
+            trace_id = (context.get_request_uuid() or uuid.uuid4()).hex
+
+        self._span = Span(
+            trace_id=trace_id,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            name=self._name,
+            start_time_ns=time.time_ns(),
+            attributes=dict(self._attributes),
+        )
+        if parent is not None:
+            parent.children.append(self._span)
+
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._span is None:
+            return
+
+        self._span.end_time_ns = time.time_ns()
+        if exc_value is not None:
+            self._span.error = log.format_exc(exc_value)
+
+        _current_span.reset(self._token)
+
+        if self._span.parent_id is None:
+            span_exporter.export(self._span)
+
+
+class SpanExporter(metaclass=mcs.Singleton):
+    _QUEUE_SIZE = 1000
+    _BATCH_SIZE = 100
+
+    def __init__(self):
+        self._config: TracingConfig = None
+        self._queue: asyncio.Queue[Span] = None  # Need to be init/closed manually
+        self._task: asyncio.Task = None  # Need to be init/closed manually
+
+    async def initialize(self, tracing_config: TracingConfig):
+        if not tracing_config.enabled or self._task is not None:
+            return
+
+        self._config = tracing_config
+        self._queue = asyncio.Queue(maxsize=self._QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._queue is not None and not self._queue.empty():
+            await self._flush(self._drain())
+
+    def export(self, root: Span):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(root)
+        except asyncio.QueueFull:
+            log.info(f'Tracing queue is full, dropping trace {root.trace_id}')
+
+    def _drain(self) -> list[Span]:
+        batch = []
+        while not self._queue.empty() and len(batch) < self._BATCH_SIZE:
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()] + self._drain()
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                log.exception(e, msg='Failed to export traces', info_level=True)
+
+    async def _flush(self, batch: list[Span]):
+        if self._config.exporter == 'otlp':
+            await self._post_otlp(batch)
+        else:
+            await asyncio.to_thread(self._write_file, batch)
+
+    def _write_file(self, batch: list[Span]):
+        with open(self._config.file_path, 'a', encoding='utf-8') as file:
+            for root in batch:
+                file.write(json.dumps(root.to_tree(), ensure_ascii=False) + '\n')
+
+    async def _post_otlp(self, batch: list[Span]):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name',
+                                         'value': {'stringValue': self._config.service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [span_.to_otlp() for root in batch for span_ in root.iter_spans()],
+            }],
+        }]}
+        async with aiohttp.ClientSession() as session:
+            async with session.post(self._config.otlp_endpoint, json=payload) as resp:
+                if resp.status >= 300:
+                    log.info(f'OTLP collector responded {resp.status}: {await resp.text()}')
+
+
+span_exporter = SpanExporter()
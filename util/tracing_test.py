@@ -0,0 +1,246 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config import TracingConfig
+from util import mock
+
+from . import tracing
+
+
+def _make_config(exporter: str, file_path: str = None) -> TracingConfig:
+    config = TracingConfig()
+    config.enabled = True
+    config.exporter = exporter
+    config.file_path = file_path
+    config.otlp_endpoint = 'http://collector/v1/traces'
+    config.service_name = 'test'
+    return config
+
+
+class TestSpan(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.roots = []
+        self.enabled = patch.object(tracing.tracing_config, 'enabled', True)
+        self.enabled.start()
+
+    def tearDown(self) -> None:
+        self.enabled.stop()
+
+    async def test_nesting(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            span_exporter = controller.mock_module('util.tracing.span_exporter')
+
+            span_exporter.func('export').call_with(mock.AnyInstanceOf(tracing.Span)).executes(self.roots.append)
+
+            async with tracing.span('root', root=True) as root:
+                async with tracing.span('child', key='value') as child:
+                    async with tracing.span('grandchild') as grandchild:
+                        self.assertIs(tracing.current_span(), grandchild)
+                    self.assertIs(tracing.current_span(), child)
+                async with tracing.span('sibling'):
+                    pass
+            self.assertIsNone(tracing.current_span())
+
+        self.assertEqual(self.roots, [root])
+        self.assertEqual([span.name for span in root.iter_spans()], ['root', 'child', 'grandchild', 'sibling'])
+        self.assertEqual({span.trace_id for span in root.iter_spans()}, {root.trace_id})
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(child.parent_id, root.span_id)
+        self.assertEqual(grandchild.parent_id, child.span_id)
+        self.assertEqual(child.attributes, {'key': 'value'})
+        self.assertTrue(all(span.end_time_ns is not None for span in root.iter_spans()))
+
+    async def test_error(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            span_exporter = controller.mock_module('util.tracing.span_exporter')
+
+            span_exporter.func('export').call_with(mock.AnyInstanceOf(tracing.Span)).executes(self.roots.append)
+
+            with self.assertRaises(ValueError):
+                async with tracing.span('root', root=True):
+                    async with tracing.span('child'):
+                        raise ValueError('oops')
+
+        root, = self.roots
+        child, = root.children
+        self.assertIn('oops', child.error)
+        self.assertIn('oops', root.error)
+
+    async def test_decorator(self):
+        @tracing.span('func', key='value')
+        async def func(i: int) -> int:
+            return i
+
+        with (
+            mock.Controller() as controller,
+        ):
+            span_exporter = controller.mock_module('util.tracing.span_exporter')
+
+            span_exporter.func('export').call_with(mock.AnyInstanceOf(tracing.Span)).executes(self.roots.append)
+
+            async with tracing.span('root', root=True):
+                self.assertEqual(await func(1), 1)
+                self.assertEqual(await func(2), 2)
+
+        root, = self.roots
+        self.assertEqual([child.name for child in root.children], ['func', 'func'])
+        self.assertEqual([child.attributes for child in root.children], [{'key': 'value'}] * 2)
+
+    async def test_no_root(self):
+        with (
+            mock.Controller(),
+        ):
+            async with tracing.span('child') as span:
+                self.assertIsNone(span)
+                self.assertIsNone(tracing.current_span())
+
+    async def test_disabled(self):
+        with (
+            mock.Controller(),
+            patch.object(tracing.tracing_config, 'enabled', False),
+        ):
+            async with tracing.span('root', root=True) as span:
+                self.assertIsNone(span)
+
+    async def test_detached(self):
+        with (
+            mock.Controller() as controller,
+        ):
+            span_exporter = controller.mock_module('util.tracing.span_exporter')
+
+            span_exporter.func('export').call_with(mock.AnyInstanceOf(tracing.Span)).executes(self.roots.append)
+
+            async with tracing.span('root', root=True) as root:
+                with tracing.detached():
+                    async with tracing.span('detached') as span:
+                        self.assertIsNone(span)
+                self.assertIs(tracing.current_span(), root)
+
+        self.assertEqual(self.roots, [root])
+        self.assertEqual(root.children, [])
+
+
+class _FakeResponse:
+    status = 200
+
+    async def text(self) -> str:
+        return ''
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class _FakeSession:
+    def __init__(self):
+        self.posted = []
+
+    def post(self, url: str, json: dict) -> _FakeResponse:
+        self.posted.append((url, json))
+        return _FakeResponse()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class TestSpanExporter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.root = tracing.Span(trace_id='trace', span_id='root', parent_id=None, name='root',
+                                 start_time_ns=1_000_000, end_time_ns=3_000_000, attributes={'key': 1})
+        self.child = tracing.Span(trace_id='trace', span_id='child', parent_id='root', name='child',
+                                  start_time_ns=1_000_000, end_time_ns=2_000_000, error='ValueError()')
+        self.root.children.append(self.child)
+
+    async def asyncTearDown(self) -> None:
+        await tracing.span_exporter.close()
+        tracing.span_exporter._queue = None
+
+    async def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'trace.log')
+
+            await tracing.span_exporter.initialize(tracing_config=_make_config('file', file_path=file_path))
+            tracing.span_exporter.export(self.root)
+            await tracing.span_exporter.close()
+
+            with open(file_path, encoding='utf-8') as file:
+                trees = [json.loads(line) for line in file]
+
+        self.assertEqual(trees, [{
+            'trace_id': 'trace',
+            'span_id': 'root',
+            'name': 'root',
+            'start_time_ns': 1_000_000,
+            'duration_ms': 2.0,
+            'attributes': {'key': '1'},
+            'error': None,
+            'children': [{
+                'trace_id': 'trace',
+                'span_id': 'child',
+                'name': 'child',
+                'start_time_ns': 1_000_000,
+                'duration_ms': 1.0,
+                'attributes': {},
+                'error': 'ValueError()',
+                'children': [],
+            }],
+        }])
+
+    async def test_otlp(self):
+        session = _FakeSession()
+
+        with (
+            mock.Controller() as controller,
+        ):
+            aiohttp = controller.mock_module('util.tracing.aiohttp')
+
+            aiohttp.func('ClientSession').call_with().returns(session)
+
+            await tracing.span_exporter.initialize(tracing_config=_make_config('otlp'))
+            tracing.span_exporter.export(self.root)
+            await tracing.span_exporter.close()
+
+        (url, payload), = session.posted
+        self.assertEqual(url, 'http://collector/v1/traces')
+        resource_spans, = payload['resourceSpans']
+        self.assertEqual(resource_spans['resource']['attributes'],
+                         [{'key': 'service.name', 'value': {'stringValue': 'test'}}])
+        scope_spans, = resource_spans['scopeSpans']
+        self.assertEqual(scope_spans['spans'], [
+            {
+                'traceId': 'trace',
+                'spanId': 'root',
+                'name': 'root',
+                'kind': 1,
+                'startTimeUnixNano': '1000000',
+                'endTimeUnixNano': '3000000',
+                'attributes': [{'key': 'key', 'value': {'stringValue': '1'}}],
+                'status': {'code': 1},
+            },
+            {
+                'traceId': 'trace',
+                'spanId': 'child',
+                'name': 'child',
+                'kind': 1,
+                'startTimeUnixNano': '1000000',
+                'endTimeUnixNano': '2000000',
+                'attributes': [],
+                'status': {'code': 2, 'message': 'ValueError()'},
+                'parentSpanId': 'root',
+            },
+        ])
+
+    async def test_not_initialized(self):
+        tracing.span_exporter.export(self.root)  # Dropped silently